@@ -3,6 +3,10 @@ ASGI config for ai_interviewer_project project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve it with an ASGI server (e.g. ``uvicorn ai_interviewer_project.asgi:application``)
+to use the async interview API under ``/api/async/`` and the interview
+WebSocket at ``/ws/interview/<attempt_id>/``.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -13,4 +17,17 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ai_interviewer_project.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported once Django is set up
+from api.websocket import websocket_application  # noqa: E402
+
+
+async def application(scope, receive, send):
+    """
+    Send WebSocket connections to the interview socket, everything else to Django
+    """
+    if scope['type'] == 'websocket':
+        await websocket_application(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
@@ -85,9 +85,36 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Background threads (transcripts, greetings, the database cache)
+        # write while requests do: take the write lock up front and wait for it
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
     }
 }
 
+# Cache shared by every worker: it holds the per-session turn locks and the
+# LLM admission slots, so a per-process cache would let two workers answer
+# the same session at once. Set REDIS_URL to use Redis; otherwise the
+# database cache is used. Run: python manage.py createcachetable
+REDIS_URL = os.getenv('REDIS_URL')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'interview_cache',
+        }
+    }
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -129,3 +156,130 @@ STATIC_URL = 'static/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 AUTH_USER_MODEL = 'accounts.User'
+
+# Live interview sessions: DatabaseSessionStore is shared by every worker,
+# InMemorySessionStore only works with a single process. DatabaseSessionStore
+# needs a shared cache (see CACHES); the checks refuse to start without one.
+INTERVIEW_SESSION_STORE = 'api.session_store.DatabaseSessionStore'
+
+# Session API calls sent with an Idempotency-Key are answered once and the
+# response replayed to retries for IDEMPOTENCY_KEY_TTL_HOURS. Duplicates of
+# a running request wait up to IDEMPOTENCY_WAIT_SECONDS for its response; a
+# key held longer than IDEMPOTENCY_LOCK_SECONDS is treated as abandoned.
+IDEMPOTENCY_KEY_TTL_HOURS = 24
+IDEMPOTENCY_WAIT_SECONDS = 30
+IDEMPOTENCY_LOCK_SECONDS = 120
+
+# Turns of one interview are answered one at a time under a per-session
+# lock leased from the cache; other sessions are not affected
+INTERVIEW_TURN_LOCK_WAIT_SECONDS = 30
+INTERVIEW_TURN_LOCK_LEASE_SECONDS = 120
+
+# Sessions with no turn for the interview's duration plus the grace period
+# are expired (attempt marked EXPIRED, partial transcript optionally
+# evaluated), as are the least recently active ones beyond MAX_LIVE (None
+# for no limit). Run: python manage.py expire_idle_sessions
+INTERVIEW_SESSION_IDLE_GRACE_MINUTES = 10
+INTERVIEW_SESSION_MAX_LIVE = None
+INTERVIEW_SESSION_SWEEP_INTERVAL_SECONDS = 60
+INTERVIEW_EVALUATE_EXPIRED_SESSIONS = True
+
+# Interview WebSocket (ws://<host>/ws/interview/<attempt_id>/, ASGI only):
+# seconds between time_remaining pushes
+INTERVIEW_SOCKET_TICK_SECONDS = 15
+
+# Rows per page on the dashboards and results pages (keyset paginated)
+DASHBOARD_PAGE_SIZE = 25
+
+# Candidates ranked on each interview's incrementally updated leaderboard
+LEADERBOARD_TOP_K = 10
+
+# Cohort analytics (percentiles, z-scores, criterion correlations; needs numpy)
+# are cached until a result or criterion changes, at most this long
+ANALYTICS_CACHE_SECONDS = 300
+
+# Result exports (CSV, JSONL, Parquet with pyarrow) read and stream this
+# many rows at a time. Run: python manage.py export_results <interview_id>
+EXPORT_CHUNK_SIZE = 2000
+
+# Interview transcripts are buffered and written in bulk
+TRANSCRIPT_FLUSH_SIZE = 50
+TRANSCRIPT_FLUSH_INTERVAL_SECONDS = 5
+
+# Background evaluation queue (run with: python manage.py run_evaluation_worker)
+EVALUATION_JOB_MAX_ATTEMPTS = 3
+EVALUATION_JOB_RETRY_BACKOFF_SECONDS = 30
+EVALUATION_JOB_TIMEOUT_SECONDS = 600
+
+# Evaluations are requested as schema-constrained JSON; fields the model
+# leaves out or gets wrong are asked for again this many times
+EVALUATION_FIELD_RETRIES = 1
+
+# Transcripts longer than the threshold are evaluated map-reduce style:
+# segments of about EVALUATION_SEGMENT_TOKENS are scored in parallel and
+# their scores combined
+EVALUATION_MAP_REDUCE_THRESHOLD_TOKENS = 6000
+EVALUATION_SEGMENT_TOKENS = 3000
+EVALUATION_MAP_CONCURRENCY = 4
+
+# Finished evaluations are cached by a hash of their inputs
+EVALUATION_CACHE_MAX_ENTRIES = 5000
+EVALUATION_CACHE_MAX_AGE_DAYS = 30
+
+# Rolling interview context: once the verbatim turns exceed the token budget,
+# all but the most recent turns are folded into a running summary
+INTERVIEW_CONTEXT_TOKEN_BUDGET = 4000
+INTERVIEW_CONTEXT_KEEP_TURNS = 6
+
+# Compiled interview prompts are cached per interview version
+PROMPT_CACHE_TIMEOUT_SECONDS = 3600
+
+# LLM backend for interviews, a dotted path or 'gemini' or 'local'. For
+# offline load and regression tests use 'local' (LocalBackend) with options such as
+# {'seed': 42, 'first_token_latency_ms': (400, 100), 'tokens_per_second': (50, 10)}
+INTERVIEW_LLM_BACKEND = 'interviews.llm_backends.GeminiBackend'
+INTERVIEW_LLM_BACKEND_OPTIONS = {}
+
+# Admission control for LLM calls: at most MAX_CONCURRENT calls per process,
+# up to MAX_QUEUE callers waiting (turns before starts before evaluations),
+# and a 429 with Retry-After once a caller has waited MAX_WAIT_SECONDS.
+# Set GLOBAL_LIMIT to also cap calls across processes through a shared cache.
+LLM_ADMISSION_MAX_CONCURRENT = 8
+LLM_ADMISSION_MAX_QUEUE = 32
+LLM_ADMISSION_MAX_WAIT_SECONDS = 10
+LLM_ADMISSION_GLOBAL_LIMIT = None
+LLM_ADMISSION_GLOBAL_RESERVED = 0
+LLM_ADMISSION_LEASE_SECONDS = 120
+
+# Resilience for Gemini calls: per-call timeout, retries with jittered
+# backoff (each retry moves to the next model), and a circuit breaker per
+# model. With hedging on, a call slower than the model's recent p95 latency
+# is also sent to the next model and the first reply wins. Hedging is off by
+# default: each hedged call can cost a second request to the model.
+LLM_CALL_TIMEOUT_SECONDS = 30
+LLM_CALL_RETRIES = 2
+LLM_RETRY_BACKOFF_SECONDS = 0.5
+LLM_CIRCUIT_FAILURE_THRESHOLD = 3
+LLM_CIRCUIT_RESET_SECONDS = 60
+LLM_HEDGE_ENABLED = False
+LLM_HEDGE_PERCENTILE = 95
+LLM_HEDGE_INITIAL_DELAY_SECONDS = 8
+
+# Model routing per call type: models to use in order of preference, and
+# the latency SLO for each route. A model that misses the SLO or whose error
+# rate exceeds LLM_ROUTE_MAX_ERROR_RATE is moved behind the others and tried
+# again after LLM_ROUTE_PROBE_SECONDS. Stats: GET /api/llm-stats/
+LLM_ROUTES = {
+    'opening': ['gemini-1.5-flash', 'gemini-1.5-pro', 'gemini-pro'],
+    'turn': ['gemini-1.5-flash', 'gemini-pro', 'gemini-1.5-pro'],
+    'summary': ['gemini-1.5-flash', 'gemini-pro'],
+    'evaluation': ['gemini-1.5-pro', 'gemini-1.5-flash'],
+}
+LLM_ROUTE_SLO_MS = {
+    'opening': 5000,
+    'turn': 3000,
+    'summary': 10000,
+    'evaluation': 30000,
+}
+LLM_ROUTE_MAX_ERROR_RATE = 0.2
+LLM_ROUTE_PROBE_SECONDS = 30
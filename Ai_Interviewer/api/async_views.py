@@ -0,0 +1,220 @@
+"""
+Async versions of the interview session API.
+
+Served through the ASGI entry point, these views await Gemini and the ORM
+instead of pinning a worker thread for the length of every LLM round-trip,
+so one process can hold many interviews that are waiting on the model.
+The session operations themselves are shared with views.py through
+session_turns.py.
+"""
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+from interviews.models import InterviewAttempt
+from interviews.admission import AdmissionRejected, PRIORITY_TURN, get_admission_controller
+from .views import (
+    busy_response, candidate_attempts, event_stream_response, not_in_progress_response, out_of_order_response,
+    session_busy_response, session_not_found_response, sse_event, started_session_response
+)
+from .idempotency import idempotent
+from .session_lock import SessionBusy, get_session_locks
+from .session_turns import (
+    AsyncReleasingStream, OutOfOrder, SessionNotFound, StreamedReply, aend_session, aload_turn,
+    asession_attempt, astart_session
+)
+import json
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+@idempotent
+async def start_interview_session(request):
+    """
+    Initialize Gemini interview session
+    """
+    try:
+        data = json.loads(request.body)
+        attempt_id = data.get('attempt_id')
+
+        # Get interview attempt and context; only its candidate may start or resume it
+        try:
+            attempt = await candidate_attempts(await request.auser()).select_related('interview').aget(id=attempt_id)
+        except InterviewAttempt.DoesNotExist:
+            return JsonResponse({
+                'success': False,
+                'error': 'Interview attempt not found'
+            }, status=404)
+
+        if attempt.status != 'IN_PROGRESS':
+            return not_in_progress_response()
+
+        conversation, resumed = await astart_session(attempt)
+        return started_session_response(attempt.id, conversation, resumed)
+
+    except SessionBusy as e:
+        return session_busy_response(e)
+
+    except AdmissionRejected as e:
+        return busy_response(e)
+
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=500)
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+@idempotent
+async def send_interview_message(request):
+    """
+    Send message to Gemini and await the response
+    """
+    try:
+        data = json.loads(request.body)
+        attempt_id = data.get('attempt_id')
+
+        # Answer one turn of a session at a time, in order
+        async with get_session_locks().ahold(attempt_id):
+            turn = await aload_turn(attempt_id, data.get('message'), data.get('sequence'))
+
+            # Get AI response
+            async with get_admission_controller().aslot(PRIORITY_TURN):
+                result = await turn.gemini_service.send_message_async(turn.user_message)
+                if result['success']:
+                    await turn.arecord(result['message'], result['usage'])
+
+        if result['success']:
+            turn.fold()
+            return JsonResponse({
+                'success': True,
+                'message': result['message'],
+                'usage': result['usage'],
+                'sequence': turn.position + 1
+            })
+        else:
+            return JsonResponse({
+                'success': False,
+                'error': result.get('error', 'Failed to get response')
+            }, status=500)
+
+    except SessionNotFound as e:
+        return session_not_found_response(e)
+
+    except OutOfOrder:
+        return out_of_order_response()
+
+    except SessionBusy as e:
+        return session_busy_response(e)
+
+    except AdmissionRejected as e:
+        return busy_response(e)
+
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=500)
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+@idempotent
+async def stream_interview_message(request):
+    """
+    Send message to Gemini and stream the response as Server-Sent Events
+    """
+    try:
+        data = json.loads(request.body)
+    except json.JSONDecodeError:
+        return JsonResponse({
+            'success': False,
+            'error': 'Invalid JSON data'
+        }, status=400)
+
+    attempt_id = data.get('attempt_id')
+    session_locks = get_session_locks()
+
+    # Answer one turn of a session at a time, in order; the stream holds the lock until it ends
+    try:
+        lock_ticket = await session_locks.aacquire(attempt_id)
+    except SessionBusy as e:
+        return session_busy_response(e)
+
+    streaming = False
+    try:
+        try:
+            turn = await aload_turn(attempt_id, data.get('message'), data.get('sequence'))
+        except SessionNotFound as e:
+            return session_not_found_response(e)
+        except OutOfOrder:
+            return out_of_order_response()
+
+        # Take the LLM slot before answering so a saturated server can still reply 429
+        admission = get_admission_controller()
+        try:
+            ticket = await admission.aacquire(PRIORITY_TURN)
+        except AdmissionRejected as e:
+            return busy_response(e)
+
+        async def event_stream():
+            reply = StreamedReply()
+            try:
+                async for token in turn.gemini_service.stream_message_async(turn.user_message):
+                    reply.add(token)
+                    yield sse_event('token', {'token': token})
+                await turn.arecord(reply.message, turn.gemini_service.last_usage)
+            except Exception as e:
+                yield sse_event('error', {'error': str(e)})
+                return
+
+            yield sse_event('done', reply.done(turn))
+
+            # Fold older turns in the background, outside this turn's slot and lock
+            turn.fold()
+
+        def release():
+            admission.release(ticket)
+            session_locks.release(lock_ticket)
+
+        async def arelease():
+            await admission.arelease(ticket)
+            await session_locks.arelease(lock_ticket)
+
+        response = event_stream_response(AsyncReleasingStream(event_stream(), release, arelease))
+        streaming = True
+        return response
+    finally:
+        if not streaming:
+            await session_locks.arelease(lock_ticket)
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+@idempotent
+async def end_interview_session(request):
+    """
+    End interview and queue its evaluation
+    """
+    try:
+        data = json.loads(request.body)
+        job = await aend_session(await asession_attempt(data.get('attempt_id')))
+
+        return JsonResponse({
+            'success': True,
+            'message': 'Interview completed, evaluation queued',
+            'job_id': job.id
+        }, status=202)
+
+    except SessionNotFound as e:
+        return session_not_found_response(e)
+
+    except SessionBusy as e:
+        return session_busy_response(e)
+
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=500)
@@ -0,0 +1,37 @@
+"""
+System checks for the session API's deployment settings
+"""
+from django.conf import settings
+from django.core.checks import Error, register
+from django.utils.module_loading import import_string
+
+# Cache backends that are not shared between worker processes
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register()
+def check_shared_cache(app_configs, **kwargs):
+    """
+    Sessions kept in the database are served by every worker, so the turn
+    locks and admission slots in the cache must be shared by them too
+    """
+    from .session_store import DatabaseSessionStore
+
+    backend = getattr(settings, 'INTERVIEW_SESSION_STORE', 'api.session_store.DatabaseSessionStore')
+    if not issubclass(import_string(backend), DatabaseSessionStore):
+        return []
+
+    cache_backend = settings.CACHES.get('default', {}).get('BACKEND')
+    if cache_backend not in PROCESS_LOCAL_CACHES:
+        return []
+
+    return [Error(
+        f'{backend} is shared by every worker but the default cache ({cache_backend}) is per process, '
+        'so turns of one session are not serialized across workers.',
+        hint='Configure a shared cache in CACHES (Redis or the database cache), '
+             'or use api.session_store.InMemorySessionStore with a single process.',
+        id='api.E001',
+    )]
@@ -0,0 +1,427 @@
+"""
+Idempotency keys and in-flight coalescing for the session API.
+
+Clients send an Idempotency-Key header (or an idempotency_key field in the
+JSON body) with every session call and send the same key again when they
+retry it. The first request with a key claims an IdempotencyRecord and
+runs the view; the response is stored on the record and replayed for any
+later request with that key, so a retried or double-submitted message is
+answered, and appended to the conversation, only once. A duplicate that
+arrives while the first request is still running waits for it, up to
+IDEMPOTENCY_WAIT_SECONDS, and gets the same response. Streamed replies are
+recorded as they are sent and replayed in one piece.
+
+Error, busy (429) and conflict (409) responses are not stored, so a retry with the same key
+runs the request again. Requests without a key are still coalesced while in
+flight: an identical request arriving at the same process while the first is
+running gets the first one's response instead of making a second LLM call.
+"""
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from datetime import timedelta
+from functools import wraps
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse, JsonResponse
+from django.utils import timezone
+from .models import IdempotencyRecord
+
+IDEMPOTENCY_HEADER = 'HTTP_IDEMPOTENCY_KEY'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+POLL_SECONDS = 0.1
+
+
+def wait_seconds():
+    return getattr(settings, 'IDEMPOTENCY_WAIT_SECONDS', 30)
+
+
+def request_key(request):
+    """
+    Idempotency key sent with the request, or None
+    """
+    key = request.META.get(IDEMPOTENCY_HEADER)
+    if not key:
+        try:
+            data = json.loads(request.body)
+            key = data.get('idempotency_key') if isinstance(data, dict) else None
+        except ValueError:
+            key = None
+    key = str(key or '').strip()[:255]
+    return key or None
+
+
+def request_user_id(request):
+    user = getattr(request, 'user', None)
+    return user.pk if user is not None and user.is_authenticated else None
+
+
+async def arequest_user_id(request):
+    if not hasattr(request, 'auser'):
+        return None
+    user = await request.auser()
+    return user.pk if user.is_authenticated else None
+
+
+def request_hash(request, user_id=None):
+    """
+    Hash of the user, the endpoint and the request body, without the idempotency key
+    """
+    body = request.body
+    try:
+        data = json.loads(body)
+        if isinstance(data, dict):
+            data.pop('idempotency_key', None)
+        body = json.dumps(data, sort_keys=True).encode()
+    except ValueError:
+        pass
+    return hashlib.sha256(f"{user_id}\n{request.path}\n".encode() + body).hexdigest()
+
+
+def storable(status_code, content_type, body):
+    """
+    Whether a response is final, rather than an error worth retrying
+    """
+    if status_code >= 500 or status_code in (409, 429):
+        return False
+    # Streams report LLM failures as an error event after a 200
+    return not (content_type.startswith('text/event-stream') and 'event: error\n' in body)
+
+
+def stored_response(status_code, content_type, body):
+    response = HttpResponse(body, status=status_code, content_type=content_type)
+    response[REPLAYED_HEADER] = 'true'
+    if content_type.startswith('text/event-stream'):
+        response['Cache-Control'] = 'no-cache'
+    return response
+
+
+def key_mismatch_response():
+    return JsonResponse({
+        'success': False,
+        'error': 'Idempotency-Key was already used for a different request'
+    }, status=422)
+
+
+def in_progress_response():
+    response = JsonResponse({
+        'success': False,
+        'error': 'A request with this Idempotency-Key is still in progress',
+        'retry_after': 1
+    }, status=409)
+    response['Retry-After'] = '1'
+    return response
+
+
+class RecordingStream:
+    """
+    Streamed content that records what it sends.
+
+    finish(body) is called once: when the stream ends, when it is cut off,
+    or when the response is closed without being read, so an abandoned
+    stream frees its key at once instead of holding it IN_PROGRESS.
+    """
+    def __init__(self, content, finish):
+        self.content = content
+        self.finish = finish
+        self.parts = []
+        self.finished = False
+        self.lock = threading.Lock()
+
+    def done(self, complete):
+        with self.lock:
+            if self.finished:
+                return
+            self.finished = True
+        self.finish(b''.join(self.parts).decode() if complete else None)
+
+    def __iter__(self):
+        complete = False
+        try:
+            for chunk in self.content:
+                self.parts.append(chunk)
+                yield chunk
+            complete = True
+        finally:
+            self.done(complete)
+
+    def close(self):
+        self.done(False)
+
+
+class AsyncRecordingStream(RecordingStream):
+    __iter__ = None
+
+    async def __aiter__(self):
+        complete = False
+        try:
+            async for chunk in self.content:
+                self.parts.append(chunk)
+                yield chunk
+            complete = True
+        finally:
+            await sync_to_async(self.done)(complete)
+
+
+def record_response(response, finish):
+    """
+    Call finish(status_code, content_type, body) once the response is fully produced.
+
+    Streaming responses are recorded as they are sent; body is None if the
+    stream was cut off or closed unread.
+    """
+    status_code, content_type = response.status_code, response['Content-Type']
+
+    if not response.streaming:
+        finish(status_code, content_type, response.content.decode())
+    else:
+        stream = AsyncRecordingStream if response.is_async else RecordingStream
+        response.streaming_content = stream(
+            response.streaming_content, lambda body: finish(status_code, content_type, body)
+        )
+    return response
+
+
+async def arecord_response(response, finish):
+    """
+    Async version of record_response
+    """
+    if response.streaming:
+        return record_response(response, finish)
+
+    await sync_to_async(finish)(response.status_code, response['Content-Type'], response.content.decode())
+    return response
+
+
+# Keyed requests: claimed and stored in the database
+
+def prune_records():
+    """
+    Drop records older than IDEMPOTENCY_KEY_TTL_HOURS
+    """
+    ttl = timedelta(hours=getattr(settings, 'IDEMPOTENCY_KEY_TTL_HOURS', 24))
+    return IdempotencyRecord.objects.filter(created_at__lt=timezone.now() - ttl).delete()[0]
+
+
+def claim(user_id, endpoint, key, fingerprint):
+    """
+    Claim a key for this request.
+
+    Returns (record, True) if this request should run the view, and
+    (record, False) if another request holds or has answered the key. The
+    record is None if a concurrent request claimed it first.
+    """
+    record = IdempotencyRecord.objects.filter(user_id=user_id, endpoint=endpoint, key=key).first()
+
+    if record is None:
+        try:
+            with transaction.atomic():
+                record = IdempotencyRecord.objects.create(
+                    user_id=user_id, endpoint=endpoint, key=key, request_hash=fingerprint
+                )
+        except IntegrityError:
+            return None, False
+        prune_records()
+        return record, True
+
+    lock_seconds = getattr(settings, 'IDEMPOTENCY_LOCK_SECONDS', 120)
+    stale = record.created_at < timezone.now() - timedelta(seconds=lock_seconds)
+    if record.status == 'IN_PROGRESS' and stale and record.request_hash == fingerprint:
+        # The request holding the key died without answering: take it over
+        now = timezone.now()
+        taken = IdempotencyRecord.objects.filter(
+            pk=record.pk, status='IN_PROGRESS', created_at=record.created_at
+        ).update(created_at=now)
+        if not taken:
+            return None, False
+        record.created_at = now
+        return record, True
+
+    return record, False
+
+
+def finish_record(record, status_code, content_type, body):
+    """
+    Store the response for the key, or free the key if the request should be retried
+    """
+    if body is None or not storable(status_code, content_type, body):
+        IdempotencyRecord.objects.filter(pk=record.pk).delete()
+        return
+
+    IdempotencyRecord.objects.filter(pk=record.pk).update(
+        status='COMPLETED',
+        status_code=status_code,
+        content_type=content_type,
+        body=body,
+    )
+
+
+def existing_response(record, fingerprint):
+    """
+    Response for a request whose key is already claimed, or None to keep waiting
+    """
+    if record.request_hash != fingerprint:
+        return key_mismatch_response()
+    if record.status == 'COMPLETED':
+        return stored_response(record.status_code, record.content_type, record.body)
+    return None
+
+
+def run_keyed(view, request, args, kwargs, key):
+    user_id = request_user_id(request)
+    fingerprint = request_hash(request, user_id)
+    deadline = time.monotonic() + wait_seconds()
+
+    while True:
+        record, claimed = claim(user_id, request.path, key, fingerprint)
+        if claimed:
+            break
+        if record is not None:
+            response = existing_response(record, fingerprint)
+            if response is not None:
+                return response
+        if time.monotonic() >= deadline:
+            return in_progress_response()
+        time.sleep(POLL_SECONDS)
+
+    try:
+        response = view(request, *args, **kwargs)
+    except Exception:
+        IdempotencyRecord.objects.filter(pk=record.pk).delete()
+        raise
+    return record_response(response, lambda *result: finish_record(record, *result))
+
+
+async def arun_keyed(view, request, args, kwargs, key):
+    user_id = await arequest_user_id(request)
+    fingerprint = request_hash(request, user_id)
+    deadline = time.monotonic() + wait_seconds()
+
+    while True:
+        record, claimed = await sync_to_async(claim)(user_id, request.path, key, fingerprint)
+        if claimed:
+            break
+        if record is not None:
+            response = existing_response(record, fingerprint)
+            if response is not None:
+                return response
+        if time.monotonic() >= deadline:
+            return in_progress_response()
+        await asyncio.sleep(POLL_SECONDS)
+
+    try:
+        response = await view(request, *args, **kwargs)
+    except Exception:
+        await IdempotencyRecord.objects.filter(pk=record.pk).adelete()
+        raise
+    return await arecord_response(response, lambda *result: finish_record(record, *result))
+
+
+# Requests without a key: identical ones are coalesced within the process
+
+class InFlight:
+    """
+    A running request that identical requests can wait for
+    """
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.started = time.monotonic()
+
+
+_in_flight = {}
+_in_flight_lock = threading.Lock()
+
+
+def join_in_flight(fingerprint):
+    """
+    Return (entry, True) if this request runs the view, else the running request's entry
+    """
+    lock_seconds = getattr(settings, 'IDEMPOTENCY_LOCK_SECONDS', 120)
+    with _in_flight_lock:
+        entry = _in_flight.get(fingerprint)
+        # A response that was never sent leaves its entry behind: expire it
+        if entry is not None and time.monotonic() - entry.started < lock_seconds:
+            return entry, False
+        entry = _in_flight[fingerprint] = InFlight()
+        return entry, True
+
+
+def leave_in_flight(fingerprint, entry, status_code=None, content_type=None, body=None):
+    if body is not None:
+        entry.result = (status_code, content_type, body)
+    with _in_flight_lock:
+        if _in_flight.get(fingerprint) is entry:
+            del _in_flight[fingerprint]
+    entry.event.set()
+
+
+def run_coalesced(view, request, args, kwargs):
+    fingerprint = request_hash(request, request_user_id(request))
+    deadline = time.monotonic() + wait_seconds()
+
+    while True:
+        entry, leader = join_in_flight(fingerprint)
+        if leader:
+            break
+        entry.event.wait(max(0, deadline - time.monotonic()))
+        if entry.result is not None:
+            return stored_response(*entry.result)
+        if time.monotonic() >= deadline:
+            return in_progress_response()
+        # The first request failed: run this one instead
+
+    try:
+        response = view(request, *args, **kwargs)
+    except Exception:
+        leave_in_flight(fingerprint, entry)
+        raise
+    return record_response(response, lambda *result: leave_in_flight(fingerprint, entry, *result))
+
+
+async def arun_coalesced(view, request, args, kwargs):
+    fingerprint = request_hash(request, await arequest_user_id(request))
+    deadline = time.monotonic() + wait_seconds()
+
+    while True:
+        entry, leader = join_in_flight(fingerprint)
+        if leader:
+            break
+        while not entry.event.is_set() and time.monotonic() < deadline:
+            await asyncio.sleep(POLL_SECONDS)
+        if entry.result is not None:
+            return stored_response(*entry.result)
+        if time.monotonic() >= deadline:
+            return in_progress_response()
+
+    try:
+        response = await view(request, *args, **kwargs)
+    except Exception:
+        leave_in_flight(fingerprint, entry)
+        raise
+    return await arecord_response(response, lambda *result: leave_in_flight(fingerprint, entry, *result))
+
+
+def idempotent(view):
+    """
+    Make a POST view safe to retry with an Idempotency-Key (works for async views too)
+    """
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            key = request_key(request)
+            if key:
+                return await arun_keyed(view, request, args, kwargs, key)
+            return await arun_coalesced(view, request, args, kwargs)
+    else:
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            key = request_key(request)
+            if key:
+                return run_keyed(view, request, args, kwargs, key)
+            return run_coalesced(view, request, args, kwargs)
+    return wrapper
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from api.session_eviction import expire_idle_sessions, session_stats
+
+
+class Command(BaseCommand):
+    help = 'Expire abandoned interview sessions and report live session memory'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-live', type=int, default=None,
+                            help='Also expire the least recently active sessions beyond this many')
+        parser.add_argument('--no-evaluate', action='store_true',
+                            help="Don't queue evaluations of the partial transcripts")
+
+    def handle(self, *args, **options):
+        counts = expire_idle_sessions(
+            max_live=options['max_live'],
+            evaluate=False if options['no_evaluate'] else None
+        )
+        stats = session_stats()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ Expired {counts['idle']} idle and {counts['lru']} least recently used sessions"
+        ))
+        self.stdout.write(f"{stats['live_sessions']} sessions live, about {stats['approx_bytes']} bytes")
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('interviews', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InterviewSession',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('context', models.JSONField()),
+                ('conversation', models.JSONField(default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('attempt', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='live_session', to='interviews.interviewattempt')),
+            ],
+        ),
+    ]
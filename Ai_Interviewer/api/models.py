@@ -1,3 +1,57 @@
+from django.conf import settings
 from django.db import models
 
 # Create your models here.
+from interviews.models import InterviewAttempt
+
+
+class InterviewSession(models.Model):
+    """
+    Live interview state shared by every worker process
+    """
+    attempt = models.OneToOneField(InterviewAttempt, on_delete=models.CASCADE, related_name='live_session')
+    context = models.JSONField()
+    conversation = models.JSONField(default=list)
+    summary = models.TextField(blank=True)  # Running summary of older turns
+    summarized_upto = models.PositiveIntegerField(default=0)  # Turns before this index are in the summary
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Session for {self.attempt}"
+
+
+class IdempotencyRecord(models.Model):
+    """
+    Stored response for an Idempotency-Key sent to a session endpoint
+    """
+    STATUS_CHOICES = (
+        ('IN_PROGRESS', 'In Progress'),
+        ('COMPLETED', 'Completed'),
+    )
+    
+    # Keys are per user, so one user's key never replays another user's response
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    endpoint = models.CharField(max_length=200)
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)  # Same key with a different body is rejected
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='IN_PROGRESS')
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    content_type = models.CharField(max_length=100, blank=True)
+    body = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'endpoint', 'key'], name='unique_idempotency_key'),
+            models.UniqueConstraint(
+                fields=['endpoint', 'key'], condition=models.Q(user__isnull=True),
+                name='unique_anonymous_idempotency_key'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.endpoint} [{self.key}] {self.status}"
@@ -0,0 +1,154 @@
+"""
+Expiry of abandoned interview sessions.
+
+A live session whose interview has seen no turn for longer than the
+interview's duration_minutes plus INTERVIEW_SESSION_IDLE_GRACE_MINUTES is
+expired: its attempt is marked EXPIRED, the transcript so far is saved and,
+if the candidate answered at least once and
+INTERVIEW_EVALUATE_EXPIRED_SESSIONS is on, the partial transcript is queued
+for evaluation. If more than INTERVIEW_SESSION_MAX_LIVE sessions are still
+live after that, the least recently active ones are expired the same way.
+
+Sweeps run in a background thread at most every
+INTERVIEW_SESSION_SWEEP_INTERVAL_SECONDS when sessions start, and on demand
+with: python manage.py expire_idle_sessions
+"""
+import threading
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+from interviews.evaluation_queue import enqueue_evaluation
+from interviews.models import InterviewAttempt
+from interviews.transcript import transcript_buffer
+from .session_lock import SessionBusy, get_session_locks
+from .session_store import get_session_store
+
+_sweep_lock = threading.Lock()
+_last_sweep = None
+_sweeping = False
+_expired = {'idle': 0, 'lru': 0}
+
+
+def idle_deadline(attempt, last_activity):
+    """
+    Time after which a session with no further turns is considered abandoned
+    """
+    grace = getattr(settings, 'INTERVIEW_SESSION_IDLE_GRACE_MINUTES', 10)
+    return last_activity + timedelta(minutes=attempt.interview.duration_minutes + grace)
+
+
+def expire_session(attempt_id, evaluate=None):
+    """
+    End an abandoned session, returning False if it is gone or a turn is running
+    """
+    if evaluate is None:
+        evaluate = getattr(settings, 'INTERVIEW_EVALUATE_EXPIRED_SESSIONS', True)
+    session_store = get_session_store()
+
+    try:
+        # Never expire a session in the middle of a turn
+        with get_session_locks().hold(attempt_id, timeout=0):
+            session = session_store.get(attempt_id)
+            if session is None:
+                return False
+
+            expired = InterviewAttempt.objects.filter(id=attempt_id, status='IN_PROGRESS').update(
+                status='EXPIRED',
+                completed_at=timezone.now()
+            )
+
+            transcript_buffer.finalize(attempt_id, session['conversation'])
+            answered = any(turn['role'] != 'ai' for turn in session['conversation'])
+            if expired and evaluate and answered:
+                attempt = InterviewAttempt.objects.get(id=attempt_id)
+                enqueue_evaluation(attempt, session['context'], session['conversation'])
+
+            session_store.delete(attempt_id)
+            return True
+    except SessionBusy:
+        return False
+
+
+def expire_idle_sessions(now=None, max_live=None, evaluate=None):
+    """
+    Expire idle sessions, then the least recently active ones over the limit.
+
+    Returns {'idle': n, 'lru': n}, the number of sessions expired for each reason.
+    """
+    now = now or timezone.now()
+    max_live = max_live if max_live is not None else getattr(settings, 'INTERVIEW_SESSION_MAX_LIVE', None)
+
+    activity = get_session_store().activity()
+    attempts = InterviewAttempt.objects.select_related('interview').in_bulk(list(activity))
+
+    idle = []
+    live = []
+    for attempt_id, last_activity in activity.items():
+        attempt = attempts.get(int(attempt_id))
+        # Sessions whose attempt was deleted or already ended are dropped as idle
+        if attempt is None or attempt.status != 'IN_PROGRESS' or idle_deadline(attempt, last_activity) <= now:
+            idle.append(attempt_id)
+        else:
+            live.append((last_activity, attempt_id))
+
+    over_limit = []
+    if max_live is not None and len(live) > max_live:
+        live.sort()
+        over_limit = [attempt_id for _, attempt_id in live[:len(live) - max_live]]
+
+    counts = {
+        'idle': sum(1 for attempt_id in idle if expire_session(attempt_id, evaluate)),
+        'lru': sum(1 for attempt_id in over_limit if expire_session(attempt_id, evaluate)),
+    }
+
+    with _sweep_lock:
+        for reason, count in counts.items():
+            _expired[reason] += count
+    return counts
+
+
+def sweep():
+    global _sweeping
+
+    try:
+        counts = expire_idle_sessions()
+        if counts['idle'] or counts['lru']:
+            print(f"✓ Expired {counts['idle']} idle and {counts['lru']} least recently used interview sessions")
+    except Exception as e:
+        print(f"✗ Failed to expire idle sessions: {e}")
+    finally:
+        with _sweep_lock:
+            _sweeping = False
+        connection.close()
+
+
+def schedule_sweep():
+    """
+    Start a background sweep unless one ran within INTERVIEW_SESSION_SWEEP_INTERVAL_SECONDS
+    """
+    global _last_sweep, _sweeping
+
+    interval = getattr(settings, 'INTERVIEW_SESSION_SWEEP_INTERVAL_SECONDS', 60)
+    with _sweep_lock:
+        if _sweeping or (_last_sweep is not None and time.monotonic() - _last_sweep < interval):
+            return False
+        _sweeping = True
+        _last_sweep = time.monotonic()
+
+    threading.Thread(target=sweep, daemon=True).start()
+    return True
+
+
+def session_stats():
+    """
+    Live session count and size, for sizing workers
+    """
+    with _sweep_lock:
+        expired = dict(_expired)
+    return {
+        **get_session_store().stats(),
+        'max_live': getattr(settings, 'INTERVIEW_SESSION_MAX_LIVE', None),
+        'expired': expired,
+    }
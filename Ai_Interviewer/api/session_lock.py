@@ -0,0 +1,153 @@
+"""
+Per-session ordering of interview turns.
+
+Each turn reads the conversation, asks the model and appends the exchange.
+Two turns of the same interview running at once would both answer from the
+same history and interleave their appends, so every session call holds that
+session's lock from reading the conversation until its exchange is stored
+(for streamed replies, until the stream ends). Only turns of the same
+session wait for each other; different sessions never share a lock.
+
+The lock is a lease in the Django cache, like the shared LLM admission
+slots, so it serializes turns across workers when the cache is shared
+(Redis, Memcached or the database cache) and within the process otherwise;
+the api.E001 check refuses a per-process cache with DatabaseSessionStore.
+A lease expires after INTERVIEW_TURN_LOCK_LEASE_SECONDS, so a worker that
+dies, or a stream that is never read, cannot block a session for good. A
+caller that cannot get the lock within INTERVIEW_TURN_LOCK_WAIT_SECONDS
+gets SessionBusy.
+
+Turns are numbered by their position in the conversation. Clients may send
+the sequence number their message should get; a message sent against a
+conversation that has moved on is rejected instead of being answered out of
+order.
+"""
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager, contextmanager
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+# Seconds between attempts to lease the shared lock
+LEASE_POLL_SECONDS = 0.05
+
+
+class SessionBusy(Exception):
+    """
+    Raised when another turn of the same session holds its lock for too long
+    """
+
+    def __init__(self, message, retry_after=1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class SessionLocks:
+    """
+    Leases one lock per live session from the shared cache
+    """
+
+    def __init__(self, max_wait=None, lease_seconds=None):
+        self.max_wait = max_wait or getattr(settings, 'INTERVIEW_TURN_LOCK_WAIT_SECONDS', 30)
+        self.lease_seconds = lease_seconds or getattr(settings, 'INTERVIEW_TURN_LOCK_LEASE_SECONDS', 120)
+        self._lock = threading.Lock()
+        self._held = 0
+        self._waiting = 0
+        self._contended = 0
+        self._rejected = 0
+
+    def acquire(self, attempt_id, timeout=None):
+        """
+        Wait for the session's lock, returning a ticket to pass to release()
+        """
+        key = f"interview_session_lock:{attempt_id}"
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + (timeout if timeout is not None else self.max_wait)
+
+        if not cache.add(key, token, self.lease_seconds):
+            with self._lock:
+                self._waiting += 1
+                self._contended += 1
+            try:
+                while not cache.add(key, token, self.lease_seconds):
+                    if time.monotonic() >= deadline:
+                        with self._lock:
+                            self._rejected += 1
+                        raise SessionBusy('Another message for this interview is still being answered')
+                    time.sleep(LEASE_POLL_SECONDS)
+            finally:
+                with self._lock:
+                    self._waiting -= 1
+
+        with self._lock:
+            self._held += 1
+        return {'key': key, 'token': token, 'released': False}
+
+    def release(self, ticket):
+        """
+        Release a lock; releasing the same ticket again does nothing
+        """
+        with self._lock:
+            if ticket['released']:
+                return
+            ticket['released'] = True
+            self._held -= 1
+
+        if cache.get(ticket['key']) == ticket['token']:
+            cache.delete(ticket['key'])
+
+    @contextmanager
+    def hold(self, attempt_id, timeout=None):
+        """
+        Hold the session's lock for the duration of a with-block
+        """
+        ticket = self.acquire(attempt_id, timeout)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    async def aacquire(self, attempt_id, timeout=None):
+        return await sync_to_async(self.acquire, thread_sensitive=False)(attempt_id, timeout)
+
+    async def arelease(self, ticket):
+        return await sync_to_async(self.release, thread_sensitive=False)(ticket)
+
+    @asynccontextmanager
+    async def ahold(self, attempt_id, timeout=None):
+        """
+        Async version of hold()
+        """
+        ticket = await self.aacquire(attempt_id, timeout)
+        try:
+            yield ticket
+        finally:
+            await self.arelease(ticket)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'held': self._held,
+                'waiting': self._waiting,
+                'contended': self._contended,
+                'rejected': self._rejected,
+            }
+
+
+_session_locks = None
+_session_locks_lock = threading.Lock()
+
+
+def get_session_locks():
+    """
+    Return the session locks shared by this worker process
+    """
+    global _session_locks
+
+    if _session_locks is None:
+        with _session_locks_lock:
+            if _session_locks is None:
+                _session_locks = SessionLocks()
+    return _session_locks
@@ -0,0 +1,225 @@
+"""
+Pluggable storage for live interview sessions.
+
+A session is the interview context, the conversation so far and a running
+summary of older turns (see interviews.context_window). Nothing
+process-local is kept between requests: every turn rebuilds the Gemini chat
+from the stored history, so any worker can serve any turn. The backend is
+chosen with the INTERVIEW_SESSION_STORE setting. Idle sessions are expired
+by api.session_eviction.
+"""
+import copy
+import json
+import threading
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Sum, TextField
+from django.db.models.functions import Cast, Length
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from .models import InterviewSession
+
+
+class BaseSessionStore:
+    """
+    Interface every session store backend implements
+    """
+
+    def create(self, attempt_id, context, conversation):
+        """
+        Store a new session, replacing any existing one for the attempt
+        """
+        raise NotImplementedError
+
+    def get(self, attempt_id):
+        """
+        Return {'context', 'conversation', 'summary', 'summarized_upto'} or None
+        """
+        raise NotImplementedError
+
+    def append(self, attempt_id, *messages, at=None):
+        """
+        Append messages to the conversation. Returns False if the session is
+        gone, or if `at` is given and the conversation no longer has that length.
+        """
+        raise NotImplementedError
+
+    def update_summary(self, attempt_id, summary, summarized_upto):
+        """
+        Replace the running summary of turns before summarized_upto
+        """
+        raise NotImplementedError
+
+    def delete(self, attempt_id):
+        """
+        Remove the session if it exists
+        """
+        raise NotImplementedError
+
+    def activity(self):
+        """
+        Return {attempt_id: time of the last change} for every live session
+        """
+        raise NotImplementedError
+
+    def stats(self):
+        """
+        Return the number of live sessions and their approximate size in bytes
+        """
+        raise NotImplementedError
+
+    def __contains__(self, attempt_id):
+        return self.get(attempt_id) is not None
+
+    async def acreate(self, attempt_id, context, conversation):
+        return await sync_to_async(self.create)(attempt_id, context, conversation)
+
+    async def aget(self, attempt_id):
+        return await sync_to_async(self.get)(attempt_id)
+
+    async def aappend(self, attempt_id, *messages, at=None):
+        return await sync_to_async(self.append)(attempt_id, *messages, at=at)
+
+    async def adelete(self, attempt_id):
+        return await sync_to_async(self.delete)(attempt_id)
+
+
+class InMemorySessionStore(BaseSessionStore):
+    """
+    Sessions kept in this process only. Suitable for a single dev server.
+    """
+
+    def __init__(self):
+        self._sessions = {}
+        self._last_activity = {}
+        self._lock = threading.Lock()
+
+    def create(self, attempt_id, context, conversation):
+        with self._lock:
+            self._sessions[str(attempt_id)] = {
+                'context': context,
+                'conversation': list(conversation),
+                'summary': '',
+                'summarized_upto': 0,
+            }
+            self._last_activity[str(attempt_id)] = timezone.now()
+
+    def get(self, attempt_id):
+        with self._lock:
+            session = self._sessions.get(str(attempt_id))
+            return copy.deepcopy(session) if session is not None else None
+
+    def append(self, attempt_id, *messages, at=None):
+        with self._lock:
+            session = self._sessions.get(str(attempt_id))
+            if session is None:
+                return False
+            if at is not None and len(session['conversation']) != at:
+                return False
+            session['conversation'].extend(messages)
+            self._last_activity[str(attempt_id)] = timezone.now()
+            return True
+
+    def update_summary(self, attempt_id, summary, summarized_upto):
+        with self._lock:
+            session = self._sessions.get(str(attempt_id))
+            if session is not None:
+                session['summary'] = summary
+                session['summarized_upto'] = summarized_upto
+
+    def delete(self, attempt_id):
+        with self._lock:
+            self._sessions.pop(str(attempt_id), None)
+            self._last_activity.pop(str(attempt_id), None)
+
+    def activity(self):
+        with self._lock:
+            return dict(self._last_activity)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'live_sessions': len(self._sessions),
+                'approx_bytes': sum(len(json.dumps(session)) for session in self._sessions.values()),
+            }
+
+
+class DatabaseSessionStore(BaseSessionStore):
+    """
+    Sessions stored in the InterviewSession table, shared by all workers
+    """
+
+    def create(self, attempt_id, context, conversation):
+        InterviewSession.objects.update_or_create(
+            attempt_id=attempt_id,
+            defaults={
+                'context': context,
+                'conversation': list(conversation),
+                'summary': '',
+                'summarized_upto': 0,
+            }
+        )
+
+    def get(self, attempt_id):
+        return InterviewSession.objects.filter(attempt_id=attempt_id).values(
+            'context', 'conversation', 'summary', 'summarized_upto'
+        ).first()
+
+    def append(self, attempt_id, *messages, at=None):
+        with transaction.atomic():
+            session = InterviewSession.objects.select_for_update().filter(attempt_id=attempt_id).first()
+            if session is None:
+                return False
+            if at is not None and len(session.conversation) != at:
+                return False
+            session.conversation = session.conversation + list(messages)
+            session.save(update_fields=['conversation', 'updated_at'])
+            return True
+
+    def update_summary(self, attempt_id, summary, summarized_upto):
+        InterviewSession.objects.filter(attempt_id=attempt_id).update(
+            summary=summary,
+            summarized_upto=summarized_upto
+        )
+
+    def delete(self, attempt_id):
+        InterviewSession.objects.filter(attempt_id=attempt_id).delete()
+
+    def activity(self):
+        return {
+            str(attempt_id): updated_at
+            for attempt_id, updated_at in InterviewSession.objects.values_list('attempt_id', 'updated_at')
+        }
+
+    def stats(self):
+        totals = InterviewSession.objects.aggregate(
+            live_sessions=Count('id'),
+            approx_bytes=Sum(
+                Length(Cast('context', TextField()))
+                + Length(Cast('conversation', TextField()))
+                + Length('summary')
+            ),
+        )
+        return {
+            'live_sessions': totals['live_sessions'],
+            'approx_bytes': totals['approx_bytes'] or 0,
+        }
+
+
+_session_store = None
+_session_store_lock = threading.Lock()
+
+
+def get_session_store():
+    """
+    Return the session store configured by INTERVIEW_SESSION_STORE
+    """
+    global _session_store
+
+    if _session_store is None:
+        with _session_store_lock:
+            if _session_store is None:
+                backend = getattr(settings, 'INTERVIEW_SESSION_STORE', 'api.session_store.DatabaseSessionStore')
+                _session_store = import_string(backend)()
+    return _session_store
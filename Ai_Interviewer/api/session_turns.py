@@ -0,0 +1,333 @@
+"""
+Session operations shared by every interview transport.
+
+The HTTP views (views.py), the async views (async_views.py) and the
+websocket (websocket.py) start, answer and end sessions the same way; only
+how they wait and how they reply differs. This module holds what they share:
+starting or resuming a session under its lock, loading a turn (the session
+lookup, the sequence check and the chat rebuilt from the stored
+conversation), storing the answered exchange, and ending the interview and
+queueing its evaluation. Each operation has a sync version and an async
+one with an `a` prefix.
+
+A session that does not exist raises SessionNotFound and a message that
+no longer matches the conversation raises OutOfOrder; callers turn these
+into their own error responses.
+"""
+import threading
+import time
+from asgiref.sync import sync_to_async
+from django.utils import timezone
+from interviews.context_window import schedule_fold
+from interviews.evaluation_queue import aenqueue_evaluation, enqueue_evaluation
+from interviews.gemini_service import GeminiInterviewService
+from interviews.models import InterviewAttempt
+from interviews.opening import aget_opening, get_opening
+from interviews.prompt_cache import aget_compiled_interview, get_compiled_interview
+from interviews.transcript import build_turn, transcript_buffer
+from .session_eviction import schedule_sweep
+from .session_lock import get_session_locks
+from .session_store import get_session_store
+
+
+class SessionNotFound(Exception):
+    """
+    Raised for a turn or end of a session that was never started or has ended
+    """
+
+
+class OutOfOrder(Exception):
+    """
+    Raised for a message sent against a conversation that has moved on
+    """
+
+    def __init__(self, position):
+        super().__init__('The conversation has moved on. Please reload the interview.')
+        # Sequence number of the last turn the conversation holds
+        self.sequence = position - 1
+
+
+def conversation_turns(conversation):
+    """
+    The conversation as sent to clients that resume a session
+    """
+    return [
+        {'role': turn['role'], 'message': turn['message'], 'sequence': sequence}
+        for sequence, turn in enumerate(conversation)
+    ]
+
+
+def start_session(attempt):
+    """
+    Start the attempt's session with the opening greeting, or resume it.
+
+    Returns (conversation, resumed); conversation is None if the greeting
+    could not be generated.
+    """
+    # Expire abandoned sessions in the background now and then
+    schedule_sweep()
+
+    session_store = get_session_store()
+    with get_session_locks().hold(attempt.id):
+        # A reload picks the running session back up instead of starting over
+        session = session_store.get(attempt.id)
+        if session is not None:
+            return session['conversation'], True
+
+        # Replay the stored opening greeting (generated only if missing or stale)
+        context = get_compiled_interview(attempt.interview)['context']
+        result = get_opening(attempt.interview, context)
+        if not result['success']:
+            return None, False
+
+        conversation = [build_turn('ai', result['message'], result['usage'])]
+        session_store.create(attempt.id, context, conversation)
+        transcript_buffer.add(attempt.id, 0, *conversation)
+    return conversation, False
+
+
+async def astart_session(attempt):
+    """
+    Async version of start_session
+    """
+    schedule_sweep()
+
+    session_store = get_session_store()
+    async with get_session_locks().ahold(attempt.id):
+        session = await session_store.aget(attempt.id)
+        if session is not None:
+            return session['conversation'], True
+
+        context = (await aget_compiled_interview(attempt.interview))['context']
+        result = await aget_opening(attempt.interview, context)
+        if not result['success']:
+            return None, False
+
+        conversation = [build_turn('ai', result['message'], result['usage'])]
+        await session_store.acreate(attempt.id, context, conversation)
+        await transcript_buffer.aadd(attempt.id, 0, *conversation)
+    return conversation, False
+
+
+class Turn:
+    """
+    One candidate message being answered.
+
+    Load it with load_turn() or aload_turn() while holding the session lock:
+    it keeps the session as read, the position the message takes in the
+    conversation and a chat rebuilt from the stored conversation.
+    """
+
+    def __init__(self, attempt_id, session, user_message, sequence=None):
+        if session is None:
+            raise SessionNotFound('Session not found. Please start the interview first.')
+
+        self.attempt_id = attempt_id
+        self.session = session
+        self.position = len(session['conversation'])
+        if sequence is not None and sequence != self.position:
+            raise OutOfOrder(self.position)
+
+        self.user_message = user_message
+        self.user_turn = build_turn('user', user_message)
+        self.turns = None
+
+        self.gemini_service = GeminiInterviewService()
+        self.gemini_service.resume_interview(
+            session['context'], session['conversation'],
+            session['summary'], session['summarized_upto']
+        )
+
+    def exchange(self, message, usage):
+        return [self.user_turn, build_turn('ai', message, usage)]
+
+    def record(self, message, usage):
+        """
+        Add the exchange to the conversation and transcript
+        """
+        turns = self.exchange(message, usage)
+        if not get_session_store().append(self.attempt_id, *turns, at=self.position):
+            raise OutOfOrder(self.position)
+        transcript_buffer.add(self.attempt_id, self.position, *turns)
+        self.turns = turns
+
+    async def arecord(self, message, usage):
+        turns = self.exchange(message, usage)
+        if not await get_session_store().aappend(self.attempt_id, *turns, at=self.position):
+            raise OutOfOrder(self.position)
+        await transcript_buffer.aadd(self.attempt_id, self.position, *turns)
+        self.turns = turns
+
+    def fold(self):
+        """
+        Fold older turns into the summary in the background once the context budget is crossed.
+        Call it after the session lock and LLM slot are released.
+        """
+        schedule_fold(
+            self.gemini_service, get_session_store(), self.attempt_id,
+            self.session, self.session['conversation'] + self.turns
+        )
+
+
+def load_turn(attempt_id, user_message, sequence=None):
+    return Turn(attempt_id, get_session_store().get(attempt_id), user_message, sequence)
+
+
+async def aload_turn(attempt_id, user_message, sequence=None):
+    session = await get_session_store().aget(attempt_id)
+    # Rebuilding the chat reads the compiled prompt from the cache, which may be the database
+    return await sync_to_async(Turn)(attempt_id, session, user_message, sequence)
+
+
+class StreamedReply:
+    """
+    A reply arriving token by token, timed from when it was asked for
+    """
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.first_token_ms = None
+        self.parts = []
+
+    def add(self, token):
+        if self.first_token_ms is None:
+            self.first_token_ms = int((time.monotonic() - self.started) * 1000)
+        self.parts.append(token)
+
+    @property
+    def message(self):
+        return ''.join(self.parts)
+
+    def done(self, turn):
+        """
+        The done event for the recorded turn
+        """
+        return {
+            'message': self.message,
+            'usage': turn.gemini_service.last_usage,
+            'sequence': turn.position + 1,
+            'ttft_ms': self.first_token_ms,
+            'total_ms': int((time.monotonic() - self.started) * 1000)
+        }
+
+
+def end_session(attempt):
+    """
+    End the interview and queue its evaluation, returning the EvaluationJob
+    """
+    session_store = get_session_store()
+
+    # Wait for a turn that is still being answered so it makes the transcript
+    with get_session_locks().hold(attempt.id):
+        session = session_store.get(attempt.id)
+        if session is None:
+            raise SessionNotFound('Session not found')
+
+        attempt.status = 'COMPLETED'
+        attempt.completed_at = timezone.now()
+        attempt.save(update_fields=['status', 'completed_at'])
+
+        # Persist the full transcript and queue the evaluation
+        transcript_buffer.finalize(attempt.id, session['conversation'])
+        job = enqueue_evaluation(attempt, session['context'], session['conversation'])
+        session_store.delete(attempt.id)
+    return job
+
+
+async def aend_session(attempt):
+    """
+    Async version of end_session
+    """
+    session_store = get_session_store()
+
+    async with get_session_locks().ahold(attempt.id):
+        session = await session_store.aget(attempt.id)
+        if session is None:
+            raise SessionNotFound('Session not found')
+
+        attempt.status = 'COMPLETED'
+        attempt.completed_at = timezone.now()
+        await attempt.asave(update_fields=['status', 'completed_at'])
+
+        await transcript_buffer.afinalize(attempt.id, session['conversation'])
+        job = await aenqueue_evaluation(attempt, session['context'], session['conversation'])
+        await session_store.adelete(attempt.id)
+    return job
+
+
+def session_attempt(attempt_id):
+    """
+    The attempt a session call names, for ending it
+    """
+    attempt = InterviewAttempt.objects.filter(id=attempt_id).first()
+    if attempt is None:
+        raise SessionNotFound('Session not found')
+    return attempt
+
+
+async def asession_attempt(attempt_id):
+    attempt = await InterviewAttempt.objects.filter(id=attempt_id).afirst()
+    if attempt is None:
+        raise SessionNotFound('Session not found')
+    return attempt
+
+
+class ReleasingStream:
+    """
+    Body of a streamed turn that frees what the turn holds exactly once: when
+    the stream ends, or when the server closes the response. A client that
+    disconnects before the body is read never starts the generator, so a
+    finally block inside it would leak the LLM slot and session lock.
+    """
+
+    def __init__(self, body, release):
+        self.body = body
+        self.release_turn = release
+        self._lock = threading.Lock()
+        self._released = False
+
+    def claim(self):
+        """
+        True for the first caller only
+        """
+        with self._lock:
+            released, self._released = self._released, True
+        return not released
+
+    def release(self):
+        if self.claim():
+            self.release_turn()
+
+    def __iter__(self):
+        try:
+            yield from self.body
+        finally:
+            self.release()
+
+    def close(self):
+        self.body.close()
+        self.release()
+
+
+class AsyncReleasingStream(ReleasingStream):
+    """
+    Async ReleasingStream: the end of the stream awaits arelease(), while
+    close(), which the ASGI handler runs in a thread after the response,
+    frees the turn with release() if the body was never read
+    """
+    __iter__ = None
+
+    def __init__(self, body, release, arelease):
+        super().__init__(body, release)
+        self.arelease_turn = arelease
+
+    async def __aiter__(self):
+        try:
+            async for chunk in self.body:
+                yield chunk
+        finally:
+            if self.claim():
+                await self.arelease_turn()
+
+    def close(self):
+        self.release()
@@ -1,3 +1,239 @@
-from django.test import TestCase
+import asyncio
+import json
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from accounts.models import User
+from interviews import admission, llm_backends
+from interviews.evaluation_queue import run_job
+from interviews.models import EvaluationCriteria, EvaluationJob, Interview, InterviewAttempt, InterviewResult
+from interviews.transcript import transcript_buffer
+from .checks import check_shared_cache
+from .session_turns import AsyncReleasingStream, ReleasingStream
 
-# Create your tests here.
+
+@override_settings(
+    INTERVIEW_LLM_BACKEND='local',
+    INTERVIEW_LLM_BACKEND_OPTIONS={'seed': 7, 'sleep': False},
+    INTERVIEW_SESSION_STORE='api.session_store.DatabaseSessionStore',
+)
+class LocalBackendInterviewTests(TestCase):
+    """
+    A whole interview through the session API on the offline LocalBackend
+    """
+
+    def setUp(self):
+        self.reset_backend()
+        self.addCleanup(self.reset_backend)
+        # Write buffered turns of sessions left open while the test database exists
+        self.addCleanup(transcript_buffer.flush)
+
+        hr = User.objects.create_user('hr', password='x', user_type='HR')
+        self.candidate = User.objects.create_user('candidate', password='x', user_type='CANDIDATE')
+        self.interview = Interview.objects.create(
+            title='Python Developer', description='Backend APIs', created_by=hr, status='ACTIVE'
+        )
+        EvaluationCriteria.objects.create(interview=self.interview, criterion_name='Tech', description='d', weight=3)
+        self.attempt = InterviewAttempt.objects.create(
+            interview=self.interview, candidate=self.candidate, status='IN_PROGRESS', started_at=timezone.now()
+        )
+        self.client.force_login(self.candidate)
+
+    def reset_backend(self):
+        llm_backends._llm_backend = None
+        admission._admission_controller = None
+
+    def post(self, path, **data):
+        return self.client.post(path, json.dumps({'attempt_id': self.attempt.id, **data}),
+                                content_type='application/json')
+
+    def test_start_send_stream_end_and_evaluate(self):
+        response = self.post('/api/start-session/')
+        self.assertEqual(response.status_code, 200)
+        opening = response.json()
+        self.assertTrue(opening['message'])
+        self.assertEqual(opening['sequence'], 0)
+        self.assertIsInstance(llm_backends.get_llm_backend(), llm_backends.LocalBackend)
+
+        response = self.post('/api/send-message/', message='I build Django APIs.', sequence=1)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['sequence'], 2)
+
+        response = self.post('/api/send-message/stream/', message='Mostly with PostgreSQL.', sequence=3)
+        self.assertEqual(response.status_code, 200)
+        events = b''.join(response.streaming_content).decode()
+        response.close()
+        self.assertIn('event: token', events)
+        self.assertIn('event: done', events)
+        self.assertNotIn('event: error', events)
+
+        # A reload resumes the running session with the whole transcript
+        resumed = self.post('/api/start-session/').json()
+        self.assertTrue(resumed['resumed'])
+        self.assertEqual(len(resumed['conversation']), 5)
+
+        response = self.post('/api/end-session/')
+        self.assertEqual(response.status_code, 202)
+        job = EvaluationJob.objects.get(id=response.json()['job_id'])
+        self.attempt.refresh_from_db()
+        self.assertEqual(self.attempt.status, 'COMPLETED')
+        self.assertEqual(self.attempt.messages.count(), 5)
+
+        self.assertTrue(run_job(job))
+        result = InterviewResult.objects.get(attempt=self.attempt)
+        self.assertTrue(1 <= result.overall_rating <= 10)
+        criterion = self.interview.criteria.get()
+        self.assertEqual(list(result.criterion_scores), [str(criterion.id)])
+        self.assertIsNotNone(result.weighted_score)
+
+        response = self.client.get(f'/interviews/candidate/result/{self.attempt.id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['result'], result)
+
+    def test_send_before_start(self):
+        response = self.post('/api/send-message/', message='Hello')
+        self.assertEqual(response.status_code, 404)
+
+    def test_replies_are_deterministic(self):
+        backend = llm_backends.get_llm_backend()
+        self.assertEqual(backend.seed, 7)
+        self.assertEqual(
+            backend.generate('Tell me about yourself').text,
+            llm_backends.LocalBackend(seed=7, sleep=False).generate('Tell me about yourself').text
+        )
+
+    def test_health_check_for_hr_only(self):
+        self.assertEqual(self.client.get('/api/health/').status_code, 403)
+        self.client.logout()
+        self.assertEqual(self.client.get('/api/health/').status_code, 403)
+
+        self.client.force_login(self.interview.created_by)
+        response = self.client.get('/api/health/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['healthy'])
+
+    def test_evaluation_status_for_candidate_and_hr(self):
+        self.post('/api/start-session/')
+        job_id = self.post('/api/end-session/').json()['job_id']
+        EvaluationJob.objects.filter(id=job_id).update(status='FAILED', last_error='Traceback ...')
+        path = f'/api/evaluation-status/{job_id}/'
+
+        response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'FAILED')
+        self.assertEqual(response.json()['error'], '')
+
+        self.client.force_login(User.objects.create_user('other', password='x', user_type='CANDIDATE'))
+        self.assertEqual(self.client.get(path).status_code, 404)
+        self.client.logout()
+        self.assertEqual(self.client.get(path).status_code, 404)
+
+        self.client.force_login(self.interview.created_by)
+        self.assertEqual(self.client.get(path).json()['error'], 'Traceback ...')
+
+    def test_submitted_result_keeps_criterion_scores(self):
+        criterion = self.interview.criteria.get()
+        response = self.post('/api/submit-result/', overall_rating=7, criterion_scores={'Tech': 8})
+        self.assertEqual(response.status_code, 200)
+        result = InterviewResult.objects.get(attempt=self.attempt)
+        self.assertEqual(result.criterion_scores, {str(criterion.id): 8.0})
+
+        # A resubmission without criterion scores leaves the stored ones alone
+        self.post('/api/submit-result/', overall_rating=6, feedback='Revised')
+        result.refresh_from_db()
+        self.assertEqual(result.overall_rating, 6)
+        self.assertEqual(result.criterion_scores, {str(criterion.id): 8.0})
+        self.assertIsNotNone(result.weighted_score)
+
+    def test_streamed_turn_frees_its_slot(self):
+        self.post('/api/start-session/')
+        controller = admission.get_admission_controller()
+
+        response = self.post('/api/send-message/stream/', message='Read to the end.')
+        self.assertEqual(controller.stats()['active'], 1)
+        b''.join(response.streaming_content)
+        response.close()
+        self.assertEqual(controller.stats()['active'], 0)
+
+        # Closed without being read: the slot and the session lock are freed all the same
+        response = self.post('/api/send-message/stream/', message='Never read.')
+        self.assertEqual(controller.stats()['active'], 1)
+        response.close()
+        self.assertEqual(controller.stats()['active'], 0)
+        self.assertEqual(self.post('/api/send-message/', message='Still there?').status_code, 200)
+
+
+class ReleasingStreamTests(SimpleTestCase):
+    """
+    A streamed turn's slot is released exactly once, however the stream ends
+    """
+
+    def setUp(self):
+        self.releases = []
+
+    def release(self):
+        self.releases.append('release')
+
+    async def arelease(self):
+        self.releases.append('arelease')
+
+    def body(self):
+        yield b'a'
+        yield b'b'
+
+    async def abody(self):
+        yield b'a'
+        yield b'b'
+
+    def test_read_then_closed(self):
+        stream = ReleasingStream(self.body(), self.release)
+        self.assertEqual(b''.join(stream), b'ab')
+        stream.close()
+        self.assertEqual(self.releases, ['release'])
+
+    def test_closed_unread(self):
+        stream = ReleasingStream(self.body(), self.release)
+        stream.close()
+        stream.close()
+        self.assertEqual(self.releases, ['release'])
+
+    def test_closed_part_way(self):
+        stream = ReleasingStream(self.body(), self.release)
+        chunks = iter(stream)
+        next(chunks)
+        stream.close()
+        chunks.close()
+        self.assertEqual(self.releases, ['release'])
+
+    def test_async_read_then_closed(self):
+        stream = AsyncReleasingStream(self.abody(), self.release, self.arelease)
+
+        async def read():
+            return b''.join([chunk async for chunk in stream])
+
+        self.assertEqual(asyncio.run(read()), b'ab')
+        stream.close()
+        self.assertEqual(self.releases, ['arelease'])
+
+    def test_async_closed_unread(self):
+        stream = AsyncReleasingStream(self.abody(), self.release, self.arelease)
+        stream.close()
+        stream.close()
+        self.assertEqual(self.releases, ['release'])
+
+
+class SharedCacheCheckTests(SimpleTestCase):
+    """
+    The database session store is refused with a per-process cache
+    """
+    LOCAL_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+    def test_configured_cache_is_shared(self):
+        self.assertEqual(check_shared_cache(None), [])
+
+    @override_settings(CACHES=LOCAL_CACHE, INTERVIEW_SESSION_STORE='api.session_store.DatabaseSessionStore')
+    def test_database_store_with_local_cache(self):
+        self.assertEqual([error.id for error in check_shared_cache(None)], ['api.E001'])
+
+    @override_settings(CACHES=LOCAL_CACHE, INTERVIEW_SESSION_STORE='api.session_store.InMemorySessionStore')
+    def test_in_memory_store_with_local_cache(self):
+        self.assertEqual(check_shared_cache(None), [])
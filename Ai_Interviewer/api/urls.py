@@ -1,10 +1,21 @@
 from django.urls import path
-from . import views
+from . import views, async_views
 
 urlpatterns = [
     path('start-session/', views.start_interview_session, name='start_session'),
     path('send-message/', views.send_interview_message, name='send_message'),
+    path('send-message/stream/', views.stream_interview_message, name='stream_message'),
     path('end-session/', views.end_interview_session, name='end_session'),
     path('submit-result/', views.submit_interview_result, name='submit_result'),
     path('interview-context/<int:attempt_id>/', views.get_interview_context, name='interview_context'),
+    path('evaluation-status/<int:job_id>/', views.evaluation_status, name='evaluation_status'),
+
+    # Async variants, for deployments served through the ASGI application
+    path('async/start-session/', async_views.start_interview_session, name='async_start_session'),
+    path('async/send-message/', async_views.send_interview_message, name='async_send_message'),
+    path('async/send-message/stream/', async_views.stream_interview_message, name='async_stream_message'),
+    path('async/end-session/', async_views.end_interview_session, name='async_end_session'),
+
+    path('health/', views.gemini_health, name='gemini_health'),
+    path('llm-stats/', views.llm_stats, name='llm_stats'),
 ]
\ No newline at end of file
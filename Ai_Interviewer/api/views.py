@@ -1,17 +1,117 @@
 from django.shortcuts import render
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.utils import timezone
-from interviews.models import InterviewAttempt, InterviewResult
-from interviews.gemini_service import GeminiInterviewService
+from interviews.models import InterviewAttempt, InterviewResult, EvaluationJob
+from interviews.scoring import clean_criterion_scores, score_criteria
+from interviews.prompt_cache import get_compiled_interview
+from interviews.llm_backends import get_llm_backend
+from interviews.routing import get_model_router
+from interviews.evaluation_cache import evaluation_cache
+from interviews.admission import AdmissionRejected, PRIORITY_TURN, get_admission_controller
+from .idempotency import idempotent
+from .session_lock import SessionBusy, get_session_locks
+from .session_eviction import session_stats
+from .session_turns import (
+    OutOfOrder, ReleasingStream, SessionNotFound, StreamedReply, conversation_turns, end_session, load_turn,
+    session_attempt, start_session
+)
 import json
 
-# Store active interview sessions (in production, use Redis or similar)
-active_sessions = {}
+
+def started_session_response(attempt_id, conversation, resumed):
+    """
+    Response for start-session: the greeting, or the whole conversation of a resumed session
+    """
+    if conversation is None:
+        return JsonResponse({
+            'success': False,
+            'error': 'Failed to start interview session'
+        }, status=500)
+    
+    response = {
+        'success': True,
+        'message': conversation[0]['message'],
+        'attempt_id': attempt_id,
+        'sequence': len(conversation) - 1
+    }
+    if resumed:
+        # A reload picks the running session back up instead of starting over
+        response.update(conversation=conversation_turns(conversation), resumed=True)
+    return JsonResponse(response)
+
+
+def candidate_attempts(user):
+    """
+    Attempts the logged-in user may start or resume: their own, none if anonymous
+    """
+    if not user.is_authenticated:
+        return InterviewAttempt.objects.none()
+    return InterviewAttempt.objects.filter(candidate=user)
+
+
+def hr_or_staff(user):
+    return user.is_authenticated and (user.is_staff or user.user_type == 'HR')
+
+
+def not_authorized_response():
+    return JsonResponse({
+        'success': False,
+        'error': 'Not authorized'
+    }, status=403)
+
+
+def not_in_progress_response():
+    return JsonResponse({
+        'success': False,
+        'error': 'This interview has already ended'
+    }, status=409)
+
+
+def session_busy_response(error):
+    """
+    409 response for a turn sent while another turn of the session is running
+    """
+    response = JsonResponse({
+        'success': False,
+        'error': str(error),
+        'retry_after': error.retry_after
+    }, status=409)
+    response['Retry-After'] = str(error.retry_after)
+    return response
+
+
+def session_not_found_response(error):
+    return JsonResponse({
+        'success': False,
+        'error': str(error)
+    }, status=404)
+
+
+def out_of_order_response():
+    return JsonResponse({
+        'success': False,
+        'error': 'The conversation has moved on. Please reload the interview.'
+    }, status=409)
+
+
+def busy_response(error):
+    """
+    429 response telling the client when to retry an LLM call
+    """
+    response = JsonResponse({
+        'success': False,
+        'error': 'The AI interviewer is busy right now. Please retry shortly.',
+        'retry_after': error.retry_after
+    }, status=429)
+    response['Retry-After'] = str(error.retry_after)
+    return response
+
 
 @csrf_exempt
 @require_http_methods(["POST"])
+@idempotent
 def start_interview_session(request):
     """
     Initialize Gemini interview session
@@ -20,57 +120,27 @@ def start_interview_session(request):
         data = json.loads(request.body)
         attempt_id = data.get('attempt_id')
         
-        # Get interview attempt and context
+        # Get interview attempt and context; only its candidate may start or resume it
         try:
-            attempt = InterviewAttempt.objects.select_related('interview').get(id=attempt_id)
+            attempt = candidate_attempts(request.user).select_related('interview').get(id=attempt_id)
         except InterviewAttempt.DoesNotExist:
             return JsonResponse({
                 'success': False,
                 'error': 'Interview attempt not found'
             }, status=404)
         
-        interview = attempt.interview
-        
-        # Prepare interview context
-        context = {
-            'interview_id': interview.id,
-            'title': interview.title,
-            'description': interview.description,
-            'duration_minutes': interview.duration_minutes,
-            'criteria': list(interview.criteria.values('criterion_name', 'description', 'weight')),
-            'skills': list(interview.expected_skills.values('skill_name', 'proficiency_level')),
-            'responsibilities': list(interview.responsibilities.values('responsibility')),
-        }
-        
-        # Create Gemini service instance
-        gemini_service = GeminiInterviewService()
-        result = gemini_service.start_interview(context)
+        if attempt.status != 'IN_PROGRESS':
+            return not_in_progress_response()
         
-        if result['success']:
-            # Store session
-            active_sessions[attempt_id] = {
-                'service': gemini_service,
-                'context': context,
-                'conversation': []
-            }
-            
-            # Add initial message to conversation
-            active_sessions[attempt_id]['conversation'].append({
-                'role': 'ai',
-                'message': result['message']
-            })
-            
-            return JsonResponse({
-                'success': True,
-                'message': result['message'],
-                'attempt_id': attempt_id
-            })
-        else:
-            return JsonResponse({
-                'success': False,
-                'error': 'Failed to start interview session'
-            }, status=500)
+        conversation, resumed = start_session(attempt)
+        return started_session_response(attempt.id, conversation, resumed)
+    
+    except SessionBusy as e:
+        return session_busy_response(e)
             
+    except AdmissionRejected as e:
+        return busy_response(e)
+    
     except Exception as e:
         return JsonResponse({
             'success': False,
@@ -80,6 +150,7 @@ def start_interview_session(request):
 
 @csrf_exempt
 @require_http_methods(["POST"])
+@idempotent
 def send_interview_message(request):
     """
     Send message to Gemini and get response
@@ -87,43 +158,43 @@ def send_interview_message(request):
     try:
         data = json.loads(request.body)
         attempt_id = data.get('attempt_id')
-        user_message = data.get('message')
         
-        if attempt_id not in active_sessions:
-            return JsonResponse({
-                'success': False,
-                'error': 'Session not found. Please start the interview first.'
-            }, status=404)
-        
-        session = active_sessions[attempt_id]
-        gemini_service = session['service']
-        
-        # Add user message to conversation
-        session['conversation'].append({
-            'role': 'user',
-            'message': user_message
-        })
-        
-        # Get AI response
-        result = gemini_service.send_message(user_message)
+        # Answer one turn of a session at a time, in order
+        with get_session_locks().hold(attempt_id):
+            turn = load_turn(attempt_id, data.get('message'), data.get('sequence'))
+            
+            # Get AI response
+            with get_admission_controller().slot(PRIORITY_TURN):
+                result = turn.gemini_service.send_message(turn.user_message)
+                if result['success']:
+                    turn.record(result['message'], result['usage'])
         
         if result['success']:
-            # Add AI response to conversation
-            session['conversation'].append({
-                'role': 'ai',
-                'message': result['message']
-            })
-            
+            turn.fold()
             return JsonResponse({
                 'success': True,
-                'message': result['message']
+                'message': result['message'],
+                'usage': result['usage'],
+                'sequence': turn.position + 1
             })
         else:
             return JsonResponse({
                 'success': False,
                 'error': result.get('error', 'Failed to get response')
             }, status=500)
+    
+    except SessionNotFound as e:
+        return session_not_found_response(e)
+    
+    except OutOfOrder:
+        return out_of_order_response()
+    
+    except SessionBusy as e:
+        return session_busy_response(e)
             
+    except AdmissionRejected as e:
+        return busy_response(e)
+    
     except Exception as e:
         return JsonResponse({
             'success': False,
@@ -131,74 +202,110 @@ def send_interview_message(request):
         }, status=500)
 
 
+def sse_event(event, data):
+    """
+    Format a single Server-Sent Events frame
+    """
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def event_stream_response(stream):
+    response = StreamingHttpResponse(stream, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 @csrf_exempt
 @require_http_methods(["POST"])
-def end_interview_session(request):
+@idempotent
+def stream_interview_message(request):
     """
-    End interview and generate evaluation
+    Send message to Gemini and stream the response as Server-Sent Events
     """
     try:
         data = json.loads(request.body)
-        attempt_id = data.get('attempt_id')
+    except json.JSONDecodeError:
+        return JsonResponse({
+            'success': False,
+            'error': 'Invalid JSON data'
+        }, status=400)
+    
+    attempt_id = data.get('attempt_id')
+    session_locks = get_session_locks()
+    
+    # Answer one turn of a session at a time, in order; the stream holds the lock until it ends
+    try:
+        lock_ticket = session_locks.acquire(attempt_id)
+    except SessionBusy as e:
+        return session_busy_response(e)
+    
+    streaming = False
+    try:
+        try:
+            turn = load_turn(attempt_id, data.get('message'), data.get('sequence'))
+        except SessionNotFound as e:
+            return session_not_found_response(e)
+        except OutOfOrder:
+            return out_of_order_response()
         
-        if attempt_id not in active_sessions:
-            return JsonResponse({
-                'success': False,
-                'error': 'Session not found'
-            }, status=404)
+        # Take the LLM slot before answering so a saturated server can still reply 429
+        admission = get_admission_controller()
+        try:
+            ticket = admission.acquire(PRIORITY_TURN)
+        except AdmissionRejected as e:
+            return busy_response(e)
         
-        session = active_sessions[attempt_id]
-        gemini_service = session['service']
-        context = session['context']
-        conversation = session['conversation']
+        def event_stream():
+            reply = StreamedReply()
+            try:
+                for token in turn.gemini_service.stream_message(turn.user_message):
+                    reply.add(token)
+                    yield sse_event('token', {'token': token})
+                turn.record(reply.message, turn.gemini_service.last_usage)
+            except Exception as e:
+                yield sse_event('error', {'error': str(e)})
+                return
+            
+            yield sse_event('done', reply.done(turn))
+            
+            # Fold older turns in the background, outside this turn's slot and lock
+            turn.fold()
         
-        # Format conversation history
-        conversation_text = "\n\n".join([
-            f"{'AI Interviewer' if msg['role'] == 'ai' else 'Candidate'}: {msg['message']}"
-            for msg in conversation
-        ])
+        def release():
+            admission.release(ticket)
+            session_locks.release(lock_ticket)
         
-        # Generate evaluation
-        evaluation_result = gemini_service.generate_evaluation(context, conversation_text)
+        response = event_stream_response(ReleasingStream(event_stream(), release))
+        streaming = True
+        return response
+    finally:
+        if not streaming:
+            session_locks.release(lock_ticket)
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+@idempotent
+def end_interview_session(request):
+    """
+    End interview and queue its evaluation
+    """
+    try:
+        data = json.loads(request.body)
+        job = end_session(session_attempt(data.get('attempt_id')))
         
-        if evaluation_result['success']:
-            evaluation = evaluation_result['evaluation']
-            
-            # Get interview attempt
-            attempt = InterviewAttempt.objects.get(id=attempt_id)
-            
-            # Update attempt status
-            attempt.status = 'COMPLETED'
-            attempt.completed_at = timezone.now()
-            attempt.save()
-            
-            # Save evaluation results
-            result = InterviewResult.objects.create(
-                attempt=attempt,
-                overall_rating=evaluation.get('overall_rating', 7.0),
-                technical_score=evaluation.get('technical_score'),
-                communication_score=evaluation.get('communication_score'),
-                problem_solving_score=evaluation.get('problem_solving_score'),
-                feedback=evaluation.get('feedback', ''),
-                strengths=evaluation.get('strengths', ''),
-                weaknesses=evaluation.get('weaknesses', ''),
-                recommendation=evaluation.get('recommendation', 'Under Review')
-            )
-            
-            # Clean up session
-            del active_sessions[attempt_id]
-            
-            return JsonResponse({
-                'success': True,
-                'message': 'Interview completed and evaluated',
-                'result_id': result.id,
-                'evaluation': evaluation
-            })
-        else:
-            return JsonResponse({
-                'success': False,
-                'error': evaluation_result.get('error', 'Failed to generate evaluation')
-            }, status=500)
+        return JsonResponse({
+            'success': True,
+            'message': 'Interview completed, evaluation queued',
+            'job_id': job.id
+        }, status=202)
+    
+    except SessionNotFound as e:
+        return session_not_found_response(e)
+    
+    except SessionBusy as e:
+        return session_busy_response(e)
             
     except Exception as e:
         return JsonResponse({
@@ -225,6 +332,16 @@ def submit_interview_result(request):
         strengths = data.get('strengths', '')
         weaknesses = data.get('weaknesses', '')
         recommendation = data.get('recommendation', 'Under Review')
+        criterion_scores = data.get('criterion_scores')
+        
+        if criterion_scores is not None:
+            try:
+                criterion_scores = clean_criterion_scores(criterion_scores)
+            except ValueError as e:
+                return JsonResponse({
+                    'success': False,
+                    'error': str(e)
+                }, status=400)
         
         # Get the interview attempt
         try:
@@ -241,19 +358,21 @@ def submit_interview_result(request):
         attempt.save()
         
         # Create or update result
-        result, created = InterviewResult.objects.update_or_create(
-            attempt=attempt,
-            defaults={
-                'overall_rating': overall_rating,
-                'technical_score': technical_score,
-                'communication_score': communication_score,
-                'problem_solving_score': problem_solving_score,
-                'feedback': feedback,
-                'strengths': strengths,
-                'weaknesses': weaknesses,
-                'recommendation': recommendation,
-            }
-        )
+        defaults = {
+            'overall_rating': overall_rating,
+            'technical_score': technical_score,
+            'communication_score': communication_score,
+            'problem_solving_score': problem_solving_score,
+            'feedback': feedback,
+            'strengths': strengths,
+            'weaknesses': weaknesses,
+            'recommendation': recommendation,
+        }
+        # Keep the stored criterion scores unless new ones are submitted
+        if criterion_scores is not None:
+            defaults.update(score_criteria(attempt.interview, criterion_scores))
+        
+        result, created = InterviewResult.objects.update_or_create(attempt=attempt, defaults=defaults)
         
         return JsonResponse({
             'success': True,
@@ -283,15 +402,7 @@ def get_interview_context(request, attempt_id):
         attempt = InterviewAttempt.objects.select_related('interview').get(id=attempt_id)
         interview = attempt.interview
         
-        context = {
-            'interview_id': interview.id,
-            'title': interview.title,
-            'description': interview.description,
-            'duration_minutes': interview.duration_minutes,
-            'criteria': list(interview.criteria.values('criterion_name', 'description', 'weight')),
-            'skills': list(interview.expected_skills.values('skill_name', 'proficiency_level')),
-            'responsibilities': list(interview.responsibilities.values('responsibility')),
-        }
+        context = get_compiled_interview(interview)['context']
         
         return JsonResponse({
             'success': True,
@@ -308,4 +419,80 @@ def get_interview_context(request, attempt_id):
         return JsonResponse({
             'success': False,
             'error': str(e)
-        }, status=500)
\ No newline at end of file
+        }, status=500)
+
+
+@require_http_methods(["GET"])
+def evaluation_status(request, job_id):
+    """
+    API endpoint to poll the status of a queued evaluation, for the
+    attempt's candidate and for HR
+    """
+    reviewer = hr_or_staff(request.user)
+    try:
+        job = EvaluationJob.objects.select_related('attempt').get(id=job_id)
+        if not (reviewer or job.attempt.candidate_id == request.user.id):
+            # Other users' jobs look the same as missing ones
+            raise EvaluationJob.DoesNotExist
+    except EvaluationJob.DoesNotExist:
+        return JsonResponse({
+            'success': False,
+            'error': 'Evaluation job not found'
+        }, status=404)
+    
+    result_id = None
+    if job.status == 'SUCCEEDED':
+        result_id = InterviewResult.objects.filter(attempt_id=job.attempt_id).values_list('id', flat=True).first()
+    
+    return JsonResponse({
+        'success': True,
+        'job_id': job.id,
+        'attempt_id': job.attempt_id,
+        'status': job.status,
+        'attempts': job.attempts,
+        # The worker's error may hold internals; the candidate only sees that it failed
+        'error': job.last_error if job.status == 'FAILED' and reviewer else '',
+        'result_id': result_id
+    })
+
+
+@require_http_methods(["GET"])
+def gemini_health(request):
+    """
+    Health check for the configured LLM backend, for HR and staff.
+    Every call probes the models, so it is not open to anyone.
+    """
+    if not hr_or_staff(request.user):
+        return not_authorized_response()
+    
+    try:
+        status = get_llm_backend().health_check()
+        return JsonResponse({
+            'success': status['healthy'],
+            **status,
+            'admission': get_admission_controller().stats()
+        }, status=200 if status['healthy'] else 503)
+
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=503)
+
+
+@require_http_methods(["GET"])
+def llm_stats(request):
+    """
+    Per-route model latency, error and token stats for tuning LLM_ROUTES
+    """
+    if not hr_or_staff(request.user):
+        return not_authorized_response()
+    
+    return JsonResponse({
+        'success': True,
+        'routes': get_model_router().stats(),
+        'admission': get_admission_controller().stats(),
+        'session_locks': get_session_locks().stats(),
+        'sessions': session_stats(),
+        'evaluation_cache': evaluation_cache.stats()
+    })
@@ -0,0 +1,281 @@
+"""
+WebSocket transport for interview sessions.
+
+A plain ASGI websocket handler, without Django Channels, mounted by
+ai_interviewer_project/asgi.py at /ws/interview/<attempt_id>/. The candidate
+is authenticated from the Django session cookie and the attempt loaded once
+per connection; after that every turn is a JSON frame on the open socket
+instead of a new HTTP request, and the server can push events.
+
+Client frames:
+    {"type": "start"}                                    start or resume the session
+    {"type": "message", "message": "...", "sequence": n}
+    {"type": "end"}                                      end the interview
+    {"type": "ping"}
+
+Server frames:
+    started {message, conversation, sequence, resumed}
+    typing, token {token}, done {message, usage, sequence, ttft_ms, total_ms}
+    time_remaining {seconds}, ended {job_id}, error {error, ...}, pong
+
+Turns follow the same rules as the HTTP API: one turn per session at a
+time under the session lock, admission control for the LLM call and
+sequence numbers against out-of-order messages. time_remaining is pushed
+every INTERVIEW_SOCKET_TICK_SECONDS once the session has started, and the
+interview is ended when it reaches zero.
+
+Frames are handled one at a time, in order, by a worker task, so the socket
+keeps receiving while a turn streams: ping is answered straight away, and a
+disconnect cancels the turn in progress instead of waiting for it.
+"""
+import asyncio
+import json
+import re
+from datetime import timedelta
+from importlib import import_module
+from types import SimpleNamespace
+from urllib.parse import urlparse
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.db import close_old_connections
+from django.http.cookie import parse_cookie
+from django.utils import timezone
+from interviews.admission import AdmissionRejected, PRIORITY_TURN, get_admission_controller
+from interviews.models import InterviewAttempt
+from .session_lock import SessionBusy, get_session_locks
+from .session_turns import OutOfOrder, StreamedReply, aend_session, aload_turn, astart_session, conversation_turns
+
+SOCKET_PATH = re.compile(r'^/ws/interview/(?P<attempt_id>\d+)/$')
+
+# Close codes sent instead of accepting the handshake
+CLOSE_NOT_FOUND = 4404
+CLOSE_FORBIDDEN = 4403
+
+
+def header(scope, name):
+    for key, value in scope.get('headers', []):
+        if key.decode('latin1').lower() == name:
+            return value.decode('latin1')
+    return None
+
+
+def origin_allowed(scope):
+    """
+    Reject cross-site pages opening a socket with the candidate's cookie
+    """
+    origin = header(scope, 'origin')
+    if origin is None:
+        return True
+    return urlparse(origin).netloc == header(scope, 'host') or origin in getattr(settings, 'CSRF_TRUSTED_ORIGINS', [])
+
+
+def load_attempt(scope, attempt_id):
+    """
+    The attempt, if it belongs to the user logged in with the session cookie
+    """
+    cookies = parse_cookie(header(scope, 'cookie') or '')
+    session = import_module(settings.SESSION_ENGINE).SessionStore(cookies.get(settings.SESSION_COOKIE_NAME))
+    user = get_user(SimpleNamespace(session=session))
+    if not user.is_authenticated:
+        return None
+    return InterviewAttempt.objects.select_related('interview').filter(id=attempt_id, candidate=user).first()
+
+
+class InterviewSocket:
+    """
+    One candidate's connection to one interview attempt
+    """
+
+    def __init__(self, scope, receive, send, attempt_id):
+        self.scope = scope
+        self.receive = receive
+        self.send = send
+        self.attempt_id = attempt_id
+        self.attempt = None
+        self.closed = False
+        self.ticker = None
+        self.worker = None
+        self.frames = asyncio.Queue()
+        self._send_lock = asyncio.Lock()
+
+    async def send_event(self, event, **data):
+        async with self._send_lock:
+            if not self.closed:
+                await self.send({'type': 'websocket.send', 'text': json.dumps({'type': event, **data})})
+
+    async def close(self, code=1000):
+        async with self._send_lock:
+            if not self.closed:
+                self.closed = True
+                await self.send({'type': 'websocket.close', 'code': code})
+
+    async def run(self):
+        message = await self.receive()
+        if message['type'] != 'websocket.connect':
+            return
+
+        await sync_to_async(close_old_connections)()
+        if origin_allowed(self.scope):
+            self.attempt = await sync_to_async(load_attempt)(self.scope, self.attempt_id)
+        if self.attempt is None:
+            await self.send({'type': 'websocket.close', 'code': CLOSE_FORBIDDEN})
+            return
+
+        await self.send({'type': 'websocket.accept'})
+        self.worker = asyncio.create_task(self.work())
+
+        try:
+            while True:
+                message = await self.receive()
+                if message['type'] == 'websocket.disconnect':
+                    break
+                if message['type'] != 'websocket.receive' or self.closed:
+                    continue
+
+                try:
+                    frame = json.loads(message.get('text') or message.get('bytes') or '')
+                except ValueError:
+                    await self.send_event('error', error='Invalid JSON data')
+                    continue
+
+                # Answered here so that a turn in progress doesn't hold it up
+                if isinstance(frame, dict) and frame.get('type') == 'ping':
+                    await self.send_event('pong')
+                    continue
+                self.frames.put_nowait(frame)
+        finally:
+            self.closed = True
+            for task in (self.ticker, self.worker):
+                if task is not None:
+                    task.cancel()
+            await sync_to_async(close_old_connections)()
+
+    async def work(self):
+        """
+        Handle queued frames one at a time, in the order they arrived
+        """
+        while True:
+            frame = await self.frames.get()
+            await self.handle(frame)
+
+    async def handle(self, frame):
+        kind = frame.get('type') if isinstance(frame, dict) else None
+
+        try:
+            if kind == 'start':
+                await self.start()
+            elif kind == 'message':
+                await self.turn(frame.get('message'), frame.get('sequence'))
+            elif kind == 'end':
+                await self.end()
+            else:
+                await self.send_event('error', error=f"Unknown frame type: {kind}")
+
+        except (SessionBusy, AdmissionRejected) as e:
+            await self.send_event('error', error=str(e), retry_after=e.retry_after)
+
+        except OutOfOrder as e:
+            await self.send_event('error', error=str(e), sequence=e.sequence)
+
+        except Exception as e:
+            await self.send_event('error', error=str(e))
+
+    async def start(self):
+        """
+        Start the session, or resume it after a reconnect
+        """
+        await self.attempt.arefresh_from_db(fields=['status'])
+        if self.attempt.status != 'IN_PROGRESS':
+            await self.send_event('error', error='This interview has already ended')
+            await self.close()
+            return
+
+        conversation, resumed = await astart_session(self.attempt)
+        if conversation is None:
+            await self.send_event('error', error='Failed to start interview session')
+            return
+
+        await self.send_event(
+            'started',
+            message=conversation[0]['message'],
+            conversation=conversation_turns(conversation),
+            sequence=len(conversation) - 1,
+            resumed=resumed
+        )
+
+        # Push the time left from now on
+        if self.ticker is None:
+            self.ticker = asyncio.create_task(self.tick())
+
+    async def turn(self, user_message, sequence=None):
+        """
+        Answer one candidate message, streaming the reply token by token
+        """
+        if not user_message:
+            await self.send_event('error', error='Message is empty')
+            return
+
+        # Answer one turn of a session at a time, in order
+        async with get_session_locks().ahold(self.attempt_id):
+            turn = await aload_turn(self.attempt_id, user_message, sequence)
+            await self.send_event('typing')
+
+            async with get_admission_controller().aslot(PRIORITY_TURN):
+                reply = StreamedReply()
+                try:
+                    async for token in turn.gemini_service.stream_message_async(user_message):
+                        reply.add(token)
+                        await self.send_event('token', token=token)
+                except Exception as e:
+                    await self.send_event('error', error=str(e))
+                    return
+
+            await turn.arecord(reply.message, turn.gemini_service.last_usage)
+            await self.send_event('done', **reply.done(turn))
+
+        # Fold older turns in the background, outside this turn's slot and lock
+        turn.fold()
+
+    async def end(self):
+        """
+        End the interview, queue its evaluation and close the socket
+        """
+        job = await aend_session(self.attempt)
+        await self.send_event('ended', job_id=job.id)
+        await self.close()
+
+    async def tick(self):
+        """
+        Push the time left, ending the interview when it runs out
+        """
+        if self.attempt.started_at is None:
+            return
+
+        deadline = self.attempt.started_at + timedelta(minutes=self.attempt.interview.duration_minutes)
+        interval = getattr(settings, 'INTERVIEW_SOCKET_TICK_SECONDS', 15)
+
+        try:
+            while not self.closed:
+                remaining = int((deadline - timezone.now()).total_seconds())
+                await self.send_event('time_remaining', seconds=max(0, remaining))
+                if remaining <= 0:
+                    # Queued behind a turn in progress, like a client's end frame
+                    self.frames.put_nowait({'type': 'end'})
+                    return
+                await asyncio.sleep(min(interval, remaining))
+        except Exception as e:
+            print(f"✗ Interview socket {self.attempt_id} stopped pushing time: {e}")
+
+
+async def websocket_application(scope, receive, send):
+    """
+    ASGI application for websocket connections
+    """
+    match = SOCKET_PATH.match(scope['path'])
+    if match is None:
+        await receive()
+        await send({'type': 'websocket.close', 'code': CLOSE_NOT_FOUND})
+        return
+
+    await InterviewSocket(scope, receive, send, int(match.group('attempt_id'))).run()
@@ -0,0 +1,368 @@
+"""
+Admission control for LLM calls.
+
+Every call to the model goes through an AdmissionController that caps how
+many calls run at once. Callers that cannot start immediately wait in a
+bounded priority queue: an in-progress interview turn goes before a new
+session start, which goes before a batch evaluation. When the queue is full
+or a caller has waited LLM_ADMISSION_MAX_WAIT_SECONDS, AdmissionRejected is
+raised with a Retry-After estimate so views can answer 429 straight away.
+
+The limit is per process. Setting LLM_ADMISSION_GLOBAL_LIMIT additionally
+leases one of that many slots from the shared Django cache for each call,
+which caps calls across all workers when the cache is shared (Redis,
+Memcached or the database cache). Evaluations may not lease the last
+LLM_ADMISSION_GLOBAL_RESERVED slots, which are kept for live interviews.
+
+Async callers wait on a future bound to their own event loop rather than on
+the condition, so a queued coroutine never occupies an executor thread and
+releasing a slot wakes it with call_soon_threadsafe, without a thread hop.
+"""
+import asyncio
+import heapq
+import itertools
+import math
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager, contextmanager
+from django.conf import settings
+from django.core.cache import cache
+
+# Lower values are admitted first
+PRIORITY_TURN = 0
+PRIORITY_START = 1
+PRIORITY_EVALUATION = 2
+
+PRIORITY_NAMES = {
+    PRIORITY_TURN: 'turn',
+    PRIORITY_START: 'start',
+    PRIORITY_EVALUATION: 'evaluation',
+}
+
+# Seconds between attempts to lease a shared slot
+GLOBAL_SLOT_POLL_SECONDS = 0.05
+
+
+class AdmissionRejected(Exception):
+    """
+    Raised when an LLM call cannot be admitted in time
+    """
+
+    def __init__(self, message, retry_after=1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class Waiter:
+    """
+    A caller queued for a slot
+    """
+
+    def __init__(self, priority, sequence, future=None):
+        self.priority = priority
+        self.sequence = sequence
+        self.admitted = False
+        self.rejected = False
+        # Set for async callers: resolved on their event loop when decided
+        self.future = future
+
+    def wake(self):
+        if self.future is not None:
+            self.future.get_loop().call_soon_threadsafe(resolve, self.future)
+
+    def __lt__(self, other):
+        return (self.priority, self.sequence) < (other.priority, other.sequence)
+
+
+class AdmissionController:
+    """
+    Bounded, prioritized concurrency limiter for LLM calls
+    """
+
+    def __init__(self, max_concurrent=None, max_queue=None, max_wait=None,
+                 global_limit=None, lease_seconds=None):
+        self.max_concurrent = max_concurrent or getattr(settings, 'LLM_ADMISSION_MAX_CONCURRENT', 8)
+        self.max_queue = max_queue if max_queue is not None else getattr(settings, 'LLM_ADMISSION_MAX_QUEUE', 32)
+        self.max_wait = max_wait or getattr(settings, 'LLM_ADMISSION_MAX_WAIT_SECONDS', 10)
+        self.global_limit = global_limit or getattr(settings, 'LLM_ADMISSION_GLOBAL_LIMIT', None)
+        self.lease_seconds = lease_seconds or getattr(settings, 'LLM_ADMISSION_LEASE_SECONDS', 120)
+        self.global_reserved = getattr(settings, 'LLM_ADMISSION_GLOBAL_RESERVED', 0)
+
+        self._condition = threading.Condition()
+        self._waiters = []
+        self._sequence = itertools.count()
+        self._active = 0
+        self._avg_hold = 2.0
+        self._admitted = 0
+        self._rejected = 0
+
+    def retry_after(self):
+        """
+        Estimate in whole seconds until a new caller could be admitted.
+        Caller must hold the condition.
+        """
+        ahead = len(self._waiters) + self._active
+        return max(1, math.ceil(self._avg_hold * ahead / self.max_concurrent))
+
+    def reject(self, reason):
+        self._rejected += 1
+        return AdmissionRejected(reason, self.retry_after())
+
+    def _admit_waiters(self):
+        """
+        Hand free slots to the best queued waiters. Caller must hold the condition.
+        """
+        while self._waiters and self._active < self.max_concurrent:
+            waiter = heapq.heappop(self._waiters)
+            waiter.admitted = True
+            self._active += 1
+            waiter.wake()
+        self._condition.notify_all()
+
+    def _try_admit(self):
+        """
+        Take a free slot if nobody is queued for one. Caller must hold the condition.
+        """
+        if self._active < self.max_concurrent and not self._waiters:
+            self._active += 1
+            self._admitted += 1
+            return True
+        return False
+
+    def _enqueue(self, priority, future=None):
+        """
+        Queue a new waiter. Caller must hold the condition.
+        """
+        if len(self._waiters) >= self.max_queue:
+            # A full queue gives way to a more urgent caller by dropping
+            # its least urgent waiter; otherwise the new caller is turned away
+            worst = max(self._waiters) if self._waiters else None
+            if worst is None or not priority < worst.priority:
+                raise self.reject('LLM queue is full')
+            self._waiters.remove(worst)
+            heapq.heapify(self._waiters)
+            worst.rejected = True
+            worst.wake()
+            self._condition.notify_all()
+
+        waiter = Waiter(priority, next(self._sequence), future)
+        heapq.heappush(self._waiters, waiter)
+        return waiter
+
+    def _dequeue(self, waiter):
+        """
+        Drop a waiter that gave up. Caller must hold the condition.
+        """
+        if waiter in self._waiters:
+            self._waiters.remove(waiter)
+            heapq.heapify(self._waiters)
+
+    def _acquire_local(self, priority, deadline):
+        with self._condition:
+            if self._try_admit():
+                return
+
+            waiter = self._enqueue(priority)
+            while not waiter.admitted:
+                remaining = deadline - time.monotonic()
+                if waiter.rejected:
+                    raise self.reject('Displaced by a higher priority request')
+                if remaining <= 0:
+                    self._dequeue(waiter)
+                    raise self.reject('Timed out waiting for an LLM slot')
+                self._condition.wait(remaining)
+
+            self._admitted += 1
+
+    async def _aacquire_local(self, priority, deadline):
+        """
+        Async _acquire_local(): waits on a future of the running loop, not a thread
+        """
+        with self._condition:
+            if self._try_admit():
+                return
+            waiter = self._enqueue(priority, asyncio.get_running_loop().create_future())
+
+        try:
+            await asyncio.wait_for(waiter.future, max(0, deadline - time.monotonic()))
+        except asyncio.TimeoutError:
+            pass
+        except asyncio.CancelledError:
+            with self._condition:
+                if waiter.admitted:
+                    # Admitted just as the caller went away; hand the slot on
+                    self._active -= 1
+                    self._admit_waiters()
+                else:
+                    self._dequeue(waiter)
+            raise
+
+        with self._condition:
+            # Admission may race the timeout; a slot already handed over is kept
+            if waiter.admitted:
+                self._admitted += 1
+                return
+            if waiter.rejected:
+                raise self.reject('Displaced by a higher priority request')
+            self._dequeue(waiter)
+            raise self.reject('Timed out waiting for an LLM slot')
+
+    def _release_local(self, held_for=None):
+        with self._condition:
+            self._active -= 1
+            if held_for is not None:
+                # Moving average of how long calls hold a slot, for Retry-After
+                self._avg_hold = 0.8 * self._avg_hold + 0.2 * held_for
+            self._admit_waiters()
+
+    def _lease_global(self, priority, deadline):
+        """
+        Lease one of the shared slots, returning its cache key and token
+        """
+        token = uuid.uuid4().hex
+        slots = self.global_limit
+        if priority >= PRIORITY_EVALUATION:
+            slots = max(1, slots - self.global_reserved)
+
+        while True:
+            for n in range(slots):
+                key = f"llm_admission_slot:{n}"
+                if cache.add(key, token, self.lease_seconds):
+                    return key, token
+
+            if time.monotonic() >= deadline:
+                with self._condition:
+                    raise self.reject('All shared LLM slots are busy')
+            time.sleep(GLOBAL_SLOT_POLL_SECONDS)
+
+    async def _alease_global(self, priority, deadline):
+        """
+        Async _lease_global(), polling without holding a thread
+        """
+        token = uuid.uuid4().hex
+        slots = self.global_limit
+        if priority >= PRIORITY_EVALUATION:
+            slots = max(1, slots - self.global_reserved)
+
+        while True:
+            for n in range(slots):
+                key = f"llm_admission_slot:{n}"
+                if await cache.aadd(key, token, self.lease_seconds):
+                    return key, token
+
+            if time.monotonic() >= deadline:
+                with self._condition:
+                    raise self.reject('All shared LLM slots are busy')
+            await asyncio.sleep(GLOBAL_SLOT_POLL_SECONDS)
+
+    def _release_global(self, lease):
+        key, token = lease
+        if cache.get(key) == token:
+            cache.delete(key)
+
+    def acquire(self, priority=PRIORITY_TURN, timeout=None):
+        """
+        Wait for a slot, returning a ticket to pass to release()
+        """
+        deadline = time.monotonic() + (timeout if timeout is not None else self.max_wait)
+        self._acquire_local(priority, deadline)
+
+        lease = None
+        if self.global_limit:
+            try:
+                lease = self._lease_global(priority, deadline)
+            except AdmissionRejected:
+                self._release_local()
+                raise
+
+        return {'lease': lease, 'started': time.monotonic()}
+
+    def release(self, ticket):
+        if ticket['lease'] is not None:
+            self._release_global(ticket['lease'])
+        self._release_local(time.monotonic() - ticket['started'])
+
+    @contextmanager
+    def slot(self, priority=PRIORITY_TURN, timeout=None):
+        """
+        Hold a slot for the duration of a with-block
+        """
+        ticket = self.acquire(priority, timeout)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    async def aacquire(self, priority=PRIORITY_TURN, timeout=None):
+        """
+        Async acquire(): queued on the event loop, without an executor thread
+        """
+        deadline = time.monotonic() + (timeout if timeout is not None else self.max_wait)
+        await self._aacquire_local(priority, deadline)
+
+        lease = None
+        if self.global_limit:
+            try:
+                lease = await self._alease_global(priority, deadline)
+            except BaseException:
+                self._release_local()
+                raise
+
+        return {'lease': lease, 'started': time.monotonic()}
+
+    async def arelease(self, ticket):
+        # The local slot is freed first so its waiters wake straight away
+        self._release_local(time.monotonic() - ticket['started'])
+        if ticket['lease'] is not None:
+            key, token = ticket['lease']
+            if await cache.aget(key) == token:
+                await cache.adelete(key)
+
+    @asynccontextmanager
+    async def aslot(self, priority=PRIORITY_TURN, timeout=None):
+        """
+        Async version of slot()
+        """
+        ticket = await self.aacquire(priority, timeout)
+        try:
+            yield ticket
+        finally:
+            await self.arelease(ticket)
+
+    def stats(self):
+        with self._condition:
+            queued = {name: 0 for name in PRIORITY_NAMES.values()}
+            for waiter in self._waiters:
+                queued[PRIORITY_NAMES.get(waiter.priority, str(waiter.priority))] += 1
+            return {
+                'active': self._active,
+                'max_concurrent': self.max_concurrent,
+                'queued': queued,
+                'max_queue': self.max_queue,
+                'admitted': self._admitted,
+                'rejected': self._rejected,
+                'global_limit': self.global_limit,
+            }
+
+
+_admission_controller = None
+_admission_controller_lock = threading.Lock()
+
+
+def get_admission_controller():
+    """
+    Return the admission controller shared by this worker process
+    """
+    global _admission_controller
+
+    if _admission_controller is None:
+        with _admission_controller_lock:
+            if _admission_controller is None:
+                _admission_controller = AdmissionController()
+    return _admission_controller
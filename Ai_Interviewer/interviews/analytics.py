@@ -0,0 +1,209 @@
+"""
+Cohort statistics across all results of an interview, computed with NumPy.
+
+The results are read with one query into an (attempts x criteria) matrix
+of criterion scores, NaN where a criterion was not assessed, and vectors
+of the overall and weighted scores. Percentiles, z-scores and the
+criterion correlation matrix are then whole-array operations instead of
+Python loops, so tens of thousands of results cost one query and a few
+milliseconds. Correlations use every pair of criteria both scored for an
+attempt (pairwise-complete), computed for all pairs at once with matrix
+products over the NaN mask.
+
+Results are cached for ANALYTICS_CACHE_SECONDS, keyed by the interview's
+version and its leaderboard's last update, which change whenever a
+criterion or a result does. NumPy is optional: without it
+analytics_available() is False and cohort_analytics() returns None.
+"""
+import bisect
+import warnings
+from django.conf import settings
+from django.core.cache import cache
+from .leaderboard import get_leaderboard
+from .models import InterviewResult
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+PERCENTILES = (10, 25, 50, 75, 90)
+
+# Correlations over fewer attempts than this are left out
+MIN_CORRELATION_COUNT = 3
+
+
+def analytics_available():
+    return np is not None
+
+
+def load_scores(interview, criteria):
+    """
+    (attempt ids, overall, weighted, criterion score matrix) for all results, by attempt id
+    """
+    columns = {str(criterion.id): column for column, criterion in enumerate(criteria)}
+    rows = InterviewResult.objects.filter(
+        attempt__interview=interview
+    ).order_by('attempt_id').values_list('attempt_id', 'overall_rating', 'weighted_score', 'criterion_scores')
+
+    attempt_ids, overall, weighted, scores = [], [], [], []
+    for attempt_id, overall_rating, weighted_score, criterion_scores in rows.iterator(chunk_size=2000):
+        attempt_ids.append(attempt_id)
+        overall.append(overall_rating)
+        weighted.append(weighted_score)
+        row = [None] * len(criteria)
+        for criterion_id, score in (criterion_scores or {}).items():
+            if criterion_id in columns:
+                row[columns[criterion_id]] = score
+        scores.append(row)
+
+    # None becomes NaN in float arrays
+    return (
+        np.array(attempt_ids, dtype=np.int64),
+        np.array(overall, dtype=float),
+        np.array(weighted, dtype=float),
+        np.array(scores, dtype=float).reshape(len(attempt_ids), len(criteria)),
+    )
+
+
+def percentile_ranks(values):
+    """
+    Percent of the scored values at or below each value (NaN stays NaN)
+    """
+    scored = ~np.isnan(values)
+    ordered = np.sort(values[scored])
+    ranks = np.full(values.shape, np.nan)
+    if ordered.size:
+        ranks[scored] = np.searchsorted(ordered, values[scored], side='right') / ordered.size * 100
+    return ranks
+
+
+def z_scores(values):
+    """
+    Standard scores against each column's mean and sample deviation
+    """
+    mean = np.nanmean(values, axis=0)
+    std = np.nanstd(values, axis=0, ddof=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z = (values - mean) / std
+    z[~np.isfinite(z)] = np.nan
+    return z
+
+
+def correlations(matrix):
+    """
+    Pairwise-complete Pearson correlations between the columns of a matrix with NaNs
+    """
+    present = ~np.isnan(matrix)
+    values = np.where(present, matrix, 0.0)
+    mask = present.astype(float)
+
+    # [i, j] sums over the attempts that scored both criterion i and j
+    counts = mask.T @ mask
+    sums = values.T @ mask
+    squares = (values ** 2).T @ mask
+    products = values.T @ values
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        covariance = products - sums * sums.T / counts
+        variance = squares - sums ** 2 / counts
+        corr = covariance / np.sqrt(variance * variance.T)
+
+    corr[(counts < MIN_CORRELATION_COUNT) | ~np.isfinite(corr)] = np.nan
+    return np.clip(corr, -1.0, 1.0)
+
+
+def number(value):
+    return None if np.isnan(value) else round(float(value), 2)
+
+
+def numbers(values):
+    return [number(value) for value in values]
+
+
+def describe(matrix):
+    """
+    Count, mean, deviation and percentiles of each column
+    """
+    counts = (~np.isnan(matrix)).sum(axis=0)
+    means = np.nanmean(matrix, axis=0)
+    stdevs = np.nanstd(matrix, axis=0, ddof=1)
+    percentiles = np.nanpercentile(matrix, PERCENTILES, axis=0)
+    return [
+        {
+            'count': int(counts[column]),
+            'mean': number(means[column]),
+            'stdev': number(stdevs[column]),
+            'percentiles': numbers(percentiles[:, column]),
+        }
+        for column in range(matrix.shape[1])
+    ]
+
+
+def compute_analytics(interview):
+    """
+    Cohort statistics for every result of the interview, in one vectorized pass
+    """
+    criteria = list(interview.criteria.order_by('id'))
+    attempt_ids, overall, weighted, scores = load_scores(interview, criteria)
+    composite = np.column_stack([overall, weighted])
+
+    # Empty and all-NaN columns give NaN, reported as None, with a warning
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        overall_summary, weighted_summary = describe(composite) if len(attempt_ids) else [None, None]
+        criteria_summary = describe(scores) if len(attempt_ids) else [None] * len(criteria)
+        composite_z = z_scores(composite)
+        criterion_z = z_scores(scores)
+
+    return {
+        'count': len(attempt_ids),
+        'percentiles': PERCENTILES,
+        'overall': overall_summary,
+        'weighted': weighted_summary,
+        'criteria': [
+            {'id': criterion.id, 'name': criterion.criterion_name, 'weight': criterion.weight, 'summary': summary}
+            for criterion, summary in zip(criteria, criteria_summary)
+        ],
+        'correlations': [numbers(row) for row in correlations(scores)],
+        # Per attempt, sorted by attempt id (see attempt_stats)
+        'attempts': {
+            'ids': attempt_ids.tolist(),
+            'overall_percentile': numbers(percentile_ranks(overall)),
+            'weighted_percentile': numbers(percentile_ranks(weighted)),
+            'overall_z': numbers(composite_z[:, 0]),
+            'weighted_z': numbers(composite_z[:, 1]),
+            'criterion_z': [numbers(row) for row in criterion_z],
+        },
+    }
+
+
+def cohort_analytics(interview):
+    """
+    Cached cohort statistics for an interview, or None without NumPy
+    """
+    if not analytics_available():
+        return None
+
+    board = get_leaderboard(interview)
+    key = f"interview_analytics:{interview.id}:{interview.updated_at.timestamp()}:{board.updated_at.timestamp()}"
+    analytics = cache.get(key)
+    if analytics is None:
+        analytics = compute_analytics(interview)
+        cache.set(key, analytics, getattr(settings, 'ANALYTICS_CACHE_SECONDS', 300))
+    return analytics
+
+
+def attempt_stats(analytics, attempt_id):
+    """
+    Percentiles and z-scores of one attempt's result, or None if it has none
+    """
+    attempts = analytics['attempts']
+    position = bisect.bisect_left(attempts['ids'], attempt_id)
+    if position == len(attempts['ids']) or attempts['ids'][position] != attempt_id:
+        return None
+    return {
+        name: values[position]
+        for name, values in attempts.items()
+        if name != 'ids'
+    }
@@ -0,0 +1,122 @@
+"""
+Bounded rolling context for long interviews.
+
+The chat sent to Gemini on every turn is the system prompt, a running
+summary of older turns and the most recent turns verbatim. Once the
+verbatim turns exceed INTERVIEW_CONTEXT_TOKEN_BUDGET, everything except the
+last INTERVIEW_CONTEXT_KEEP_TURNS turns is folded into the summary, so the
+prompt stops growing with the length of the interview.
+
+Folding costs an LLM call, so it never runs inside a turn: once a turn's
+exchange is stored, schedule_fold() hands it to a background thread that
+re-reads the session and summarizes under its own low-priority admission
+slot, after the turn has answered and let go of its slot and session lock.
+A turn that starts meanwhile simply sends the longer verbatim context.
+"""
+import threading
+from django.conf import settings
+from django.db import connection
+from .admission import AdmissionRejected, PRIORITY_EVALUATION, get_admission_controller
+
+
+def estimate_tokens(text):
+    """
+    Cheap token estimate (~4 characters per token) used for budgeting
+    """
+    return max(1, len(text or '') // 4)
+
+
+class RollingContext:
+    """
+    Decides when and where to fold older turns into the summary
+    """
+
+    def __init__(self, token_budget=None, keep_turns=None):
+        self.token_budget = token_budget or getattr(settings, 'INTERVIEW_CONTEXT_TOKEN_BUDGET', 4000)
+        self.keep_turns = keep_turns or getattr(settings, 'INTERVIEW_CONTEXT_KEEP_TURNS', 6)
+
+    def verbatim_tokens(self, conversation, summarized_upto=0):
+        return sum(estimate_tokens(msg['message']) for msg in conversation[summarized_upto:])
+
+    def fold_point(self, conversation, summarized_upto=0):
+        """
+        Return the index up to which turns should be summarized, or None
+        """
+        if self.verbatim_tokens(conversation, summarized_upto) <= self.token_budget:
+            return None
+
+        cut = len(conversation) - self.keep_turns
+
+        # AI turns sit at even positions; start the verbatim part with one
+        # so the rebuilt chat still alternates user and model
+        if cut % 2:
+            cut -= 1
+
+        if cut <= summarized_upto:
+            return None
+        return cut
+
+
+rolling_context = RollingContext()
+
+_folding = set()
+_folding_lock = threading.Lock()
+
+
+def fold_context(gemini_service, session_store, attempt_id, session, conversation):
+    """
+    Summarize older turns once the verbatim context exceeds the token budget
+    """
+    summarized_upto = session.get('summarized_upto', 0)
+    cut = rolling_context.fold_point(conversation, summarized_upto)
+    if cut is None:
+        return False
+
+    result = gemini_service.summarize_turns(session.get('summary', ''), conversation[summarized_upto:cut])
+    if not result['success'] or not result['summary']:
+        print(f"✗ Failed to summarize context for attempt {attempt_id}: {result.get('error', 'empty summary')}")
+        return False
+
+    session_store.update_summary(attempt_id, result['summary'], cut)
+    return True
+
+
+def fold_session(gemini_service, session_store, attempt_id):
+    """
+    Fold a session's older turns in the background, from its stored state
+    """
+    try:
+        session = session_store.get(attempt_id)
+        if session is None:
+            return
+
+        # Background work queues behind live turns and session starts
+        with get_admission_controller().slot(PRIORITY_EVALUATION):
+            fold_context(gemini_service, session_store, attempt_id, session, session['conversation'])
+    except AdmissionRejected:
+        # Still over budget, so the next turn schedules it again
+        pass
+    except Exception as e:
+        print(f"✗ Failed to fold context for attempt {attempt_id}: {e}")
+    finally:
+        with _folding_lock:
+            _folding.discard(str(attempt_id))
+        connection.close()
+
+
+def schedule_fold(gemini_service, session_store, attempt_id, session, conversation):
+    """
+    Start a background fold once the conversation crosses the token budget.
+    Returns whether one was started.
+    """
+    if rolling_context.fold_point(conversation, session.get('summarized_upto', 0)) is None:
+        return False
+
+    with _folding_lock:
+        # One fold per session at a time; it reads the latest conversation
+        if str(attempt_id) in _folding:
+            return False
+        _folding.add(str(attempt_id))
+
+    threading.Thread(target=fold_session, args=(gemini_service, session_store, attempt_id), daemon=True).start()
+    return True
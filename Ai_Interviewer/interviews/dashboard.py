@@ -0,0 +1,70 @@
+"""
+Aggregated statistics and filters for the HR dashboard and results pages.
+
+Per-interview attempt, completion and rating stats are computed by the
+database in the same query that lists the interviews: conditional Count and
+Avg aggregates over the attempts and their results, grouped by interview.
+The stat cards come from one more aggregate query over all of the HR user's
+interviews, so the page costs the same number of queries however many
+interviews or attempts there are. The lists themselves are paginated by
+interviews.pagination.
+"""
+from django.db.models import Avg, Count, Q
+
+
+def with_attempt_stats(interviews):
+    """
+    Annotate an Interview queryset with attempt and rating stats per interview
+    """
+    return interviews.annotate(
+        attempt_count=Count('attempts'),
+        completed_count=Count('attempts', filter=Q(attempts__status='COMPLETED')),
+        in_progress_count=Count('attempts', filter=Q(attempts__status='IN_PROGRESS')),
+        evaluated_count=Count('attempts__result'),
+        average_rating=Avg('attempts__result__overall_rating'),
+    )
+
+
+def dashboard_totals(interviews):
+    """
+    Totals for the stat cards, in one aggregate query over an Interview queryset
+    """
+    return interviews.aggregate(
+        total_interviews=Count('id', distinct=True),
+        active_interviews=Count('id', filter=Q(status='ACTIVE'), distinct=True),
+        total_attempts=Count('attempts'),
+        total_completed=Count('attempts', filter=Q(attempts__status='COMPLETED')),
+    )
+
+
+def filter_values(form):
+    """
+    The valid values of a bound filter form; invalid fields are ignored
+    """
+    form.is_valid()
+    return form.cleaned_data
+
+
+def newest_first(filters):
+    return filters.get('order') != 'oldest'
+
+
+def filter_interviews(interviews, filters):
+    if filters.get('status'):
+        interviews = interviews.filter(status=filters['status'])
+    return interviews
+
+
+def filter_attempts(attempts, filters):
+    """
+    Narrow an InterviewAttempt queryset by status, recommendation and rating range
+    """
+    if filters.get('status'):
+        attempts = attempts.filter(status=filters['status'])
+    if filters.get('recommendation'):
+        attempts = attempts.filter(result__recommendation=filters['recommendation'])
+    if filters.get('min_rating') is not None:
+        attempts = attempts.filter(result__overall_rating__gte=filters['min_rating'])
+    if filters.get('max_rating') is not None:
+        attempts = attempts.filter(result__overall_rating__lte=filters['max_rating'])
+    return attempts
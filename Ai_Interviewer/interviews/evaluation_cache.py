@@ -0,0 +1,124 @@
+"""
+Content-addressed cache of interview evaluations.
+
+An evaluation is keyed by a hash of everything that determines it: the
+normalized transcript, the interview title and criteria, the evaluation
+prompt version, the segmenting settings and the models the evaluation
+route uses. Re-running an evaluation on the same inputs (a retried job,
+a duplicate end-session or a re-score) is then a DB lookup. Entries expire
+after EVALUATION_CACHE_MAX_AGE_DAYS and the least recently used ones are
+evicted beyond EVALUATION_CACHE_MAX_ENTRIES.
+"""
+import hashlib
+import json
+import threading
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import F, Sum
+from django.utils import timezone
+from .models import EvaluationCacheEntry
+
+# Bump whenever the evaluation prompts or schema change
+EVALUATION_PROMPT_VERSION = 3
+
+
+def normalize_text(text):
+    return ' '.join((text or '').split())
+
+
+def evaluation_key(interview_context, conversation, model_identity):
+    """
+    Hash of the inputs that determine an evaluation
+    """
+    payload = {
+        'version': EVALUATION_PROMPT_VERSION,
+        'model': model_identity,
+        'title': normalize_text(interview_context['title']),
+        'criteria': sorted(
+            [normalize_text(c['criterion_name']), normalize_text(c.get('description', '')), c.get('weight', 1)]
+            for c in interview_context['criteria']
+        ),
+        'transcript': [[turn['role'], normalize_text(turn['message'])] for turn in conversation],
+        'segmenting': [
+            getattr(settings, 'EVALUATION_MAP_REDUCE_THRESHOLD_TOKENS', 6000),
+            getattr(settings, 'EVALUATION_SEGMENT_TOKENS', 3000),
+        ],
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+class EvaluationCache:
+    """
+    DB-backed evaluation cache with age and size based eviction
+    """
+
+    def __init__(self, max_entries=None, max_age_days=None):
+        self.max_entries = max_entries or getattr(settings, 'EVALUATION_CACHE_MAX_ENTRIES', 5000)
+        self.max_age_days = max_age_days or getattr(settings, 'EVALUATION_CACHE_MAX_AGE_DAYS', 30)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def expired_before(self):
+        return timezone.now() - timedelta(days=self.max_age_days)
+
+    def count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, key):
+        """
+        Return the cached evaluation for key, or None
+        """
+        entry = EvaluationCacheEntry.objects.filter(key=key, created_at__gte=self.expired_before()).first()
+        self.count(entry is not None)
+
+        if entry is None:
+            return None
+
+        EvaluationCacheEntry.objects.filter(pk=entry.pk).update(hits=F('hits') + 1, last_used_at=timezone.now())
+        return entry.evaluation
+
+    def set(self, key, evaluation, model_name=''):
+        EvaluationCacheEntry.objects.update_or_create(
+            key=key,
+            defaults={
+                'evaluation': evaluation,
+                'model_name': model_name,
+                'last_used_at': timezone.now(),
+            }
+        )
+        self.prune()
+
+    def prune(self):
+        """
+        Drop expired entries and the least recently used ones over the size limit
+        """
+        deleted, _ = EvaluationCacheEntry.objects.filter(created_at__lt=self.expired_before()).delete()
+
+        stale_ids = list(
+            EvaluationCacheEntry.objects.order_by('-last_used_at').values_list('id', flat=True)[self.max_entries:]
+        )
+        if stale_ids:
+            deleted += EvaluationCacheEntry.objects.filter(id__in=stale_ids).delete()[0]
+        return deleted
+
+    def stats(self):
+        totals = EvaluationCacheEntry.objects.aggregate(hits=Sum('hits'))
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': EvaluationCacheEntry.objects.count(),
+                'max_entries': self.max_entries,
+                'max_age_days': self.max_age_days,
+                'total_hits': totals['hits'] or 0,
+                'process_hits': self.hits,
+                'process_misses': self.misses,
+                'process_hit_rate': round(self.hits / lookups, 3) if lookups else None,
+            }
+
+
+evaluation_cache = EvaluationCache()
@@ -0,0 +1,118 @@
+"""
+Database-backed queue for interview evaluations.
+
+Ending an interview enqueues an EvaluationJob instead of waiting for Gemini
+to write the evaluation, so the candidate gets an immediate response. Jobs
+are claimed and run by ``manage.py run_evaluation_worker``.
+"""
+import random
+from datetime import timedelta
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+from .models import EvaluationJob, InterviewResult
+from .scoring import score_criteria
+from .segmented_evaluation import evaluate_transcript
+
+
+def enqueue_evaluation(attempt, context, conversation):
+    """
+    Queue an evaluation for a finished interview attempt
+    """
+    return EvaluationJob.objects.create(
+        attempt=attempt,
+        context=context,
+        conversation=list(conversation),
+    )
+
+
+async def aenqueue_evaluation(attempt, context, conversation):
+    return await sync_to_async(enqueue_evaluation)(attempt, context, conversation)
+
+
+def claim_job(worker_id):
+    """
+    Atomically claim the next runnable job, or return None.
+
+    Jobs left RUNNING by a worker that died are claimed again once
+    EVALUATION_JOB_TIMEOUT_SECONDS has passed.
+    """
+    now = timezone.now()
+    stale_before = now - timedelta(seconds=getattr(settings, 'EVALUATION_JOB_TIMEOUT_SECONDS', 600))
+    runnable = (
+        Q(status='PENDING', run_after__lte=now)
+        | Q(status='RUNNING', locked_at__lt=stale_before)
+    )
+
+    candidates = EvaluationJob.objects.filter(runnable).order_by('run_after', 'id').values_list('id', flat=True)[:10]
+
+    for job_id in candidates:
+        # Conditional update so only one worker wins each job
+        claimed = EvaluationJob.objects.filter(runnable, id=job_id).update(
+            status='RUNNING',
+            locked_by=worker_id,
+            locked_at=now,
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return EvaluationJob.objects.select_related('attempt').get(id=job_id)
+
+    return None
+
+
+def save_evaluation(attempt, evaluation):
+    """
+    Store Gemini's evaluation as the attempt's InterviewResult
+    """
+    result, created = InterviewResult.objects.update_or_create(
+        attempt=attempt,
+        defaults={
+            **score_criteria(attempt.interview, evaluation.get('criterion_scores')),
+            'overall_rating': evaluation['overall_rating'],
+            'technical_score': evaluation.get('technical_score'),
+            'communication_score': evaluation.get('communication_score'),
+            'problem_solving_score': evaluation.get('problem_solving_score'),
+            'feedback': evaluation.get('feedback', ''),
+            'strengths': evaluation.get('strengths', ''),
+            'weaknesses': evaluation.get('weaknesses', ''),
+            'recommendation': evaluation.get('recommendation', 'Under Review'),
+        }
+    )
+    return result
+
+
+def run_job(job, max_attempts=None, retry_backoff=None):
+    """
+    Generate the evaluation for a claimed job and record the outcome
+    """
+    max_attempts = max_attempts or getattr(settings, 'EVALUATION_JOB_MAX_ATTEMPTS', 3)
+    retry_backoff = retry_backoff or getattr(settings, 'EVALUATION_JOB_RETRY_BACKOFF_SECONDS', 30)
+
+    try:
+        # Long transcripts are scored in parallel segments. A rejected LLM
+        # slot counts as a failed attempt and is retried with backoff.
+        evaluation_result = evaluate_transcript(job.context, job.conversation)
+        if not evaluation_result['success']:
+            raise RuntimeError(evaluation_result.get('error', 'Failed to generate evaluation'))
+
+        save_evaluation(job.attempt, evaluation_result['evaluation'])
+
+        job.status = 'SUCCEEDED'
+        job.last_error = ''
+        job.save(update_fields=['status', 'last_error', 'updated_at'])
+        return True
+
+    except Exception as e:
+        job.last_error = str(e)
+
+        if job.attempts >= max_attempts:
+            job.status = 'FAILED'
+        else:
+            # Exponential backoff with jitter before the next try
+            delay = retry_backoff * (2 ** (job.attempts - 1))
+            job.status = 'PENDING'
+            job.run_after = timezone.now() + timedelta(seconds=delay * random.uniform(0.5, 1.5))
+
+        job.save(update_fields=['status', 'last_error', 'run_after', 'updated_at'])
+        return False
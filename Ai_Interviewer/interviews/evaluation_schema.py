@@ -0,0 +1,230 @@
+"""
+Structured interview evaluations.
+
+Evaluations are requested in JSON mode against EVALUATION_SCHEMA, and the
+reply is read by IncrementalObjectParser, which picks the top-level fields
+out of the first JSON object in the text in a single pass. Prose or code
+fences around the object are skipped and fields that completed before a
+reply was cut off are kept. Each field is then validated on its own, so
+only the fields that are missing or invalid need to be asked for again.
+"""
+import json
+
+SCORE_FIELDS = ['overall_rating', 'technical_score', 'communication_score', 'problem_solving_score']
+TEXT_FIELDS = ['feedback', 'strengths', 'weaknesses']
+RECOMMENDATIONS = ['Highly Recommended', 'Recommended', 'Maybe', 'Not Recommended']
+
+EVALUATION_FIELDS = SCORE_FIELDS + TEXT_FIELDS + ['recommendation', 'criterion_scores']
+
+# Fields scored for one segment of a long transcript (see segmented_evaluation.py)
+SEGMENT_FIELDS = ['technical_score', 'communication_score', 'problem_solving_score',
+                  'criterion_scores', 'strengths', 'weaknesses', 'summary']
+
+FIELD_SCHEMAS = {
+    **{name: {'type': 'number'} for name in SCORE_FIELDS},
+    **{name: {'type': 'string'} for name in TEXT_FIELDS},
+    'recommendation': {'type': 'string', 'enum': RECOMMENDATIONS},
+    'summary': {'type': 'string'},
+    'criterion_scores': {
+        'type': 'array',
+        'items': {
+            'type': 'object',
+            'properties': {
+                'criterion': {'type': 'string'},
+                'score': {'type': 'number'},
+                'assessed': {'type': 'boolean'},
+            },
+            'required': ['criterion', 'score', 'assessed'],
+        },
+    },
+}
+
+EVALUATION_SCHEMA = {
+    'type': 'object',
+    'properties': FIELD_SCHEMAS,
+    'required': EVALUATION_FIELDS,
+}
+
+
+def evaluation_schema(field_names=None):
+    """
+    Schema for the whole evaluation or only some of its fields
+    """
+    if field_names is None:
+        return EVALUATION_SCHEMA
+    return {
+        'type': 'object',
+        'properties': {name: FIELD_SCHEMAS[name] for name in field_names},
+        'required': list(field_names),
+    }
+
+
+def evaluation_generation_config(field_names=None):
+    """
+    Gemini generation_config asking for JSON that matches the schema
+    """
+    return {
+        'response_mime_type': 'application/json',
+        'response_schema': evaluation_schema(field_names),
+    }
+
+
+class IncrementalObjectParser:
+    """
+    Single-pass parser for the top-level fields of a JSON object.
+
+    Text can be fed in chunks as it streams in. Everything before the first
+    '{' and after the matching '}' is ignored. A field is available in
+    `fields` as soon as its value is complete; values that are not valid
+    JSON are kept as raw text in `invalid`.
+    """
+
+    def __init__(self):
+        self.buffer = ''
+        self.pos = 0
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.done = False
+        self.expect = 'start'
+        self.key = None
+        self.token_start = None
+        self.fields = {}
+        self.invalid = {}
+
+    def feed(self, text):
+        self.buffer += text
+
+        while self.pos < len(self.buffer) and not self.done:
+            self.step(self.buffer[self.pos])
+            self.pos += 1
+
+        return self.fields
+
+    def finish_value(self, end):
+        raw = self.buffer[self.token_start:end].strip()
+        try:
+            self.fields[self.key] = json.loads(raw)
+            self.invalid.pop(self.key, None)
+        except ValueError:
+            self.invalid[self.key] = raw
+        self.expect = 'comma'
+
+    def step(self, ch):
+        if self.expect == 'start':
+            if ch == '{':
+                self.depth = 1
+                self.expect = 'key'
+            return
+
+        if self.in_string:
+            if self.escaped:
+                self.escaped = False
+            elif ch == '\\':
+                self.escaped = True
+            elif ch == '"':
+                self.in_string = False
+                if self.depth == 1 and self.expect == 'key_string':
+                    try:
+                        self.key = json.loads(self.buffer[self.token_start:self.pos + 1])
+                    except ValueError:
+                        self.key = self.buffer[self.token_start + 1:self.pos]
+                    self.expect = 'colon'
+                elif self.depth == 1 and self.expect == 'value_string':
+                    self.finish_value(self.pos + 1)
+            return
+
+        if ch == '"':
+            self.in_string = True
+            if self.depth == 1 and self.expect == 'key':
+                self.token_start = self.pos
+                self.expect = 'key_string'
+            elif self.depth == 1 and self.expect == 'value':
+                self.token_start = self.pos
+                self.expect = 'value_string'
+        elif ch == ':' and self.depth == 1 and self.expect == 'colon':
+            self.expect = 'value'
+        elif ch in '{[':
+            if self.depth == 1 and self.expect == 'value':
+                self.token_start = self.pos
+                self.expect = 'value_nested'
+            self.depth += 1
+        elif ch in '}]':
+            self.depth -= 1
+            if self.depth == 1 and self.expect == 'value_nested':
+                self.finish_value(self.pos + 1)
+            elif self.depth == 0:
+                if self.expect == 'value_scalar':
+                    self.finish_value(self.pos)
+                self.done = True
+        elif ch == ',' and self.depth == 1:
+            if self.expect == 'value_scalar':
+                self.finish_value(self.pos)
+            self.expect = 'key'
+        elif self.depth == 1 and self.expect == 'value' and not ch.isspace():
+            self.token_start = self.pos
+            self.expect = 'value_scalar'
+
+
+def parse_object_fields(text):
+    """
+    Return (fields, invalid) for the first JSON object in text
+    """
+    parser = IncrementalObjectParser()
+    parser.feed(text)
+    return parser.fields, parser.invalid
+
+
+def clean_score(name, value):
+    score = float(value)
+    if not 1 <= score <= 10:
+        raise ValueError(f"{name} out of range: {score}")
+    return round(score, 1)
+
+
+def clean_field(name, value):
+    """
+    Validate and normalize one evaluation field, raising ValueError if unusable
+    """
+    if name in SCORE_FIELDS:
+        return clean_score(name, value)
+
+    if name == 'criterion_scores':
+        if not isinstance(value, list):
+            raise ValueError('criterion_scores must be a list')
+        return [
+            {
+                'criterion': str(item['criterion']).strip(),
+                'score': clean_score(item['criterion'], item['score']),
+                'assessed': bool(item.get('assessed', True)),
+            }
+            for item in value
+        ]
+
+    if name == 'recommendation':
+        for choice in RECOMMENDATIONS:
+            if str(value).strip().lower() == choice.lower():
+                return choice
+        raise ValueError(f"Unknown recommendation: {value}")
+
+    if isinstance(value, list):
+        value = '\n'.join(str(item) for item in value)
+    if not isinstance(value, str) or not value.strip():
+        raise ValueError(f"{name} is empty")
+    return value.strip()
+
+
+def validate_evaluation(fields, field_names=None):
+    """
+    Split parsed fields into (valid evaluation, names of missing or invalid fields)
+    """
+    evaluation = {}
+    failed = []
+
+    for name in field_names or EVALUATION_FIELDS:
+        try:
+            evaluation[name] = clean_field(name, fields[name])
+        except (KeyError, TypeError, ValueError):
+            failed.append(name)
+
+    return evaluation, failed
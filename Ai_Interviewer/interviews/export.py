@@ -0,0 +1,236 @@
+"""
+Streaming export of an interview's attempts and results.
+
+Rows (attempt, candidate and result, one per attempt) are read with
+.values().iterator(chunk_size=EXPORT_CHUNK_SIZE) and encoded as they are
+read, so an export holds one chunk of rows in memory however many there
+are. Used by the HR export view, which streams with StreamingHttpResponse,
+and by: python manage.py export_results <interview_id>
+
+Formats:
+    csv      one column per field and per evaluation criterion; text cells
+             that a spreadsheet would run as a formula are prefixed with '
+    jsonl    one JSON object per line, criterion scores as an object
+    parquet  columnar, one row group per chunk (needs pyarrow)
+"""
+import csv
+import json
+from django.conf import settings
+from .models import InterviewAttempt
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+# Columns read from the database and how they are named in the export
+FIELDS = [
+    ('id', 'attempt_id'),
+    ('candidate__username', 'candidate'),
+    ('candidate__email', 'candidate_email'),
+    ('status', 'status'),
+    ('started_at', 'started_at'),
+    ('completed_at', 'completed_at'),
+    ('result__overall_rating', 'overall_rating'),
+    ('result__weighted_score', 'weighted_score'),
+    ('result__technical_score', 'technical_score'),
+    ('result__communication_score', 'communication_score'),
+    ('result__problem_solving_score', 'problem_solving_score'),
+    ('result__recommendation', 'recommendation'),
+    ('result__feedback', 'feedback'),
+    ('result__strengths', 'strengths'),
+    ('result__weaknesses', 'weaknesses'),
+    ('result__criterion_scores', 'criterion_scores'),
+]
+
+# Leading characters that make a spreadsheet treat a cell as a formula
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+SCORE_COLUMNS = ['overall_rating', 'weighted_score', 'technical_score', 'communication_score', 'problem_solving_score']
+
+FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'jsonl': ('application/x-ndjson', 'jsonl'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+
+def chunk_size():
+    return getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+
+
+def parquet_available():
+    return pa is not None
+
+
+def export_rows(interview, attempts=None):
+    """
+    Yield one dict per attempt of the interview, criterion scores by criterion name
+    """
+    if attempts is None:
+        attempts = InterviewAttempt.objects.filter(interview=interview)
+    names = {str(c.id): c.criterion_name for c in interview.criteria.all()}
+
+    rows = attempts.order_by('id').values(*[field for field, _ in FIELDS])
+    for values in rows.iterator(chunk_size=chunk_size()):
+        row = {column: values[field] for field, column in FIELDS}
+        for column in SCORE_COLUMNS:
+            if row[column] is not None:
+                row[column] = float(row[column])
+        row['criterion_scores'] = {
+            names[criterion_id]: score
+            for criterion_id, score in (row['criterion_scores'] or {}).items()
+            if criterion_id in names
+        }
+        yield row
+
+
+def columns(interview):
+    """
+    Flat column names: every field, then one per criterion
+    """
+    return (
+        [column for _, column in FIELDS if column != 'criterion_scores']
+        + [f"criterion: {c.criterion_name}" for c in interview.criteria.order_by('id')]
+    )
+
+
+def flatten(row, criterion_columns):
+    flat = {column: value for column, value in row.items() if column != 'criterion_scores'}
+    for column in criterion_columns:
+        flat[column] = row['criterion_scores'].get(column[len('criterion: '):])
+    return flat
+
+
+class LineBuffer:
+    """
+    File-like object for csv.writer that hands back each written line
+    """
+
+    def write(self, value):
+        return value
+
+
+def csv_cell(value):
+    """
+    A value as written to CSV. Candidate answers and model feedback are free
+    text, so one starting with a formula character is quoted with a leading '.
+    """
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def stream_csv(interview, rows):
+    header = columns(interview)
+    criterion_columns = [column for column in header if column.startswith('criterion: ')]
+    writer = csv.writer(LineBuffer())
+
+    yield writer.writerow([csv_cell(column) for column in header])
+    for row in rows:
+        flat = flatten(row, criterion_columns)
+        yield writer.writerow([csv_cell(flat[column]) for column in header])
+
+
+def stream_jsonl(interview, rows):
+    for row in rows:
+        yield json.dumps(row, default=lambda value: value.isoformat()) + '\n'
+
+
+class ChunkSink:
+    """
+    Writable file for ParquetWriter whose contents are drained as they are produced
+    """
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def writable(self):
+        return True
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def parquet_schema(interview):
+    header = columns(interview)
+    types = {
+        'attempt_id': pa.int64(),
+        'started_at': pa.timestamp('us', tz='UTC'),
+        'completed_at': pa.timestamp('us', tz='UTC'),
+        **{column: pa.float64() for column in SCORE_COLUMNS},
+    }
+    return pa.schema([
+        (column, types.get(column, pa.float64() if column.startswith('criterion: ') else pa.string()))
+        for column in header
+    ])
+
+
+def stream_parquet(interview, rows):
+    """
+    Parquet file in row groups of EXPORT_CHUNK_SIZE rows, yielded as each is written
+    """
+    schema = parquet_schema(interview)
+    criterion_columns = [name for name in schema.names if name.startswith('criterion: ')]
+    sink = ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression='snappy')
+
+    def write(batch):
+        writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+        return sink.drain()
+
+    try:
+        batch = []
+        for row in rows:
+            batch.append(flatten(row, criterion_columns))
+            if len(batch) >= chunk_size():
+                yield write(batch)
+                batch = []
+        if batch:
+            yield write(batch)
+    finally:
+        # Footer; also closes the writer if the stream is cut off
+        writer.close()
+    yield sink.drain()
+
+
+def stream_export(interview, export_format, attempts=None):
+    """
+    Chunks of the interview's export in a format from FORMATS
+    """
+    rows = export_rows(interview, attempts)
+    if export_format == 'csv':
+        return stream_csv(interview, rows)
+    if export_format == 'jsonl':
+        return stream_jsonl(interview, rows)
+    if export_format == 'parquet':
+        if not parquet_available():
+            raise ValueError('Parquet export needs pyarrow (pip install pyarrow)')
+        return stream_parquet(interview, rows)
+    raise ValueError(f"Unknown export format: {export_format}")
+
+
+def export_filename(interview, export_format):
+    return f"interview-{interview.id}-results.{FORMATS[export_format][1]}"
@@ -1,5 +1,5 @@
 from django import forms
-from .models import Interview, EvaluationCriteria, ExpectedSkill, RoleResponsibility
+from .models import Interview, InterviewAttempt, EvaluationCriteria, ExpectedSkill, RoleResponsibility
 
 class InterviewForm(forms.ModelForm):
     class Meta:
@@ -38,3 +38,52 @@ class RoleResponsibilityForm(forms.ModelForm):
         widgets = {
             'responsibility': forms.Textarea(attrs={'class': 'form-control', 'rows': 2, 'placeholder': 'Describe a key responsibility...'}),
         }
+
+# Filters for the paginated dashboard and results lists (submitted with GET)
+
+ORDER_CHOICES = (
+    ('newest', 'Newest first'),
+    ('oldest', 'Oldest first'),
+)
+
+class InterviewFilterForm(forms.Form):
+    status = forms.ChoiceField(
+        required=False,
+        choices=(('', 'All statuses'),) + Interview.STATUS_CHOICES,
+        widget=forms.Select(attrs={'class': 'form-select form-select-sm'})
+    )
+    order = forms.ChoiceField(
+        required=False,
+        choices=ORDER_CHOICES,
+        widget=forms.Select(attrs={'class': 'form-select form-select-sm'})
+    )
+
+class AttemptFilterForm(forms.Form):
+    status = forms.ChoiceField(
+        required=False,
+        choices=(('', 'All statuses'),) + InterviewAttempt.STATUS_CHOICES,
+        widget=forms.Select(attrs={'class': 'form-select form-select-sm'})
+    )
+    order = forms.ChoiceField(
+        required=False,
+        choices=ORDER_CHOICES,
+        widget=forms.Select(attrs={'class': 'form-select form-select-sm'})
+    )
+
+class ResultsFilterForm(AttemptFilterForm):
+    recommendation = forms.ChoiceField(
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-select form-select-sm'})
+    )
+    min_rating = forms.DecimalField(
+        required=False, min_value=0, max_value=10, decimal_places=1,
+        widget=forms.NumberInput(attrs={'class': 'form-control form-control-sm', 'step': '0.5', 'placeholder': 'Min rating'})
+    )
+    max_rating = forms.DecimalField(
+        required=False, min_value=0, max_value=10, decimal_places=1,
+        widget=forms.NumberInput(attrs={'class': 'form-control form-control-sm', 'step': '0.5', 'placeholder': 'Max rating'})
+    )
+
+    def __init__(self, *args, recommendations=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['recommendation'].choices = [('', 'All recommendations')] + [(r, r) for r in recommendations]
@@ -1,114 +1,50 @@
-import os
 import json
-import google.generativeai as genai
+from asgiref.sync import sync_to_async
 from django.conf import settings
-from dotenv import load_dotenv
+from .context_window import estimate_tokens
+from .evaluation_schema import (
+    EVALUATION_FIELDS, evaluation_generation_config, parse_object_fields, validate_evaluation
+)
+from .prompt_cache import get_cached_compilation
+from .llm_backends import get_llm_backend
+from .routing import ROUTE_EVALUATION, ROUTE_OPENING, ROUTE_SUMMARY, ROUTE_TURN
+from .prompts import build_interview_prompt, format_criteria
+from .transcript import format_conversation
 
 class GeminiInterviewService:
     """
-    Service to handle AI interviews using Google Gemini
+    Service to handle AI interviews using Google Gemini.
+
+    Instances are cheap per-session chat handles. Model calls go through the
+    configured LLM backend (Gemini by default, see llm_backends).
     """
     
-    def __init__(self):
-        # Load environment variables
-        load_dotenv()
-        
-        # Get API key
-        api_key = os.getenv('GEMINI_API_KEY') or os.environ.get('GEMINI_API_KEY')
-        
-        if not api_key:
-            raise ValueError(
-                "GEMINI_API_KEY not found in environment variables. "
-                "Please add it to your .env file."
-            )
-        
-        # Configure Gemini API
-        genai.configure(api_key=api_key)
-        
-        # Initialize model - try multiple options
-        model_names = ['gemini-1.5-flash', 'gemini-1.5-pro', 'gemini-pro']
-        
-        self.model = None
-        for model_name in model_names:
-            try:
-                self.model = genai.GenerativeModel(model_name)
-                print(f"✓ Successfully initialized model: {model_name}")
-                break
-            except Exception as e:
-                print(f"✗ Failed to initialize {model_name}: {e}")
-                continue
-        
-        if not self.model:
-            raise ValueError("Failed to initialize any Gemini model")
-        
+    def __init__(self, backend=None):
+        self.backend = backend or get_llm_backend()
         self.chat = None
+        self.last_usage = {}
+        self.context_tokens = 0
+    
+    def get_usage(self, response):
+        """
+        Token counts the backend reported for a response
+        """
+        return {
+            'prompt_tokens': response.prompt_tokens,
+            'response_tokens': response.response_tokens,
+            'context_tokens': self.context_tokens,
+        }
     
     def create_interview_prompt(self, interview_context):
         """
         Create a detailed system prompt for the AI interviewer
         """
-        criteria_text = "\n".join([
-            f"- {c['criterion_name']}: {c['description']} (Weight: {c['weight']})"
-            for c in interview_context['criteria']
-        ])
-        
-        skills_text = "\n".join([
-            f"- {s['skill_name']}" + (f" ({s['proficiency_level']})" if s['proficiency_level'] else "")
-            for s in interview_context['skills']
-        ])
+        # Reuse the prompt compiled for this interview version when cached
+        compiled = get_cached_compilation(interview_context)
+        if compiled:
+            return compiled['system_prompt']
         
-        responsibilities_text = "\n".join([
-            f"- {r['responsibility']}"
-            for r in interview_context['responsibilities']
-        ])
-        
-        prompt = f"""You are an experienced technical interviewer conducting an interview for the position: {interview_context['title']}.
-
-Interview Description:
-{interview_context['description']}
-
-Duration: {interview_context['duration_minutes']} minutes
-
-EVALUATION CRITERIA (assess the candidate on these):
-{criteria_text}
-
-EXPECTED SKILLS TO ASSESS:
-{skills_text}
-
-ROLE RESPONSIBILITIES TO DISCUSS:
-{responsibilities_text}
-
-YOUR ROLE AS INTERVIEWER:
-1. Start with a warm greeting and ask the candidate to introduce themselves
-2. Ask relevant technical questions based on the expected skills
-3. Probe deeper based on candidate responses
-4. Ask behavioral questions related to the role responsibilities
-5. Ask problem-solving questions to assess critical thinking
-6. Be professional, encouraging, and supportive
-7. Keep track of time and ensure you cover all evaluation criteria
-8. At the end, thank the candidate and let them know the interview is complete
-
-INTERVIEWING GUIDELINES:
-- Ask one question at a time
-- Listen carefully to responses
-- Follow up with clarifying questions
-- Adjust difficulty based on candidate's level
-- Be respectful and encouraging
-- Take note of strengths and weaknesses
-- Assess communication skills throughout
-
-CONVERSATION FLOW:
-1. Introduction and warm-up (2-3 minutes)
-2. Technical questions (40% of time)
-3. Behavioral questions (30% of time)
-4. Problem-solving scenarios (20% of time)
-5. Candidate questions and closing (10% of time)
-
-After the interview is complete, you will be asked to provide evaluation results.
-
-Begin the interview now."""
-
-        return prompt
+        return build_interview_prompt(interview_context)
     
     def start_interview(self, interview_context):
         """
@@ -118,14 +54,15 @@ Begin the interview now."""
             system_prompt = self.create_interview_prompt(interview_context)
             
             # Start chat with system prompt
-            self.chat = self.model.start_chat(history=[])
+            self.chat = self.backend.start_chat([])
             
             # Get initial greeting
-            response = self.chat.send_message(system_prompt)
+            response = self.backend.send(self.chat, system_prompt, route=ROUTE_OPENING)
             
             return {
                 'success': True,
                 'message': response.text,
+                'usage': self.get_usage(response),
                 'session_active': True
             }
         except Exception as e:
@@ -134,6 +71,71 @@ Begin the interview now."""
                 'error': str(e)
             }
     
+    def build_chat_history(self, interview_context, conversation, summary='', summarized_upto=0):
+        """
+        Rebuild Gemini chat history from a stored conversation.
+        
+        Turns before summarized_upto are replaced by the running summary.
+        """
+        system_prompt = self.create_interview_prompt(interview_context)
+        
+        if summary:
+            system_prompt += (
+                "\n\nSUMMARY OF THE INTERVIEW SO FAR (earlier turns are omitted):\n"
+                f"{summary}\n\n"
+                "Continue the interview from where it left off."
+            )
+        
+        history = [{'role': 'user', 'parts': [system_prompt]}]
+        
+        for msg in conversation[summarized_upto:]:
+            history.append({
+                'role': 'model' if msg['role'] == 'ai' else 'user',
+                'parts': [msg['message']]
+            })
+        
+        return history
+    
+    def resume_interview(self, interview_context, conversation, summary='', summarized_upto=0):
+        """
+        Continue an interview session from its stored conversation
+        """
+        history = self.build_chat_history(interview_context, conversation, summary, summarized_upto)
+        self.context_tokens = sum(estimate_tokens(entry['parts'][0]) for entry in history)
+        self.chat = self.backend.start_chat(history)
+    
+    def create_summary_prompt(self, previous_summary, turns):
+        """
+        Create the prompt that folds older turns into the running summary
+        """
+        return f"""You are keeping notes on an ongoing job interview so it can continue without the full transcript.
+
+Current summary:
+{previous_summary or '(none yet)'}
+
+New conversation to add to the summary:
+{format_conversation(turns)}
+
+Write an updated summary in under 250 words. Keep the questions already asked, the candidate's key answers and examples, which skills and criteria have been covered, and any strengths or weaknesses observed.
+
+Updated summary:"""
+    
+    def summarize_turns(self, previous_summary, turns):
+        """
+        Fold turns into the running summary
+        """
+        try:
+            response = self.backend.generate(self.create_summary_prompt(previous_summary, turns), route=ROUTE_SUMMARY)
+            return {
+                'success': True,
+                'summary': response.text.strip()
+            }
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e)
+            }
+    
     def send_message(self, user_message):
         """
         Send candidate's message and get AI response
@@ -145,10 +147,11 @@ Begin the interview now."""
             }
         
         try:
-            response = self.chat.send_message(user_message)
+            response = self.backend.send(self.chat, user_message, route=ROUTE_TURN)
             return {
                 'success': True,
-                'message': response.text
+                'message': response.text,
+                'usage': self.get_usage(response)
             }
         except Exception as e:
             return {
@@ -156,14 +159,30 @@ Begin the interview now."""
                 'error': str(e)
             }
     
-    def generate_evaluation(self, interview_context, conversation_history):
+    def stream_message(self, user_message):
         """
-        Generate final evaluation based on the interview
+        Send candidate's message and yield the AI response as it streams in
+        """
+        if not self.chat:
+            raise ValueError('Interview session not started')
+        
+        for chunk in self.backend.stream(self.chat, user_message, route=ROUTE_TURN):
+            yield chunk
+        self.last_usage = self.get_usage(self.chat.last_response)
+    
+    def get_criteria_text(self, interview_context):
+        """
+        Evaluation criteria as prompt text, from the compiled prompt when cached
+        """
+        compiled = get_cached_compilation(interview_context)
+        return compiled['criteria_text'] if compiled else format_criteria(interview_context['criteria'])
+    
+    def create_evaluation_prompt(self, interview_context, conversation_history):
+        """
+        Create the prompt asking Gemini to evaluate the interview
         """
-        criteria_text = "\n".join([
-            f"- {c['criterion_name']}: {c['description']} (Weight: {c['weight']})"
-            for c in interview_context['criteria']
-        ])
+        criteria_text = self.get_criteria_text(interview_context)
+        criteria_names = ', '.join(c['criterion_name'] for c in interview_context['criteria']) or '(none)'
         
         evaluation_prompt = f"""Based on the following interview conversation, provide a comprehensive evaluation of the candidate.
 
@@ -184,9 +203,14 @@ Please provide the evaluation in the following JSON format:
     "feedback": "<detailed overall feedback>",
     "strengths": "<key strengths observed>",
     "weaknesses": "<areas for improvement>",
-    "recommendation": "<one of: 'Highly Recommended', 'Recommended', 'Maybe', 'Not Recommended'>"
+    "recommendation": "<one of: 'Highly Recommended', 'Recommended', 'Maybe', 'Not Recommended'>",
+    "criterion_scores": [
+        {{"criterion": "<criterion name>", "score": <number between 1-10>, "assessed": <false if the interview gave no evidence for it>}}
+    ]
 }}
 
+"criterion_scores" has one entry per evaluation criterion ({criteria_names}).
+
 Consider:
 - Technical knowledge and skills demonstrated
 - Communication clarity and professionalism
@@ -197,42 +221,228 @@ Consider:
 
 Provide your evaluation:"""
 
-        try:
-            response = self.model.generate_content(evaluation_prompt)
+        return evaluation_prompt
+    
+    def create_segment_prompt(self, interview_context, segment_history, index, count):
+        """
+        Create the prompt scoring one segment of a long interview
+        """
+        criteria_names = ', '.join(c['criterion_name'] for c in interview_context['criteria']) or '(none)'
+        
+        return f"""You are evaluating part {index} of {count} of a longer job interview. Judge the candidate only on this excerpt; the other parts are scored separately.
+
+Interview Position: {interview_context['title']}
+
+Evaluation Criteria:
+{self.get_criteria_text(interview_context)}
+
+Interview Excerpt:
+{segment_history}
+
+Respond with a JSON object with these fields:
+- "technical_score", "communication_score", "problem_solving_score": numbers between 1-10 for this excerpt
+- "criterion_scores": one entry per criterion ({criteria_names}) with "criterion", a "score" between 1-10 and "assessed" set to false if the excerpt gives no evidence for that criterion
+- "strengths" and "weaknesses": what this excerpt shows
+- "summary": two or three sentences on what was discussed and how the candidate did"""
+    
+    def create_reduce_prompt(self, interview_context, scores, segment_notes):
+        """
+        Create the prompt that writes the final feedback from segment results
+        """
+        notes = "\n\n".join(
+            f"Part {n}:\nSummary: {note['summary']}\nStrengths: {note['strengths']}\nWeaknesses: {note['weaknesses']}"
+            for n, note in enumerate(segment_notes, start=1)
+        )
+        
+        return f"""A long job interview for the position "{interview_context['title']}" was evaluated in {len(segment_notes)} parts.
+
+Combined scores (1-10):
+{json.dumps(scores, indent=2)}
+
+Notes from each part:
+{notes}
+
+Write the final evaluation as a JSON object with:
+- "overall_rating": your overall rating of the candidate for this position, a number between 1-10, judged on the whole interview rather than averaged from the scores above
+- "feedback": detailed overall feedback
+- "strengths": key strengths observed across the interview
+- "weaknesses": areas for improvement
+- "recommendation": one of 'Highly Recommended', 'Recommended', 'Maybe', 'Not Recommended', consistent with the scores"""
+    
+    def create_field_retry_prompt(self, evaluation_prompt, evaluation, failed_fields):
+        """
+        Ask again for only the evaluation fields that were missing or invalid
+        """
+        return f"""{evaluation_prompt}
+
+Part of this evaluation has already been written:
+{json.dumps(evaluation, indent=2)}
+
+These fields were missing or invalid: {', '.join(failed_fields)}.
+Respond with a JSON object containing only those fields. Scores are numbers between 1 and 10 and the recommendation must be one of: 'Highly Recommended', 'Recommended', 'Maybe', 'Not Recommended'."""
+    
+    def parse_evaluation(self, response_text, field_names=None):
+        """
+        Extract the evaluation fields from Gemini's response text.
+        
+        Returns (valid fields, names of fields that are missing or invalid).
+        """
+        fields, _ = parse_object_fields(response_text)
+        return validate_evaluation(fields, field_names)
+    
+    def evaluation_result(self, evaluation, failed_fields):
+        if failed_fields:
+            return {
+                'success': False,
+                'error': f"Evaluation fields missing or invalid: {', '.join(failed_fields)}"
+            }
+        return {
+            'success': True,
+            'evaluation': evaluation
+        }
+    
+    def structured_steps(self, prompt, field_names):
+        """
+        Retry loop shared by generate_structured and generate_structured_async.
+        
+        Yields (prompt, generation_config) for each model call and is sent
+        back the reply text. Fields the model leaves out or gets wrong are
+        asked for again, up to EVALUATION_FIELD_RETRIES times, without
+        regenerating the rest. Returns the evaluation result.
+        """
+        retries = getattr(settings, 'EVALUATION_FIELD_RETRIES', 1)
+        
+        evaluation = {}
+        failed_fields = list(field_names)
+        retry_prompt = prompt
+        
+        for attempt in range(retries + 1):
+            response_text = yield retry_prompt, evaluation_generation_config(failed_fields)
+            parsed, failed_fields = self.parse_evaluation(response_text, failed_fields)
+            evaluation.update(parsed)
             
-            # Extract JSON from response
-            result_text = response.text.strip()
+            if not failed_fields:
+                break
+            retry_prompt = self.create_field_retry_prompt(prompt, evaluation, failed_fields)
+        
+        return self.evaluation_result(evaluation, failed_fields)
+    
+    def generate_structured(self, prompt, field_names=EVALUATION_FIELDS):
+        """
+        Generate JSON fields against the evaluation schema
+        """
+        steps = self.structured_steps(prompt, field_names)
+        
+        try:
+            retry_prompt, generation_config = next(steps)
+            while True:
+                response = self.backend.generate(
+                    retry_prompt,
+                    route=ROUTE_EVALUATION,
+                    generation_config=generation_config
+                )
+                retry_prompt, generation_config = steps.send(response.text)
+        except StopIteration as done:
+            return done.value
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e)
+            }
+    
+    def generate_evaluation(self, interview_context, conversation_history):
+        """
+        Generate final evaluation based on the interview
+        """
+        evaluation_prompt = self.create_evaluation_prompt(interview_context, conversation_history)
+        return self.generate_structured(evaluation_prompt)
+    
+    async def start_interview_async(self, interview_context):
+        """
+        Start a new interview session without blocking the event loop
+        """
+        try:
+            # The compiled prompt is read from the cache, which may be the database
+            system_prompt = await sync_to_async(self.create_interview_prompt)(interview_context)
             
-            # Remove markdown code blocks if present
-            if result_text.startswith('```json'):
-                result_text = result_text.split('```json')[1].split('```')[0].strip()
-            elif result_text.startswith('```'):
-                result_text = result_text.split('```')[1].split('```')[0].strip()
+            # Start chat with system prompt
+            self.chat = self.backend.start_chat([])
             
-            evaluation = json.loads(result_text)
+            # Get initial greeting
+            response = await self.backend.asend(self.chat, system_prompt, route=ROUTE_OPENING)
             
             return {
                 'success': True,
-                'evaluation': evaluation
+                'message': response.text,
+                'usage': self.get_usage(response),
+                'session_active': True
             }
-            
-        except json.JSONDecodeError as e:
-            # If JSON parsing fails, return a default evaluation
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e)
+            }
+    
+    async def send_message_async(self, user_message):
+        """
+        Send candidate's message and await AI response
+        """
+        if not self.chat:
+            return {
+                'success': False,
+                'error': 'Interview session not started'
+            }
+        
+        try:
+            response = await self.backend.asend(self.chat, user_message, route=ROUTE_TURN)
             return {
                 'success': True,
-                'evaluation': {
-                    'overall_rating': 7.0,
-                    'technical_score': 7.0,
-                    'communication_score': 7.0,
-                    'problem_solving_score': 7.0,
-                    'feedback': 'The candidate showed good understanding and communication skills during the interview.',
-                    'strengths': 'Good communication and technical understanding.',
-                    'weaknesses': 'Could improve on providing more detailed examples.',
-                    'recommendation': 'Recommended'
-                }
+                'message': response.text,
+                'usage': self.get_usage(response)
             }
         except Exception as e:
             return {
                 'success': False,
                 'error': str(e)
-            }
\ No newline at end of file
+            }
+    
+    async def stream_message_async(self, user_message):
+        """
+        Send candidate's message and asynchronously yield the streamed AI response
+        """
+        if not self.chat:
+            raise ValueError('Interview session not started')
+        
+        async for chunk in self.backend.astream(self.chat, user_message, route=ROUTE_TURN):
+            yield chunk
+        self.last_usage = self.get_usage(self.chat.last_response)
+    
+    async def generate_structured_async(self, prompt, field_names=EVALUATION_FIELDS):
+        """
+        Async version of generate_structured
+        """
+        steps = self.structured_steps(prompt, field_names)
+        
+        try:
+            retry_prompt, generation_config = next(steps)
+            while True:
+                response = await self.backend.agenerate(
+                    retry_prompt,
+                    route=ROUTE_EVALUATION,
+                    generation_config=generation_config
+                )
+                retry_prompt, generation_config = steps.send(response.text)
+        except StopIteration as done:
+            return done.value
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e)
+            }
+    
+    async def generate_evaluation_async(self, interview_context, conversation_history):
+        """
+        Generate final evaluation without blocking the event loop
+        """
+        evaluation_prompt = await sync_to_async(self.create_evaluation_prompt)(interview_context, conversation_history)
+        return await self.generate_structured_async(evaluation_prompt)
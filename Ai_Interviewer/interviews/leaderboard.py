@@ -0,0 +1,204 @@
+"""
+Incrementally maintained leaderboard per interview.
+
+Each interview has one InterviewLeaderboard row holding the result count,
+the count per recommendation, running mean and variance of every score and
+the top LEADERBOARD_TOP_K results by overall rating. Signals (see
+signals.py) update it whenever an InterviewResult is saved or deleted:
+the result's previous values are taken out and the new ones put in, so an
+update costs O(K) instead of a scan and sort of all results. Means and
+variances are kept with Welford's online algorithm, which also runs in
+reverse to remove a value.
+
+The only time the results are read again is when a top-K result drops out
+(deleted, or re-scored lower while others are waiting below it): the top K
+are then fetched again with one ordered query. A leaderboard that does not
+exist yet, or was skewed by bulk writes that skip signals, is rebuilt from
+all results with rebuild_leaderboard().
+"""
+import math
+from django.conf import settings
+from django.db import transaction
+from .models import InterviewLeaderboard, InterviewResult
+
+SCORE_FIELDS = ('overall_rating', 'weighted_score', 'technical_score', 'communication_score', 'problem_solving_score')
+
+
+def top_k():
+    return getattr(settings, 'LEADERBOARD_TOP_K', 10)
+
+
+def result_entry(values):
+    """
+    What the leaderboard keeps of one result, from a result or a values() dict
+    """
+    get = values.get if isinstance(values, dict) else lambda name: getattr(values, name)
+    entry = {
+        'attempt_id': get('attempt_id'),
+        'recommendation': get('recommendation'),
+    }
+    for field in SCORE_FIELDS:
+        score = get(field)
+        entry[field] = float(score) if score is not None else None
+    return entry
+
+
+def previous_entry(result):
+    """
+    The stored values of a result about to be saved, or None if it is new
+    """
+    if result.pk is None:
+        return None
+    values = InterviewResult.objects.filter(pk=result.pk).values('attempt_id', 'recommendation', *SCORE_FIELDS).first()
+    return result_entry(values) if values else None
+
+
+# Welford's running mean and variance
+
+def add_score(stats, x):
+    n = stats['n'] + 1
+    delta = x - stats['mean']
+    mean = stats['mean'] + delta / n
+    stats.update(n=n, mean=mean, m2=stats['m2'] + delta * (x - mean))
+
+
+def remove_score(stats, x):
+    n = stats['n'] - 1
+    if n <= 0:
+        stats.update(n=0, mean=0.0, m2=0.0)
+        return
+    mean = (stats['n'] * stats['mean'] - x) / n
+    stats.update(n=n, mean=mean, m2=max(0.0, stats['m2'] - (x - stats['mean']) * (x - mean)))
+
+
+def rank_key(entry):
+    return (-entry['overall_rating'], entry['attempt_id'])
+
+
+def top_entry(entry, username):
+    return {
+        'attempt_id': entry['attempt_id'],
+        'candidate': username,
+        'overall_rating': entry['overall_rating'],
+        'recommendation': entry['recommendation'],
+    }
+
+
+def fetch_top(interview_id, k):
+    """
+    The top k results of an interview, straight from the database
+    """
+    results = InterviewResult.objects.filter(
+        attempt__interview_id=interview_id
+    ).select_related('attempt__candidate').order_by('-overall_rating', 'attempt_id')[:k]
+    return [top_entry(result_entry(result), result.attempt.candidate.username) for result in results]
+
+
+def apply_change(board, old, new, username=None):
+    """
+    Take a result's old entry out of the leaderboard and put its new one in
+    """
+    if old is not None:
+        board.result_count -= 1
+        counts = board.recommendation_counts
+        counts[old['recommendation']] = counts.get(old['recommendation'], 0) - 1
+        if counts[old['recommendation']] <= 0:
+            del counts[old['recommendation']]
+        for field in SCORE_FIELDS:
+            if old[field] is not None and field in board.score_stats:
+                remove_score(board.score_stats[field], old[field])
+
+    if new is not None:
+        board.result_count += 1
+        counts = board.recommendation_counts
+        counts[new['recommendation']] = counts.get(new['recommendation'], 0) + 1
+        for field in SCORE_FIELDS:
+            if new[field] is not None:
+                add_score(board.score_stats.setdefault(field, {'n': 0, 'mean': 0.0, 'm2': 0.0}), new[field])
+
+    # Top K: drop the result's old place and rank it again
+    attempt_id = (new or old)['attempt_id']
+    k = top_k()
+    was_top = any(entry['attempt_id'] == attempt_id for entry in board.top_results)
+    top = [entry for entry in board.top_results if entry['attempt_id'] != attempt_id]
+
+    # A top result re-scored lower may now rank below results not in the list
+    fell = was_top and old is not None and new is not None and rank_key(new) > rank_key(old)
+    if new is not None and not (fell and board.result_count > k):
+        top.append(top_entry(new, username))
+        top.sort(key=rank_key)
+        top = top[:k]
+
+    if len(top) < min(k, board.result_count):
+        top = fetch_top(board.interview_id, k)
+    board.top_results = top
+
+
+def rebuild_leaderboard(interview_id):
+    """
+    Recompute an interview's leaderboard from all of its results
+    """
+    with transaction.atomic():
+        board, _ = InterviewLeaderboard.objects.select_for_update().get_or_create(interview_id=interview_id)
+        board.result_count = 0
+        board.recommendation_counts = {}
+        board.score_stats = {}
+        board.top_results = []
+
+        values = InterviewResult.objects.filter(
+            attempt__interview_id=interview_id
+        ).values('attempt_id', 'recommendation', *SCORE_FIELDS)
+        for row in values.iterator(chunk_size=2000):
+            entry = result_entry(row)
+            board.result_count += 1
+            board.recommendation_counts[entry['recommendation']] = board.recommendation_counts.get(entry['recommendation'], 0) + 1
+            for field in SCORE_FIELDS:
+                if entry[field] is not None:
+                    add_score(board.score_stats.setdefault(field, {'n': 0, 'mean': 0.0, 'm2': 0.0}), entry[field])
+
+        board.top_results = fetch_top(interview_id, top_k())
+        board.save()
+    return board
+
+
+def record_result(interview_id, old, new, username=None):
+    """
+    Update the interview's leaderboard for a saved (new) or deleted (old) result
+    """
+    with transaction.atomic():
+        board = InterviewLeaderboard.objects.select_for_update().filter(interview_id=interview_id).first()
+        if board is None:
+            # First result since the leaderboard was last built: build it from scratch
+            if new is not None:
+                rebuild_leaderboard(interview_id)
+            return
+
+        apply_change(board, old, new, username)
+        board.save()
+
+
+def get_leaderboard(interview):
+    """
+    The interview's leaderboard, built on first use
+    """
+    board = InterviewLeaderboard.objects.filter(interview=interview).first()
+    return board if board is not None else rebuild_leaderboard(interview.id)
+
+
+def score_summary(board):
+    """
+    Count, mean and standard deviation of each score, for display
+    """
+    summary = []
+    for field in SCORE_FIELDS:
+        stats = board.score_stats.get(field)
+        if not stats or not stats['n']:
+            continue
+        variance = stats['m2'] / (stats['n'] - 1) if stats['n'] > 1 else 0.0
+        summary.append({
+            'name': field.replace('_', ' ').title(),
+            'count': stats['n'],
+            'mean': round(stats['mean'], 2),
+            'stdev': round(math.sqrt(variance), 2),
+        })
+    return summary
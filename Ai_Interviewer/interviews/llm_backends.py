@@ -0,0 +1,931 @@
+"""
+LLM backends used by the interview service.
+
+A backend knows how to start a chat from a history, send a message, stream a
+reply and generate a one-off completion, both sync and async. Histories use
+Gemini's format: [{'role': 'user' | 'model', 'parts': [text]}].
+
+GeminiBackend talks to Google Gemini through a process-wide model pool,
+with per-call timeouts, retries, per-model circuit breakers and optional
+hedging across models. Calls carry a route (see routing.py) that picks the
+models to use for that kind of call.
+LocalBackend is deterministic and needs no network; its latency and token
+rate are drawn from configurable distributions so the interview flow can be
+load-tested and regression-tested without Gemini. The backend is selected
+with the INTERVIEW_LLM_BACKEND and INTERVIEW_LLM_BACKEND_OPTIONS settings.
+"""
+import os
+import asyncio
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from asgiref.sync import sync_to_async
+import google.generativeai as genai
+from django.conf import settings
+from django.utils.module_loading import import_string
+from dotenv import load_dotenv
+from .context_window import estimate_tokens
+from .routing import get_model_router
+
+# Models to try, in order of preference
+MODEL_NAMES = ['gemini-1.5-flash', 'gemini-1.5-pro', 'gemini-pro']
+
+# Latency samples kept per model for the hedging threshold
+LATENCY_SAMPLE_SIZE = 200
+
+
+class CircuitBreaker:
+    """
+    Per-model circuit breaker.
+
+    After failure_threshold consecutive failures the circuit opens and the
+    model is skipped. Once reset_after seconds have passed it is half-open:
+    calls are allowed again, and a single failure opens it once more while
+    a success closes it.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=3, reset_after=60):
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self.failures = 0
+        self.opened_at = None
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self.opened_at >= self.reset_after:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allows_request(self):
+        return self.state != self.OPEN
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+    def trip(self):
+        self.failures = max(self.failures, self.failure_threshold)
+        self.opened_at = time.monotonic()
+
+
+class GeminiModelPool:
+    """
+    Process-wide Gemini client and model registry.
+
+    The API is configured once per worker and model handles are shared by
+    every interview session. Each model has a circuit breaker and a window
+    of recent latencies used to decide when to hedge a slow call.
+    """
+
+    def __init__(self, model_names=None):
+        self.model_names = list(model_names or MODEL_NAMES)
+        self._lock = threading.Lock()
+        self._configured = False
+        self._models = {}
+        self._breakers = {
+            name: CircuitBreaker(
+                failure_threshold=getattr(settings, 'LLM_CIRCUIT_FAILURE_THRESHOLD', 3),
+                reset_after=getattr(settings, 'LLM_CIRCUIT_RESET_SECONDS', 60),
+            )
+            for name in self.model_names
+        }
+        self._latencies = {name: deque(maxlen=LATENCY_SAMPLE_SIZE) for name in self.model_names}
+
+    def configure(self):
+        """
+        Load the API key and configure Gemini (only once per process)
+        """
+        if self._configured:
+            return
+
+        with self._lock:
+            if self._configured:
+                return
+
+            # Load environment variables
+            load_dotenv()
+
+            # Get API key
+            api_key = os.getenv('GEMINI_API_KEY') or os.environ.get('GEMINI_API_KEY')
+
+            if not api_key:
+                raise ValueError(
+                    "GEMINI_API_KEY not found in environment variables. "
+                    "Please add it to your .env file."
+                )
+
+            # Configure Gemini API
+            genai.configure(api_key=api_key)
+            self._configured = True
+
+    def available_models(self):
+        """
+        Model names whose circuit allows a call, in order of preference
+        """
+        with self._lock:
+            names = [name for name in self.model_names if self._breakers[name].allows_request()]
+
+        if not names:
+            raise ValueError("Failed to initialize any Gemini model")
+        return names
+
+    @property
+    def active_model_name(self):
+        try:
+            return self.available_models()[0]
+        except ValueError:
+            return None
+
+    def get_model(self, model_name=None):
+        """
+        Return the shared handle for a model (the preferred available one by default)
+        """
+        self.configure()
+        model_name = model_name or self.available_models()[0]
+
+        with self._lock:
+            if model_name not in self._models:
+                try:
+                    self._models[model_name] = genai.GenerativeModel(model_name)
+                    print(f"✓ Successfully initialized model: {model_name}")
+                except Exception as e:
+                    print(f"✗ Failed to initialize {model_name}: {e}")
+                    self._breakers[model_name].trip()
+                    raise
+            return self._models[model_name]
+
+    def report_success(self, model_name, latency=None):
+        with self._lock:
+            self._breakers[model_name].record_success()
+            if latency is not None:
+                self._latencies[model_name].append(latency)
+
+    def report_failure(self, model_name):
+        """
+        Count a failed call against the model's circuit breaker
+        """
+        with self._lock:
+            breaker = self._breakers[model_name]
+            breaker.record_failure()
+            state = breaker.state
+        print(f"✗ Model {model_name} failed (circuit {state})")
+
+    def latency_percentile(self, model_name, percentile, min_samples=20):
+        """
+        Latency in seconds below which the given percentage of recent calls
+        finished, or None until enough calls have been seen
+        """
+        with self._lock:
+            samples = sorted(self._latencies[model_name])
+
+        if len(samples) < min_samples:
+            return None
+        index = min(len(samples) - 1, int(len(samples) * percentile / 100))
+        return samples[index]
+
+    def stats(self):
+        stats = {}
+        for name in self.model_names:
+            p95 = self.latency_percentile(name, 95)
+            stats[name] = {
+                'circuit': self._breakers[name].state,
+                'failures': self._breakers[name].failures,
+                'p95_latency_ms': int(p95 * 1000) if p95 is not None else None,
+            }
+        return stats
+
+    def health_check(self):
+        """
+        Probe every configured model and reset or trip its circuit
+        """
+        self.configure()
+
+        models = {}
+        for model_name in self.model_names:
+            try:
+                genai.get_model(f'models/{model_name}')
+                models[model_name] = True
+            except Exception:
+                models[model_name] = False
+
+        with self._lock:
+            for model_name, ok in models.items():
+                if ok:
+                    self._breakers[model_name].record_success()
+                else:
+                    self._breakers[model_name].trip()
+
+        active_model = self.active_model_name
+        return {
+            'healthy': active_model is not None,
+            'active_model': active_model,
+            'models': models,
+            'circuits': self.stats(),
+        }
+
+
+_model_pool = None
+_model_pool_lock = threading.Lock()
+
+
+def get_model_pool():
+    """
+    Return the model pool shared by this worker process
+    """
+    global _model_pool
+
+    if _model_pool is None:
+        with _model_pool_lock:
+            if _model_pool is None:
+                routed = [name for name in get_model_router().model_names() if name not in MODEL_NAMES]
+                _model_pool = GeminiModelPool(MODEL_NAMES + routed)
+    return _model_pool
+
+
+class LLMResponse:
+    """
+    A completed reply from any backend
+    """
+
+    def __init__(self, text, prompt_tokens=None, response_tokens=None, model_name=None):
+        self.text = text
+        self.prompt_tokens = prompt_tokens
+        self.response_tokens = response_tokens
+        self.model_name = model_name
+
+
+class BaseLLMBackend:
+    """
+    Interface every LLM backend implements.
+
+    Async methods default to running the sync ones in a worker thread.
+    """
+    name = 'base'
+
+    def start_chat(self, history):
+        """
+        Return a chat handle that continues from the given history
+        """
+        raise NotImplementedError
+
+    def send(self, chat, message, route=None):
+        """
+        Send a message on a chat and return an LLMResponse.
+
+        route names the kind of call (see routing.py); backends with a
+        single model may ignore it.
+        """
+        raise NotImplementedError
+
+    def stream(self, chat, message, route=None):
+        """
+        Send a message and yield text chunks as they arrive.
+
+        Once exhausted, chat.last_response holds the complete LLMResponse.
+        """
+        raise NotImplementedError
+
+    def generate(self, prompt, route=None, **options):
+        """
+        One-off completion outside any chat
+        """
+        raise NotImplementedError
+
+    def health_check(self):
+        return {'healthy': True, 'backend': self.name}
+
+    def model_identity(self, route=None):
+        """
+        Identifies the model(s) that answer a route, for cache keys
+        """
+        return self.name
+
+    async def asend(self, chat, message, route=None):
+        return await sync_to_async(self.send, thread_sensitive=False)(chat, message, route)
+
+    async def astream(self, chat, message, route=None):
+        for chunk in await sync_to_async(lambda: list(self.stream(chat, message, route)), thread_sensitive=False)():
+            yield chunk
+
+    async def agenerate(self, prompt, route=None, **options):
+        return await sync_to_async(self.generate, thread_sensitive=False)(prompt, route, **options)
+
+
+class GeminiChat:
+    """
+    Per-session handle on a Gemini chat
+    """
+
+    def __init__(self, model_name, session):
+        self.model_name = model_name
+        self.session = session
+        self.last_response = None
+
+
+_call_executor = None
+_call_executor_lock = threading.Lock()
+
+
+def get_call_executor():
+    """
+    Thread pool that runs sync Gemini calls so they can be timed out and hedged
+    """
+    global _call_executor
+
+    if _call_executor is None:
+        with _call_executor_lock:
+            if _call_executor is None:
+                _call_executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'LLM_CALL_THREADS', 32),
+                    thread_name_prefix='gemini-call'
+                )
+    return _call_executor
+
+
+class CallAbandoned(TimeoutError):
+    """
+    A sync call passed its deadline while still running. Its thread cannot be
+    stopped, so the call is not retried until that thread comes back.
+    """
+
+
+class GeminiBackend(BaseLLMBackend):
+    """
+    Google Gemini, using the shared model pool.
+
+    Every call gets a timeout and is retried with jittered backoff, moving
+    to the next model on each retry; models whose circuit is open are
+    skipped. With hedging on, a call the preferred model hasn't answered
+    within its recent p95 latency is also sent to the next model and the
+    first reply wins. A sync call still running at its deadline is counted
+    as a failure of its model straight away and ends the call instead of
+    being retried, so abandoned threads cannot pile up behind admission
+    control. Chats are rebuilt from their history for each try,
+    so a turn can move between models mid-interview. The model order for
+    each call comes from the router for the call's route.
+    """
+    name = 'gemini'
+
+    def __init__(self, model_names=None, timeout=None, retries=None, retry_backoff=None,
+                 hedge=None, hedge_percentile=None, hedge_initial_delay=None, router=None):
+        self.pool = GeminiModelPool(model_names) if model_names else get_model_pool()
+        self.router = router or get_model_router()
+        self.timeout = timeout or getattr(settings, 'LLM_CALL_TIMEOUT_SECONDS', 30)
+        self.retries = retries if retries is not None else getattr(settings, 'LLM_CALL_RETRIES', 2)
+        self.retry_backoff = retry_backoff or getattr(settings, 'LLM_RETRY_BACKOFF_SECONDS', 0.5)
+        self.hedge = hedge if hedge is not None else getattr(settings, 'LLM_HEDGE_ENABLED', False)
+        self.hedge_percentile = hedge_percentile or getattr(settings, 'LLM_HEDGE_PERCENTILE', 95)
+        self.hedge_initial_delay = hedge_initial_delay or getattr(settings, 'LLM_HEDGE_INITIAL_DELAY_SECONDS', 8)
+
+    def to_response(self, response, model_name, text=None):
+        usage = getattr(response, 'usage_metadata', None)
+        return LLMResponse(
+            text if text is not None else response.text,
+            prompt_tokens=getattr(usage, 'prompt_token_count', None),
+            response_tokens=getattr(usage, 'candidates_token_count', None),
+            model_name=model_name,
+        )
+
+    def finish(self, route, response, model_name, text=None):
+        """
+        Convert a reply and count its tokens against the route
+        """
+        result = self.to_response(response, model_name, text)
+        self.router.record_tokens(route, model_name, result.prompt_tokens, result.response_tokens)
+        return result
+
+    def request_options(self):
+        return {'timeout': self.timeout}
+
+    def backoff(self, attempt):
+        """
+        Jittered exponential delay before retry number `attempt`
+        """
+        return self.retry_backoff * (2 ** (attempt - 1)) * random.uniform(0.5, 1.5)
+
+    def plan(self, attempt, route=None):
+        """
+        Pick the model for a try and, when hedging, its fallback and the delay
+        """
+        names = self.router.order(route, self.pool.available_models())
+        primary = names[attempt % len(names)]
+        fallback = next((name for name in names if name != primary), None)
+
+        hedge_delay = None
+        if self.hedge and fallback:
+            hedge_delay = self.pool.latency_percentile(primary, self.hedge_percentile) or self.hedge_initial_delay
+        return primary, fallback, hedge_delay
+
+    def report(self, route, model_name, started, ok):
+        """
+        Record a call's outcome with the pool and the router
+        """
+        elapsed = time.monotonic() - started
+        if ok:
+            self.pool.report_success(model_name, elapsed)
+        else:
+            self.pool.report_failure(model_name)
+        self.router.record(route, model_name, elapsed, ok)
+
+    def timed_call(self, call, model_name, route=None, abandoned=None):
+        """
+        Run call(model_name, model) and report the outcome, unless the try
+        was abandoned at its deadline and already reported as a failure
+        """
+        started = time.monotonic()
+        try:
+            result = call(model_name, self.pool.get_model(model_name))
+        except Exception:
+            if abandoned is None or not abandoned.is_set():
+                self.report(route, model_name, started, False)
+            raise
+
+        if abandoned is not None and abandoned.is_set():
+            raise CallAbandoned(f"{model_name} answered after the deadline")
+
+        elapsed = time.monotonic() - started
+        if elapsed > self.timeout:
+            self.report(route, model_name, started, False)
+            raise TimeoutError(f"{model_name} answered after {elapsed:.1f}s")
+
+        self.report(route, model_name, started, True)
+        return result
+
+    def race(self, call, route, primary, fallback, hedge_delay):
+        """
+        Run one try, hedged on the fallback model if the primary is slow
+        """
+        executor = get_call_executor()
+        started = time.monotonic()
+        abandoned = threading.Event()
+        models = {executor.submit(self.timed_call, call, primary, route, abandoned): primary}
+        pending = set(models)
+        hedged = hedge_delay is None
+        error = None
+
+        while pending:
+            elapsed = time.monotonic() - started
+            if elapsed >= self.timeout:
+                self.abandon(route, models, pending, abandoned, started)
+
+            wait_for = self.timeout - elapsed
+            if not hedged:
+                wait_for = min(wait_for, max(0, hedge_delay - elapsed))
+
+            done, pending = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    return future.result()
+                except Exception as e:
+                    error = e
+
+            if not hedged and (time.monotonic() - started >= hedge_delay or not pending):
+                hedged = True
+                future = executor.submit(self.timed_call, call, fallback, route, abandoned)
+                models[future] = fallback
+                pending.add(future)
+
+        raise error
+
+    def abandon(self, route, models, pending, abandoned, started):
+        """
+        Give up on a try at its deadline. Calls still queued are cancelled;
+        calls already running are reported as failures of their model now,
+        and CallAbandoned stops call() from retrying on top of them.
+        """
+        abandoned.set()
+        running = [models[future] for future in pending if not future.cancel()]
+        for model_name in running:
+            self.report(route, model_name, started, False)
+        if running:
+            raise CallAbandoned(f"No reply from {', '.join(running)} within {self.timeout}s")
+        raise TimeoutError(f"No reply within {self.timeout}s")
+
+    def call(self, call, route=None):
+        """
+        Run call(model_name, model) with timeouts, retries, failover and hedging
+        """
+        error = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                time.sleep(self.backoff(attempt))
+            try:
+                return self.race(call, route, *self.plan(attempt, route))
+            except CallAbandoned:
+                raise
+            except Exception as e:
+                error = e
+        raise error
+
+    async def atimed_call(self, call, model_name, route=None):
+        started = time.monotonic()
+        try:
+            result = await asyncio.wait_for(call(model_name, self.pool.get_model(model_name)), self.timeout)
+        except Exception:
+            self.report(route, model_name, started, False)
+            raise
+
+        self.report(route, model_name, started, True)
+        return result
+
+    async def arace(self, call, route, primary, fallback, hedge_delay):
+        """
+        Async version of race(); the losing call is cancelled
+        """
+        pending = {asyncio.ensure_future(self.atimed_call(call, primary, route))}
+        error = None
+
+        try:
+            if hedge_delay is not None:
+                done, pending = await asyncio.wait(pending, timeout=hedge_delay)
+                for task in done:
+                    try:
+                        return task.result()
+                    except Exception as e:
+                        error = e
+                pending.add(asyncio.ensure_future(self.atimed_call(call, fallback, route)))
+
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    try:
+                        return task.result()
+                    except Exception as e:
+                        error = e
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def acall(self, call, route=None):
+        """
+        Async version of call()
+        """
+        error = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                await asyncio.sleep(self.backoff(attempt))
+            try:
+                return await self.arace(call, route, *self.plan(attempt, route))
+            except Exception as e:
+                error = e
+        raise error
+
+    def start_chat(self, history):
+        model_name = self.pool.available_models()[0]
+        return GeminiChat(model_name, self.pool.get_model(model_name).start_chat(history=history))
+
+    def send(self, chat, message, route=None):
+        history = list(chat.session.history)
+
+        def call(model_name, model):
+            session = model.start_chat(history=history)
+            return model_name, session, session.send_message(message, request_options=self.request_options())
+
+        chat.model_name, chat.session, response = self.call(call, route)
+        chat.last_response = self.finish(route, response, chat.model_name)
+        return chat.last_response
+
+    def stream(self, chat, message, route=None):
+        """
+        Stream a reply, failing over to another model only until the first
+        chunk has been sent (no hedging once the candidate sees tokens)
+        """
+        history = list(chat.session.history)
+        error = None
+
+        for attempt in range(self.retries + 1):
+            if attempt:
+                time.sleep(self.backoff(attempt))
+
+            model_name = None
+            parts = []
+            try:
+                model_name = self.plan(attempt, route)[0]
+                started = time.monotonic()
+                session = self.pool.get_model(model_name).start_chat(history=history)
+                response = session.send_message(message, stream=True, request_options=self.request_options())
+                for chunk in response:
+                    if chunk.text:
+                        parts.append(chunk.text)
+                        yield chunk.text
+            except Exception as e:
+                if model_name:
+                    self.report(route, model_name, started, False)
+                if parts:
+                    raise
+                error = e
+                continue
+
+            self.report(route, model_name, started, True)
+            chat.model_name, chat.session = model_name, session
+            chat.last_response = self.finish(route, response, model_name, ''.join(parts))
+            return
+
+        raise error
+
+    def generate(self, prompt, route=None, **options):
+        def call(model_name, model):
+            return model_name, model.generate_content(prompt, request_options=self.request_options(), **options)
+
+        model_name, response = self.call(call, route)
+        return self.finish(route, response, model_name)
+
+    def health_check(self):
+        return {'backend': self.name, **self.pool.health_check()}
+
+    def model_identity(self, route=None):
+        models = self.router.routes.get(route) or self.pool.model_names
+        return f"{self.name}:{'|'.join(models)}"
+
+    async def asend(self, chat, message, route=None):
+        history = list(chat.session.history)
+
+        async def call(model_name, model):
+            session = model.start_chat(history=history)
+            return model_name, session, await session.send_message_async(message, request_options=self.request_options())
+
+        chat.model_name, chat.session, response = await self.acall(call, route)
+        chat.last_response = self.finish(route, response, chat.model_name)
+        return chat.last_response
+
+    async def astream(self, chat, message, route=None):
+        history = list(chat.session.history)
+        error = None
+
+        for attempt in range(self.retries + 1):
+            if attempt:
+                await asyncio.sleep(self.backoff(attempt))
+
+            model_name = None
+            parts = []
+            try:
+                model_name = self.plan(attempt, route)[0]
+                started = time.monotonic()
+                session = self.pool.get_model(model_name).start_chat(history=history)
+                response = await session.send_message_async(message, stream=True, request_options=self.request_options())
+                async for chunk in response:
+                    if chunk.text:
+                        parts.append(chunk.text)
+                        yield chunk.text
+            except Exception as e:
+                if model_name:
+                    self.report(route, model_name, started, False)
+                if parts:
+                    raise
+                error = e
+                continue
+
+            self.report(route, model_name, started, True)
+            chat.model_name, chat.session = model_name, session
+            chat.last_response = self.finish(route, response, model_name, ''.join(parts))
+            return
+
+        raise error
+
+    async def agenerate(self, prompt, route=None, **options):
+        async def call(model_name, model):
+            return model_name, await model.generate_content_async(prompt, request_options=self.request_options(), **options)
+
+        model_name, response = await self.acall(call, route)
+        return self.finish(route, response, model_name)
+
+
+# The criterion names listed by the evaluation and segment prompts
+PROMPT_CRITERIA = re.compile(r'one entry per (?:evaluation )?criterion \((.*)\)(?:\.| with)')
+
+LOCAL_QUESTIONS = [
+    "Thanks for sharing that. Could you walk me through a recent project you're proud of?",
+    "Interesting. How would you approach debugging a slow API endpoint in production?",
+    "Can you describe a time you disagreed with a teammate and how you resolved it?",
+    "How do you decide between writing a quick fix and refactoring the underlying code?",
+    "What trade-offs would you consider when designing a caching layer?",
+    "Tell me about a technical concept you recently learned. How did you apply it?",
+]
+
+
+class LocalChat:
+    """
+    Per-session handle on the local backend
+    """
+
+    def __init__(self, history):
+        self.history = list(history)
+        self.model_name = 'local'
+        self.last_response = None
+
+
+class LocalBackend(BaseLLMBackend):
+    """
+    Deterministic offline backend for load and regression testing.
+
+    Replies depend only on the seed and the input, so runs are repeatable.
+    Latency follows the configured distributions, each a (mean, stddev) pair:
+    time to first token in milliseconds, token rate in tokens per second and
+    reply length in tokens. Set sleep=False to skip the simulated delays.
+    """
+    name = 'local'
+
+    def __init__(self, seed=0, first_token_latency_ms=(400, 100), tokens_per_second=(50, 10),
+                 response_tokens=(60, 20), sleep=True):
+        self.seed = seed
+        self.first_token_latency_ms = first_token_latency_ms
+        self.tokens_per_second = tokens_per_second
+        self.response_tokens = response_tokens
+        self.sleep = sleep
+
+    def model_identity(self, route=None):
+        return f"{self.name}:{self.seed}"
+
+    def rng(self, *parts):
+        digest = hashlib.sha256(repr((self.seed,) + parts).encode()).digest()
+        return random.Random(int.from_bytes(digest[:8], 'big'))
+
+    def draw(self, rng, distribution, minimum):
+        mean, stddev = distribution
+        return max(minimum, rng.gauss(mean, stddev))
+
+    def plan(self, prompt, context_size, schema=None):
+        """
+        Decide the reply text and its timing for a prompt
+        """
+        rng = self.rng(prompt, context_size)
+
+        if schema and 'overall_rating' not in schema['properties']:
+            text = self.schema_text(rng, schema, prompt)
+        elif schema or '"overall_rating"' in prompt:
+            text = self.evaluation_text(rng, prompt)
+        else:
+            length = int(self.draw(rng, self.response_tokens, 5))
+            opener = LOCAL_QUESTIONS[rng.randrange(len(LOCAL_QUESTIONS))]
+            filler = ' '.join(rng.choice(['Please', 'share', 'specific', 'examples', 'and', 'details'])
+                              for _ in range(max(0, length - len(opener.split()))))
+            text = f"{opener} {filler}".strip()
+
+        first_token = self.draw(rng, self.first_token_latency_ms, 0) / 1000
+        rate = self.draw(rng, self.tokens_per_second, 1)
+        return text, first_token, rate
+
+    def criterion_scores(self, rng, prompt):
+        """
+        One assessed score per criterion the prompt asks about
+        """
+        match = PROMPT_CRITERIA.search(prompt)
+        if match is None or match.group(1) == '(none)':
+            return []
+        return [
+            {'criterion': name, 'score': round(rng.uniform(4, 9.5), 1), 'assessed': True}
+            for name in match.group(1).split(', ')
+        ]
+
+    def evaluation_text(self, rng, prompt=''):
+        scores = [round(rng.uniform(4, 9.5), 1) for _ in range(3)]
+        overall = round(sum(scores) / 3, 1)
+        recommendation = (
+            'Highly Recommended' if overall >= 8.5 else
+            'Recommended' if overall >= 7 else
+            'Maybe' if overall >= 5.5 else
+            'Not Recommended'
+        )
+        return json.dumps({
+            'overall_rating': overall,
+            'technical_score': scores[0],
+            'communication_score': scores[1],
+            'problem_solving_score': scores[2],
+            'feedback': 'Local backend evaluation.',
+            'strengths': 'Deterministic strengths.',
+            'weaknesses': 'Deterministic weaknesses.',
+            'recommendation': recommendation,
+            'criterion_scores': self.criterion_scores(rng, prompt),
+        })
+
+    def schema_text(self, rng, schema, prompt=''):
+        """
+        JSON with a plausible value for every property of a response schema
+        """
+        values = {}
+        for name, field in schema['properties'].items():
+            if name == 'criterion_scores':
+                values[name] = self.criterion_scores(rng, prompt)
+            elif field['type'] == 'number':
+                values[name] = round(rng.uniform(4, 9.5), 1)
+            elif field['type'] == 'array':
+                values[name] = []
+            elif field['type'] == 'boolean':
+                values[name] = True
+            elif 'enum' in field:
+                values[name] = rng.choice(field['enum'])
+            else:
+                values[name] = f'Deterministic {name}.'
+        return json.dumps(values)
+
+    def respond(self, prompt, text, context_size):
+        return LLMResponse(
+            text,
+            prompt_tokens=context_size + estimate_tokens(prompt),
+            response_tokens=len(text.split()),
+            model_name='local',
+        )
+
+    def context_size(self, chat):
+        return sum(estimate_tokens(entry['parts'][0]) for entry in chat.history)
+
+    def record(self, chat, message, response):
+        chat.history.append({'role': 'user', 'parts': [message]})
+        chat.history.append({'role': 'model', 'parts': [response.text]})
+        chat.last_response = response
+        return response
+
+    def start_chat(self, history):
+        return LocalChat(history)
+
+    def send(self, chat, message, route=None):
+        context_size = self.context_size(chat)
+        text, first_token, rate = self.plan(message, context_size)
+        if self.sleep:
+            time.sleep(first_token + len(text.split()) / rate)
+        return self.record(chat, message, self.respond(message, text, context_size))
+
+    def stream(self, chat, message, route=None):
+        context_size = self.context_size(chat)
+        text, first_token, rate = self.plan(message, context_size)
+        if self.sleep:
+            time.sleep(first_token)
+        for word in text.split(' '):
+            if self.sleep:
+                time.sleep(1 / rate)
+            yield word + ' '
+        self.record(chat, message, self.respond(message, text, context_size))
+
+    def response_schema(self, options):
+        return (options.get('generation_config') or {}).get('response_schema')
+
+    def generate(self, prompt, route=None, **options):
+        text, first_token, rate = self.plan(prompt, 0, self.response_schema(options))
+        if self.sleep:
+            time.sleep(first_token + len(text.split()) / rate)
+        return self.respond(prompt, text, 0)
+
+    async def asend(self, chat, message, route=None):
+        context_size = self.context_size(chat)
+        text, first_token, rate = self.plan(message, context_size)
+        if self.sleep:
+            await asyncio.sleep(first_token + len(text.split()) / rate)
+        return self.record(chat, message, self.respond(message, text, context_size))
+
+    async def astream(self, chat, message, route=None):
+        context_size = self.context_size(chat)
+        text, first_token, rate = self.plan(message, context_size)
+        if self.sleep:
+            await asyncio.sleep(first_token)
+        for word in text.split(' '):
+            if self.sleep:
+                await asyncio.sleep(1 / rate)
+            yield word + ' '
+        self.record(chat, message, self.respond(message, text, context_size))
+
+    async def agenerate(self, prompt, route=None, **options):
+        text, first_token, rate = self.plan(prompt, 0, self.response_schema(options))
+        if self.sleep:
+            await asyncio.sleep(first_token + len(text.split()) / rate)
+        return self.respond(prompt, text, 0)
+
+
+# Short names accepted by INTERVIEW_LLM_BACKEND besides a dotted path
+BACKENDS = {
+    'gemini': 'interviews.llm_backends.GeminiBackend',
+    'local': 'interviews.llm_backends.LocalBackend',
+}
+
+_llm_backend = None
+_llm_backend_lock = threading.Lock()
+
+
+def get_llm_backend():
+    """
+    Return the backend configured by INTERVIEW_LLM_BACKEND
+    """
+    global _llm_backend
+
+    if _llm_backend is None:
+        with _llm_backend_lock:
+            if _llm_backend is None:
+                backend = getattr(settings, 'INTERVIEW_LLM_BACKEND', 'interviews.llm_backends.GeminiBackend')
+                options = getattr(settings, 'INTERVIEW_LLM_BACKEND_OPTIONS', {})
+                _llm_backend = import_string(BACKENDS.get(backend, backend))(**options)
+    return _llm_backend
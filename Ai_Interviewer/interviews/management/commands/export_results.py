@@ -0,0 +1,40 @@
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from interviews.export import FORMATS, stream_export
+from interviews.models import Interview
+
+
+class Command(BaseCommand):
+    help = "Export an interview's attempts and results as CSV, JSONL or Parquet"
+
+    def add_arguments(self, parser):
+        parser.add_argument('interview_id', type=int)
+        parser.add_argument('--format', choices=sorted(FORMATS), default='csv',
+                            help='Export format (parquet needs pyarrow)')
+        parser.add_argument('--output', '-o', default='-',
+                            help='File to write, or - for standard output')
+
+    def handle(self, *args, **options):
+        try:
+            interview = Interview.objects.get(id=options['interview_id'])
+        except Interview.DoesNotExist:
+            raise CommandError(f"Interview {options['interview_id']} not found")
+
+        try:
+            chunks = stream_export(interview, options['format'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        to_stdout = options['output'] == '-'
+        output = sys.stdout.buffer if to_stdout else open(options['output'], 'wb')
+        try:
+            for chunk in chunks:
+                output.write(chunk if isinstance(chunk, bytes) else chunk.encode())
+        finally:
+            if to_stdout:
+                output.flush()
+            else:
+                output.close()
+
+        if not to_stdout:
+            self.stderr.write(self.style.SUCCESS(f"✓ Exported {interview} to {options['output']}"))
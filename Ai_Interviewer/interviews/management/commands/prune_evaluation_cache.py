@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from interviews.evaluation_cache import evaluation_cache
+
+
+class Command(BaseCommand):
+    help = 'Evict expired and least recently used cached evaluations'
+
+    def handle(self, *args, **options):
+        deleted = evaluation_cache.prune()
+        stats = evaluation_cache.stats()
+
+        self.stdout.write(self.style.SUCCESS(f"✓ Evicted {deleted} cached evaluations"))
+        self.stdout.write(f"{stats['entries']} entries cached, {stats['total_hits']} hits served")
@@ -0,0 +1,94 @@
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, close_old_connections, connection
+from interviews.evaluation_queue import claim_job, run_job
+
+
+class Command(BaseCommand):
+    help = 'Run queued interview evaluations'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int, default=2,
+            help='Number of evaluations to run in parallel'
+        )
+        parser.add_argument(
+            '--max-attempts', type=int,
+            default=getattr(settings, 'EVALUATION_JOB_MAX_ATTEMPTS', 3),
+            help='Attempts per job before it is marked FAILED'
+        )
+        parser.add_argument(
+            '--retry-backoff', type=float,
+            default=getattr(settings, 'EVALUATION_JOB_RETRY_BACKOFF_SECONDS', 30),
+            help='Base delay in seconds before a failed job is retried'
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=2.0,
+            help='Seconds to wait when the queue is empty'
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Exit once the queue is empty instead of polling forever'
+        )
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.stop = threading.Event()
+        base_id = f"{socket.gethostname()}:{os.getpid()}"
+
+        self.stdout.write(f"Evaluation worker {base_id} started with concurrency {options['concurrency']}")
+
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            futures = [
+                executor.submit(self.work, f"{base_id}:{n}")
+                for n in range(options['concurrency'])
+            ]
+            try:
+                for future in futures:
+                    future.result()
+            except KeyboardInterrupt:
+                self.stop.set()
+                self.stdout.write('Stopping after current jobs finish...')
+
+        self.stdout.write(self.style.SUCCESS('Evaluation worker stopped'))
+
+    def work(self, worker_id):
+        """
+        Claim and run jobs until stopped (or the queue is empty with --once)
+        """
+        try:
+            while not self.stop.is_set():
+                close_old_connections()
+                try:
+                    job = claim_job(worker_id)
+                except DatabaseError as e:
+                    # e.g. SQLite "database is locked" while another worker writes
+                    self.stderr.write(f"✗ Could not claim a job: {e}")
+                    self.stop.wait(self.options['poll_interval'])
+                    continue
+
+                if job is None:
+                    if self.options['once']:
+                        return
+                    self.stop.wait(self.options['poll_interval'])
+                    continue
+
+                started = time.monotonic()
+                succeeded = run_job(
+                    job,
+                    max_attempts=self.options['max_attempts'],
+                    retry_backoff=self.options['retry_backoff']
+                )
+                elapsed = time.monotonic() - started
+
+                if succeeded:
+                    self.stdout.write(self.style.SUCCESS(f"✓ Job {job.id} evaluated in {elapsed:.1f}s"))
+                else:
+                    self.stdout.write(self.style.WARNING(f"✗ Job {job.id} failed ({job.status}): {job.last_error}"))
+        finally:
+            connection.close()
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:35
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('interviews', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InterviewMessage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sequence', models.PositiveIntegerField()),
+                ('role', models.CharField(choices=[('ai', 'AI Interviewer'), ('user', 'Candidate')], max_length=10)),
+                ('message', models.TextField()),
+                ('prompt_tokens', models.IntegerField(blank=True, null=True)),
+                ('response_tokens', models.IntegerField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('attempt', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='messages', to='interviews.interviewattempt')),
+            ],
+            options={
+                'ordering': ['attempt', 'sequence'],
+                'constraints': [models.UniqueConstraint(fields=('attempt', 'sequence'), name='unique_message_sequence')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('interviews', '0003_evaluationjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='interview',
+            name='opening_message',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='interview',
+            name='opening_version',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+    ]
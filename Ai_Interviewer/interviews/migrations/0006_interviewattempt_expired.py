@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('interviews', '0005_evaluationcacheentry'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='interviewattempt',
+            name='status',
+            field=models.CharField(choices=[('SCHEDULED', 'Scheduled'), ('IN_PROGRESS', 'In Progress'), ('COMPLETED', 'Completed'), ('CANCELLED', 'Cancelled'), ('EXPIRED', 'Expired')], default='SCHEDULED', max_length=20),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:14
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('interviews', '0006_interviewattempt_expired'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='interview',
+            index=models.Index(fields=['created_by', 'created_at', 'id'], name='interviews__created_612cd8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='interview',
+            index=models.Index(fields=['status', 'created_at', 'id'], name='interviews__status_4231fb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='interviewattempt',
+            index=models.Index(fields=['interview', 'started_at', 'id'], name='interviews__intervi_7fc532_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='interviewattempt',
+            index=models.Index(fields=['interview', 'status', 'started_at', 'id'], name='interviews__intervi_c41349_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='interviewattempt',
+            index=models.Index(fields=['candidate', 'started_at', 'id'], name='interviews__candida_7cce8c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='interviewresult',
+            index=models.Index(fields=['recommendation', 'overall_rating'], name='interviews__recomme_a68334_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='interviewresult',
+            index=models.Index(fields=['overall_rating'], name='interviews__overall_83674c_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('interviews', '0007_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InterviewLeaderboard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('result_count', models.PositiveIntegerField(default=0)),
+                ('recommendation_counts', models.JSONField(default=dict)),
+                ('score_stats', models.JSONField(default=dict)),
+                ('top_results', models.JSONField(default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('interview', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard', to='interviews.interview')),
+            ],
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:15
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def expire_duplicate_attempts(apps, schema_editor):
+    """
+    Keep the latest open attempt per candidate and interview; older reload duplicates are abandoned
+    """
+    InterviewAttempt = apps.get_model('interviews', 'InterviewAttempt')
+    seen = set()
+    duplicates = []
+    open_attempts = InterviewAttempt.objects.filter(status='IN_PROGRESS').order_by(
+        'interview_id', 'candidate_id', models.F('started_at').desc(nulls_last=True), '-id'
+    )
+    for attempt_id, interview_id, candidate_id in open_attempts.values_list('id', 'interview_id', 'candidate_id'):
+        if (interview_id, candidate_id) in seen:
+            duplicates.append(attempt_id)
+        seen.add((interview_id, candidate_id))
+    InterviewAttempt.objects.filter(id__in=duplicates).update(status='EXPIRED')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('interviews', '0009_interviewresult_criterion_scores'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(expire_duplicate_attempts, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='interviewattempt',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'IN_PROGRESS')), fields=('interview', 'candidate'), name='one_open_attempt_per_candidate'),
+        ),
+    ]
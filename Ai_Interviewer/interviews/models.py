@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 
 # Create your models here.
 from accounts.models import User
@@ -18,6 +19,17 @@ class Interview(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    # Interviewer's first message, generated once per prompt version
+    opening_message = models.TextField(blank=True)
+    opening_version = models.BigIntegerField(null=True, blank=True)
+    
+    class Meta:
+        # Keyset pagination of the dashboards (see interviews.pagination)
+        indexes = [
+            models.Index(fields=['created_by', 'created_at', 'id']),
+            models.Index(fields=['status', 'created_at', 'id']),
+        ]
+    
     def __str__(self):
         return self.title
 
@@ -51,6 +63,7 @@ class InterviewAttempt(models.Model):
         ('IN_PROGRESS', 'In Progress'),
         ('COMPLETED', 'Completed'),
         ('CANCELLED', 'Cancelled'),
+        ('EXPIRED', 'Expired'),  # Abandoned mid-interview (see api.session_eviction)
     )
     
     interview = models.ForeignKey(Interview, on_delete=models.CASCADE, related_name='attempts')
@@ -60,6 +73,21 @@ class InterviewAttempt(models.Model):
     completed_at = models.DateTimeField(null=True, blank=True)
     session_id = models.CharField(max_length=255, blank=True)
     
+    class Meta:
+        # Keyset pagination of results and attempts, optionally by status
+        indexes = [
+            models.Index(fields=['interview', 'started_at', 'id']),
+            models.Index(fields=['interview', 'status', 'started_at', 'id']),
+            models.Index(fields=['candidate', 'started_at', 'id']),
+        ]
+        # start_interview resumes the open attempt; two reloads must not open two
+        constraints = [
+            models.UniqueConstraint(
+                fields=['interview', 'candidate'], condition=models.Q(status='IN_PROGRESS'),
+                name='one_open_attempt_per_candidate'
+            ),
+        ]
+    
     def __str__(self):
         return f"{self.candidate.username} - {self.interview.title}"
 
@@ -73,7 +101,96 @@ class InterviewResult(models.Model):
     strengths = models.TextField(blank=True)
     weaknesses = models.TextField(blank=True)
     recommendation = models.CharField(max_length=50)  # e.g., "Highly Recommended", "Not Recommended"
+    criterion_scores = models.JSONField(default=dict, blank=True)  # {criterion id: score}, see interviews.scoring
+    weighted_score = models.DecimalField(max_digits=3, decimal_places=1, null=True, blank=True)  # Criterion scores weighted by EvaluationCriteria.weight
     created_at = models.DateTimeField(auto_now_add=True)
     
+    class Meta:
+        # Results filters by recommendation and rating range
+        indexes = [
+            models.Index(fields=['recommendation', 'overall_rating']),
+            models.Index(fields=['overall_rating']),
+        ]
+    
     def __str__(self):
         return f"Result for {self.attempt}"
+
+class InterviewMessage(models.Model):
+    ROLE_CHOICES = (
+        ('ai', 'AI Interviewer'),
+        ('user', 'Candidate'),
+    )
+    
+    attempt = models.ForeignKey(InterviewAttempt, on_delete=models.CASCADE, related_name='messages')
+    sequence = models.PositiveIntegerField()  # Position in the conversation
+    role = models.CharField(max_length=10, choices=ROLE_CHOICES)
+    message = models.TextField()
+    prompt_tokens = models.IntegerField(null=True, blank=True)
+    response_tokens = models.IntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        ordering = ['attempt', 'sequence']
+        constraints = [
+            models.UniqueConstraint(fields=['attempt', 'sequence'], name='unique_message_sequence'),
+        ]
+    
+    def __str__(self):
+        return f"{self.attempt} - #{self.sequence} ({self.role})"
+
+class EvaluationJob(models.Model):
+    STATUS_CHOICES = (
+        ('PENDING', 'Pending'),
+        ('RUNNING', 'Running'),
+        ('SUCCEEDED', 'Succeeded'),
+        ('FAILED', 'Failed'),
+    )
+    
+    attempt = models.ForeignKey(InterviewAttempt, on_delete=models.CASCADE, related_name='evaluation_jobs')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
+    context = models.JSONField()  # Interview context used for the evaluation prompt
+    conversation = models.JSONField(default=list)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_after']),
+        ]
+    
+    def __str__(self):
+        return f"Evaluation job #{self.id} for {self.attempt} ({self.status})"
+
+class EvaluationCacheEntry(models.Model):
+    # sha256 of the normalized transcript, criteria, prompt version and model
+    key = models.CharField(max_length=64, unique=True)
+    evaluation = models.JSONField()
+    model_name = models.CharField(max_length=200, blank=True)
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['last_used_at']),
+        ]
+    
+    def __str__(self):
+        return f"Cached evaluation {self.key[:12]} ({self.hits} hits)"
+
+class InterviewLeaderboard(models.Model):
+    # Running summary of an interview's results, kept up to date by interviews.leaderboard
+    interview = models.OneToOneField(Interview, on_delete=models.CASCADE, related_name='leaderboard')
+    result_count = models.PositiveIntegerField(default=0)
+    recommendation_counts = models.JSONField(default=dict)  # {recommendation: count}
+    score_stats = models.JSONField(default=dict)  # {score field: {'n', 'mean', 'm2'}}
+    top_results = models.JSONField(default=list)  # Best LEADERBOARD_TOP_K results, ranked
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Leaderboard for {self.interview} ({self.result_count} results)"
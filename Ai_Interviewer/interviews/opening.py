@@ -0,0 +1,196 @@
+"""
+Precomputed opening greetings.
+
+The interviewer's first message depends only on the interview, not on the
+candidate, so it is generated once per interview version and stored on the
+Interview. Session start then just replays it as the first AI turn of the
+conversation. Generation runs in the background when an interview is set
+to ACTIVE or its details change (see signals.py); if the stored greeting is
+missing or stale, the first session to start generates it instead.
+
+Generation is single-flight per (interview, version): sessions that start
+while a greeting is being generated, in the background or by another
+session, wait for that call and share its result instead of each asking
+the model.
+"""
+import asyncio
+import threading
+from django.db import connection, transaction
+from .admission import PRIORITY_START, get_admission_controller
+from .gemini_service import GeminiInterviewService
+from .models import Interview
+from .prompt_cache import aget_compiled_interview, get_compiled_interview, version_stamp
+
+_generating = set()
+_generating_lock = threading.Lock()
+
+# In-flight generations by (interview id, version); async ones also by event loop
+_flights = {}
+_aflights = {}
+_flights_lock = threading.Lock()
+
+
+class Flight:
+    """
+    One generation that concurrent callers wait on
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = {'success': False, 'error': 'Opening generation failed'}
+
+
+def opening_is_current(interview):
+    """
+    Whether the stored greeting was generated for the interview's current version
+    """
+    return bool(interview.opening_message) and interview.opening_version == version_stamp(interview)
+
+
+def generate_opening(interview, context=None):
+    """
+    Ask the model for the opening greeting and store it on the interview.
+
+    The greeting is only stored if the interview hasn't changed meanwhile.
+    Returns the service result ({'success', 'message', 'usage'}).
+    """
+    context = context or get_compiled_interview(interview)['context']
+
+    with get_admission_controller().slot(PRIORITY_START):
+        result = GeminiInterviewService().start_interview(context)
+
+    if result['success']:
+        # update() leaves updated_at, and with it the version stamp, alone
+        Interview.objects.filter(pk=interview.pk, updated_at=interview.updated_at).update(
+            opening_message=result['message'],
+            opening_version=version_stamp(interview),
+        )
+    return result
+
+
+async def agenerate_opening(interview, context=None):
+    """
+    Async version of generate_opening
+    """
+    context = context or (await aget_compiled_interview(interview))['context']
+
+    async with get_admission_controller().aslot(PRIORITY_START):
+        result = await GeminiInterviewService().start_interview_async(context)
+
+    if result['success']:
+        await Interview.objects.filter(pk=interview.pk, updated_at=interview.updated_at).aupdate(
+            opening_message=result['message'],
+            opening_version=version_stamp(interview),
+        )
+    return result
+
+
+def generate_opening_once(interview, context=None):
+    """
+    generate_opening(), shared with any caller already generating this version
+    """
+    key = (interview.pk, version_stamp(interview))
+    with _flights_lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = Flight()
+
+    if not leader:
+        flight.done.wait()
+        return flight.result
+
+    try:
+        flight.result = generate_opening(interview, context)
+        return flight.result
+    finally:
+        with _flights_lock:
+            _flights.pop(key, None)
+        flight.done.set()
+
+
+async def agenerate_opening_once(interview, context=None):
+    """
+    Async version of generate_opening_once
+    """
+    key = (asyncio.get_running_loop(), interview.pk, version_stamp(interview))
+    with _flights_lock:
+        task = _aflights.get(key)
+        if task is None:
+            task = _aflights[key] = asyncio.ensure_future(agenerate_opening(interview, context))
+            task.add_done_callback(lambda _: _aflights.pop(key, None))
+
+    # A caller that goes away must not cancel the call the others wait on
+    return await asyncio.shield(task)
+
+
+def get_opening(interview, context=None):
+    """
+    Return the opening greeting, generating it if the stored one is stale
+    """
+    if opening_is_current(interview):
+        return {
+            'success': True,
+            'message': interview.opening_message,
+            'usage': {},
+        }
+    return generate_opening_once(interview, context)
+
+
+async def aget_opening(interview, context=None):
+    """
+    Async version of get_opening
+    """
+    if opening_is_current(interview):
+        return {
+            'success': True,
+            'message': interview.opening_message,
+            'usage': {},
+        }
+    return await agenerate_opening_once(interview, context)
+
+
+def refresh_opening(interview_id):
+    """
+    Regenerate an active interview's greeting until it matches the current version
+    """
+    try:
+        while True:
+            interview = Interview.objects.filter(pk=interview_id, status='ACTIVE').first()
+            if interview is None or opening_is_current(interview):
+                return
+
+            result = generate_opening_once(interview)
+            if not result['success']:
+                print(f"✗ Failed to generate opening for interview {interview_id}: {result.get('error')}")
+                return
+            print(f"✓ Generated opening for interview {interview_id}")
+    except Exception as e:
+        print(f"✗ Failed to generate opening for interview {interview_id}: {e}")
+    finally:
+        with _generating_lock:
+            _generating.discard(interview_id)
+        connection.close()
+
+
+def opening_refreshing(interview_id):
+    """
+    Whether a background refresh of the interview's greeting is running
+    """
+    with _generating_lock:
+        return interview_id in _generating
+
+
+def schedule_opening(interview_id):
+    """
+    Regenerate the greeting in a background thread once the current transaction commits
+    """
+    def start():
+        with _generating_lock:
+            # A running refresh re-checks the version before it finishes
+            if interview_id in _generating:
+                return
+            _generating.add(interview_id)
+        threading.Thread(target=refresh_opening, args=(interview_id,), daemon=True).start()
+
+    transaction.on_commit(start)
@@ -0,0 +1,129 @@
+"""
+Keyset (cursor) pagination for the dashboards and results pages.
+
+Rows are listed by a timestamp with the id as tie-breaker, and each page is
+"the next page_size rows after the last one shown":
+
+    WHERE (ts, id) < (last_ts, last_id) ORDER BY ts DESC, id DESC LIMIT n + 1
+
+With a composite index on (owner, ts, id) that is an index range scan on
+every page, where OFFSET pagination walks and throws away all the rows
+before it. The cursor is an opaque, URL-safe encoding of the last row's
+(ts, id). Rows without a timestamp (attempts never started) come last,
+whether the list is newest or oldest first.
+"""
+import base64
+import json
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils.dateparse import parse_datetime
+
+
+def page_size():
+    return getattr(settings, 'DASHBOARD_PAGE_SIZE', 25)
+
+
+def encode_cursor(timestamp, pk):
+    payload = json.dumps([timestamp.isoformat() if timestamp is not None else None, pk])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    (timestamp, id) from a cursor, or None for a missing or malformed one
+    """
+    if not cursor:
+        return None
+    try:
+        value, pk = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        return None
+
+    timestamp = parse_datetime(value) if isinstance(value, str) else None
+    if not isinstance(pk, int) or (value is not None and timestamp is None):
+        return None
+    return timestamp, pk
+
+
+def ordering(field, descending):
+    if descending:
+        return [F(field).desc(nulls_last=True), '-id']
+    return [F(field).asc(nulls_last=True), 'id']
+
+
+def after(field, cursor, descending):
+    """
+    Filter for the rows that come after the cursor in the given order
+    """
+    timestamp, pk = cursor
+    beyond = 'lt' if descending else 'gt'
+
+    if timestamp is None:
+        return Q(**{f'{field}__isnull': True, f'id__{beyond}': pk})
+    return (
+        Q(**{f'{field}__{beyond}': timestamp})
+        | Q(**{field: timestamp, f'id__{beyond}': pk})
+        | Q(**{f'{field}__isnull': True})
+    )
+
+
+def query_with(params, **changes):
+    """
+    Query string for the current one with some parameters changed or (None) removed
+    """
+    query = params.copy()
+    for name, value in changes.items():
+        if value is None:
+            query.pop(name, None)
+        else:
+            query[name] = value
+    return '?' + query.urlencode()
+
+
+class Page:
+    """
+    One page of rows, iterable like the queryset it replaces in templates
+    """
+
+    def __init__(self, rows, next_cursor, first, next_url, first_url):
+        self.rows = rows
+        self.next_cursor = next_cursor
+        self.has_next = next_cursor is not None
+        self.is_first = first
+        self.next_url = next_url
+        self.first_url = first_url
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __bool__(self):
+        return bool(self.rows)
+
+
+def keyset_page(request, queryset, field, param='cursor', descending=True, size=None):
+    """
+    The page of queryset, ordered by (field, id), after the cursor in request.GET[param]
+    """
+    size = size or page_size()
+    cursor = decode_cursor(request.GET.get(param))
+
+    if cursor is not None:
+        queryset = queryset.filter(after(field, cursor, descending))
+    rows = list(queryset.order_by(*ordering(field, descending))[:size + 1])
+
+    next_cursor = None
+    if len(rows) > size:
+        rows = rows[:size]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, field), last.pk)
+
+    return Page(
+        rows,
+        next_cursor,
+        first=cursor is None,
+        next_url=query_with(request.GET, **{param: next_cursor}) if next_cursor else None,
+        first_url=query_with(request.GET, **{param: None}),
+    )
@@ -0,0 +1,129 @@
+"""
+Compiled interview prompts, cached per interview version.
+
+Compiling an interview runs the criteria/skills/responsibilities queries and
+builds the system prompt and criteria text once; every candidate of the same
+interview then shares the result. Entries are keyed on the interview id plus
+a version stamp taken from Interview.updated_at. Signals (see signals.py)
+bump that timestamp whenever the interview or one of its criteria, skills or
+responsibilities changes, and also drop the cached entry in this process.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from .prompts import build_interview_prompt, format_criteria
+
+
+def version_stamp(interview):
+    """
+    Version of an interview's prompt inputs
+    """
+    return int(interview.updated_at.timestamp() * 1000000)
+
+
+def cache_key(interview_id, version):
+    return f"compiled_prompt:{interview_id}:{version}"
+
+
+def latest_key(interview_id):
+    return f"compiled_prompt_latest:{interview_id}"
+
+
+def cache_timeout():
+    return getattr(settings, 'PROMPT_CACHE_TIMEOUT_SECONDS', 3600)
+
+
+def compile_context(interview, criteria, skills, responsibilities):
+    """
+    Build the compiled entry from already-fetched interview data
+    """
+    context = {
+        'interview_id': interview.id,
+        'version': version_stamp(interview),
+        'title': interview.title,
+        'description': interview.description,
+        'duration_minutes': interview.duration_minutes,
+        'criteria': criteria,
+        'skills': skills,
+        'responsibilities': responsibilities,
+    }
+    return {
+        'context': context,
+        'system_prompt': build_interview_prompt(context),
+        'criteria_text': format_criteria(criteria),
+    }
+
+
+def compile_interview(interview):
+    """
+    Query an interview's details and build its prompts
+    """
+    return compile_context(
+        interview,
+        list(interview.criteria.values('criterion_name', 'description', 'weight')),
+        list(interview.expected_skills.values('skill_name', 'proficiency_level')),
+        list(interview.responsibilities.values('responsibility')),
+    )
+
+
+async def acompile_interview(interview):
+    """
+    Query an interview's details with the async ORM and build its prompts
+    """
+    return compile_context(
+        interview,
+        [c async for c in interview.criteria.values('criterion_name', 'description', 'weight')],
+        [s async for s in interview.expected_skills.values('skill_name', 'proficiency_level')],
+        [r async for r in interview.responsibilities.values('responsibility')],
+    )
+
+
+def get_compiled_interview(interview):
+    """
+    Return {'context', 'system_prompt', 'criteria_text'} for the interview,
+    compiling it only on a cache miss
+    """
+    key = cache_key(interview.id, version_stamp(interview))
+    compiled = cache.get(key)
+
+    if compiled is None:
+        compiled = compile_interview(interview)
+        cache.set(key, compiled, cache_timeout())
+        cache.set(latest_key(interview.id), key, cache_timeout())
+
+    return compiled
+
+
+async def aget_compiled_interview(interview):
+    """
+    Async version of get_compiled_interview
+    """
+    key = cache_key(interview.id, version_stamp(interview))
+    compiled = await cache.aget(key)
+
+    if compiled is None:
+        compiled = await acompile_interview(interview)
+        await cache.aset(key, compiled, cache_timeout())
+        await cache.aset(latest_key(interview.id), key, cache_timeout())
+
+    return compiled
+
+
+def get_cached_compilation(interview_context):
+    """
+    Look up the compiled entry matching a session's interview context.
+
+    Returns None when the context has no version stamp or the entry has
+    been evicted, in which case callers build the prompt themselves.
+    """
+    if 'version' not in interview_context:
+        return None
+    return cache.get(cache_key(interview_context['interview_id'], interview_context['version']))
+
+
+def invalidate_interview(interview_id):
+    """
+    Drop the latest compiled entry for an interview
+    """
+    key = cache.get(latest_key(interview_id))
+    if key:
+        cache.delete_many([key, latest_key(interview_id)])
@@ -0,0 +1,170 @@
+"""
+Per-call-type model routing.
+
+Each kind of LLM call (the opening greeting, conversational turns, context
+summaries and the final evaluation) has its own route: an ordered list of
+models from LLM_ROUTES, usually a fast, cheap model first for turns and a
+stronger one first for evaluation. The router keeps a moving average of
+latency and error rate for every route and model, and moves a model that
+misses the route's latency SLO or fails too often behind the ones that
+don't. Demoted models are tried again after LLM_ROUTE_PROBE_SECONDS so
+they can recover.
+"""
+import threading
+import time
+from django.conf import settings
+
+ROUTE_OPENING = 'opening'
+ROUTE_TURN = 'turn'
+ROUTE_SUMMARY = 'summary'
+ROUTE_EVALUATION = 'evaluation'
+
+# Calls made without a route
+DEFAULT_ROUTE = 'default'
+
+
+class RouteStats:
+    """
+    Moving averages for one model on one route
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.latency_ms = None
+        self.error_rate = 0.0
+        self.prompt_tokens = 0
+        self.response_tokens = 0
+        self.last_seen = None
+
+    def record(self, latency_ms, ok, alpha):
+        self.calls += 1
+        self.last_seen = time.monotonic()
+        self.error_rate = (1 - alpha) * self.error_rate + alpha * (0.0 if ok else 1.0)
+
+        if ok:
+            if self.latency_ms is None:
+                self.latency_ms = latency_ms
+            else:
+                self.latency_ms = (1 - alpha) * self.latency_ms + alpha * latency_ms
+        else:
+            self.errors += 1
+
+    def as_dict(self):
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'error_rate': round(self.error_rate, 3),
+            'latency_ms': int(self.latency_ms) if self.latency_ms is not None else None,
+            'prompt_tokens': self.prompt_tokens,
+            'response_tokens': self.response_tokens,
+        }
+
+
+class ModelRouter:
+    """
+    Orders candidate models for each route using observed latency and errors
+    """
+
+    def __init__(self, routes=None, slo_ms=None, max_error_rate=None, min_samples=5,
+                 probe_seconds=None, alpha=0.2):
+        self.routes = routes or getattr(settings, 'LLM_ROUTES', {})
+        self.slo_ms = slo_ms or getattr(settings, 'LLM_ROUTE_SLO_MS', {})
+        self.max_error_rate = max_error_rate or getattr(settings, 'LLM_ROUTE_MAX_ERROR_RATE', 0.2)
+        self.probe_seconds = probe_seconds or getattr(settings, 'LLM_ROUTE_PROBE_SECONDS', 30)
+        self.min_samples = min_samples
+        self.alpha = alpha
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def model_names(self):
+        """
+        Every model named by any route
+        """
+        names = []
+        for models in self.routes.values():
+            names.extend(name for name in models if name not in names)
+        return names
+
+    def _get_stats(self, route, model_name):
+        key = (route, model_name)
+        if key not in self._stats:
+            self._stats[key] = RouteStats()
+        return self._stats[key]
+
+    def is_healthy(self, route, model_name):
+        """
+        Whether a model currently meets the route's SLO. Caller must hold the lock.
+        """
+        stats = self._stats.get((route, model_name))
+        if stats is None or stats.calls < self.min_samples:
+            return True
+        if time.monotonic() - stats.last_seen >= self.probe_seconds:
+            # Not used for a while: give it another chance
+            return True
+
+        slo = self.slo_ms.get(route)
+        too_slow = slo is not None and stats.latency_ms is not None and stats.latency_ms > slo
+        return not too_slow and stats.error_rate <= self.max_error_rate
+
+    def order(self, route, available):
+        """
+        Order the available models for a route, best first.
+
+        Models that meet the route's SLO keep their configured order and come
+        first; the rest follow, fewest errors and lowest latency first. Routes
+        without configuration, or whose models are all unavailable, use the
+        available models as given.
+        """
+        route = route or DEFAULT_ROUTE
+        configured = [name for name in self.routes.get(route, []) if name in available]
+        if not configured:
+            return list(available)
+
+        with self._lock:
+            healthy = [name for name in configured if self.is_healthy(route, name)]
+            demoted = sorted(
+                (name for name in configured if name not in healthy),
+                key=lambda name: (
+                    self._stats[(route, name)].error_rate,
+                    self._stats[(route, name)].latency_ms or 0,
+                )
+            )
+        return healthy + demoted
+
+    def record(self, route, model_name, latency_seconds, ok):
+        route = route or DEFAULT_ROUTE
+        with self._lock:
+            self._get_stats(route, model_name).record(latency_seconds * 1000, ok, self.alpha)
+
+    def record_tokens(self, route, model_name, prompt_tokens, response_tokens):
+        route = route or DEFAULT_ROUTE
+        with self._lock:
+            stats = self._get_stats(route, model_name)
+            stats.prompt_tokens += prompt_tokens or 0
+            stats.response_tokens += response_tokens or 0
+
+    def stats(self):
+        with self._lock:
+            routes = {}
+            for (route, model_name), stats in sorted(self._stats.items()):
+                entry = routes.setdefault(route, {'slo_ms': self.slo_ms.get(route), 'models': {}})
+                entry['models'][model_name] = {**stats.as_dict(), 'healthy': self.is_healthy(route, model_name)}
+            return routes
+
+
+_model_router = None
+_model_router_lock = threading.Lock()
+
+
+def get_model_router():
+    """
+    Return the model router shared by this worker process
+    """
+    global _model_router
+
+    if _model_router is None:
+        with _model_router_lock:
+            if _model_router is None:
+                _model_router = ModelRouter()
+    return _model_router
@@ -0,0 +1,81 @@
+"""
+Per-criterion scores and the weighted composite.
+
+Evaluations score every EvaluationCriteria of the interview by name. The
+scores are stored on InterviewResult.criterion_scores in compact form,
+{criterion id: score}, so renaming a criterion keeps its history and every
+result of an interview lines up column by column for analytics.py.
+weighted_score is the mean of the criterion scores weighted by each
+criterion's weight; criteria the evaluation found no evidence for are left
+out of both.
+"""
+from .evaluation_schema import clean_score
+
+
+def clean_criterion_scores(criterion_scores):
+    """
+    Check criterion_scores sent to the result API, in either form that
+    criterion_score_map() accepts, raising ValueError with the reason
+    """
+    if isinstance(criterion_scores, dict):
+        criterion_scores = [{'criterion': name, 'score': score} for name, score in criterion_scores.items()]
+    if not isinstance(criterion_scores, list):
+        raise ValueError('criterion_scores must be a list or an object')
+
+    for entry in criterion_scores:
+        if not isinstance(entry, dict) or 'criterion' not in entry:
+            raise ValueError('Each criterion score needs a "criterion" name')
+        # Unscored entries are skipped rather than rejected
+        if entry.get('score') is None:
+            continue
+        try:
+            clean_score(entry['criterion'], entry['score'])
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid score for {entry['criterion']}: {entry['score']!r}")
+    return criterion_scores
+
+
+def criterion_score_map(criteria, criterion_scores):
+    """
+    {str(criterion id): score} from an evaluation's criterion_scores.
+
+    Accepts the evaluation's list of {'criterion', 'score', 'assessed'} or a
+    {name: score} dict (map-reduce evaluations). Names that match no
+    criterion are dropped.
+    """
+    if isinstance(criterion_scores, dict):
+        criterion_scores = [{'criterion': name, 'score': score} for name, score in criterion_scores.items()]
+
+    ids = {c.criterion_name.strip().lower(): c.id for c in criteria}
+    scores = {}
+    for entry in criterion_scores or []:
+        if not entry.get('assessed', True) or entry.get('score') is None:
+            continue
+        criterion_id = ids.get(str(entry['criterion']).strip().lower())
+        if criterion_id is not None:
+            scores[str(criterion_id)] = round(float(entry['score']), 1)
+    return scores
+
+
+def weighted_score(criteria, scores):
+    """
+    Weighted mean of the criterion scores, or None if none were scored
+    """
+    weights = {str(c.id): c.weight for c in criteria}
+    scored = [(weights[criterion_id], score) for criterion_id, score in scores.items() if weights.get(criterion_id)]
+    total = sum(weight for weight, _ in scored)
+    if not total:
+        return None
+    return round(sum(weight * score for weight, score in scored) / total, 1)
+
+
+def score_criteria(interview, criterion_scores):
+    """
+    InterviewResult fields for an evaluation's criterion scores
+    """
+    criteria = list(interview.criteria.all())
+    scores = criterion_score_map(criteria, criterion_scores)
+    return {
+        'criterion_scores': scores,
+        'weighted_score': weighted_score(criteria, scores),
+    }
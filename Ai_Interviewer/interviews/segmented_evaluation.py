@@ -0,0 +1,186 @@
+"""
+Map-reduce evaluation for long interviews.
+
+Transcripts longer than EVALUATION_MAP_REDUCE_THRESHOLD_TOKENS are split on
+question boundaries into segments of about EVALUATION_SEGMENT_TOKENS. Each
+segment is scored against the evaluation criteria in parallel (map), the
+segment scores are combined into the category and criterion scores weighted
+by how much the candidate said in each segment, and one short call writes
+the overall rating, feedback and recommendation from the combined scores
+and segment notes (reduce). At most EVALUATION_MAP_CONCURRENCY segments are
+scored at once. Latency is then roughly one segment call per batch plus
+the reduce call. Shorter transcripts are evaluated with a single prompt.
+
+On both paths overall_rating is the model's holistic rating of the whole
+interview, not an average of the other scores; the criterion-weighted mean
+is InterviewResult.weighted_score (see scoring.py).
+
+Finished evaluations are memoized in the evaluation cache, which is
+checked before any model call.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from .admission import PRIORITY_EVALUATION, get_admission_controller
+from .context_window import estimate_tokens
+from .evaluation_cache import evaluation_cache, evaluation_key
+from .evaluation_schema import SEGMENT_FIELDS
+from .gemini_service import GeminiInterviewService
+from .llm_backends import get_llm_backend
+from .routing import ROUTE_EVALUATION
+from .transcript import format_conversation
+
+REDUCE_FIELDS = ['overall_rating', 'feedback', 'strengths', 'weaknesses', 'recommendation']
+CATEGORY_FIELDS = ['technical_score', 'communication_score', 'problem_solving_score']
+
+
+def threshold_tokens():
+    return getattr(settings, 'EVALUATION_MAP_REDUCE_THRESHOLD_TOKENS', 6000)
+
+
+def split_transcript(conversation, segment_tokens=None):
+    """
+    Split a conversation into segments of about segment_tokens each.
+
+    Segments only start at an AI turn, so every question stays with the
+    candidate's answer to it.
+    """
+    segment_tokens = segment_tokens or getattr(settings, 'EVALUATION_SEGMENT_TOKENS', 3000)
+    segments = []
+    current = []
+    current_tokens = 0
+
+    for turn in conversation:
+        tokens = estimate_tokens(turn['message'])
+        if current and turn['role'] == 'ai' and current_tokens + tokens > segment_tokens:
+            segments.append(current)
+            current, current_tokens = [], 0
+        current.append(turn)
+        current_tokens += tokens
+
+    if current:
+        segments.append(current)
+    return segments
+
+
+def segment_weight(segment):
+    """
+    Weight a segment's scores by how much the candidate said in it
+    """
+    return max(1, sum(estimate_tokens(turn['message']) for turn in segment if turn['role'] != 'ai'))
+
+
+def combine_scores(interview_context, segments, results):
+    """
+    Reduce segment scores into the category and criterion scores.
+    The overall rating is left to the reduce call.
+    """
+    weights = [segment_weight(segment) for segment in segments]
+    total = sum(weights)
+
+    scores = {
+        name: round(sum(w * r[name] for w, r in zip(weights, results)) / total, 1)
+        for name in CATEGORY_FIELDS
+    }
+
+    # Per-criterion scores from the segments that found evidence for it
+    criterion_scores = {}
+    for criterion in interview_context['criteria']:
+        name = criterion['criterion_name']
+        assessed = [
+            (w, entry['score'])
+            for w, r in zip(weights, results)
+            for entry in r['criterion_scores']
+            if entry['assessed'] and entry['criterion'].lower() == name.lower()
+        ]
+        if assessed:
+            criterion_scores[name] = round(sum(w * s for w, s in assessed) / sum(w for w, s in assessed), 1)
+
+    return {
+        **scores,
+        'criterion_scores': criterion_scores,
+    }
+
+
+def segment_notes(results):
+    return [
+        {'summary': r['summary'], 'strengths': r['strengths'], 'weaknesses': r['weaknesses']}
+        for r in results
+    ]
+
+
+def failed_result(results):
+    errors = [r['error'] for r in results if not r['success']]
+    return {
+        'success': False,
+        'error': f"{len(errors)} of {len(results)} transcript segments failed: {errors[0]}"
+    }
+
+
+def evaluate_segment(interview_context, segment, index, count):
+    service = GeminiInterviewService()
+    prompt = service.create_segment_prompt(interview_context, format_conversation(segment), index, count)
+
+    with get_admission_controller().slot(PRIORITY_EVALUATION):
+        return service.generate_structured(prompt, SEGMENT_FIELDS)
+
+
+def cache_key(interview_context, conversation):
+    model_identity = get_llm_backend().model_identity(ROUTE_EVALUATION)
+    return evaluation_key(interview_context, conversation, model_identity), model_identity
+
+
+def evaluate_transcript(interview_context, conversation):
+    """
+    Evaluate a finished interview, reusing a cached evaluation of the same inputs
+    """
+    key, model_identity = cache_key(interview_context, conversation)
+    cached = evaluation_cache.get(key)
+    if cached is not None:
+        return {
+            'success': True,
+            'evaluation': cached,
+            'cached': True
+        }
+
+    result = run_evaluation(interview_context, conversation)
+    if result['success']:
+        evaluation_cache.set(key, result['evaluation'], model_identity)
+    return result
+
+
+def run_evaluation(interview_context, conversation):
+    """
+    Evaluate a finished interview, splitting long transcripts into segments
+    """
+    service = GeminiInterviewService()
+    segments = split_transcript(conversation)
+
+    if len(segments) < 2 or estimate_tokens(format_conversation(conversation)) <= threshold_tokens():
+        with get_admission_controller().slot(PRIORITY_EVALUATION):
+            return service.generate_evaluation(interview_context, format_conversation(conversation))
+
+    # Map: score the segments, EVALUATION_MAP_CONCURRENCY at a time
+    concurrency = getattr(settings, 'EVALUATION_MAP_CONCURRENCY', 4)
+    with ThreadPoolExecutor(max_workers=min(concurrency, len(segments))) as executor:
+        results = list(executor.map(
+            lambda args: evaluate_segment(interview_context, *args),
+            [(segment, n, len(segments)) for n, segment in enumerate(segments, start=1)]
+        ))
+
+    if not all(r['success'] for r in results):
+        return failed_result(results)
+    results = [r['evaluation'] for r in results]
+
+    # Reduce: combine the scores, then write the feedback from the segment notes
+    scores = combine_scores(interview_context, segments, results)
+    prompt = service.create_reduce_prompt(interview_context, scores, segment_notes(results))
+
+    with get_admission_controller().slot(PRIORITY_EVALUATION):
+        written = service.generate_structured(prompt, REDUCE_FIELDS)
+
+    if not written['success']:
+        return written
+    return {
+        'success': True,
+        'evaluation': {**scores, **written['evaluation']}
+    }
@@ -0,0 +1,77 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from .models import Interview, InterviewAttempt, InterviewResult, EvaluationCriteria, ExpectedSkill, RoleResponsibility
+from .prompt_cache import invalidate_interview
+from .opening import opening_is_current, opening_refreshing, schedule_opening
+from .leaderboard import previous_entry, record_result, result_entry
+
+
+def opening_needs_refresh(instance, update_fields=None):
+    """
+    Whether a saved interview is live and its greeting no longer matches its version
+    """
+    if instance.status != 'ACTIVE':
+        return False
+    # updated_at, the version stamp, only moves when it is saved
+    if update_fields is not None and not {'updated_at', 'status'} & set(update_fields):
+        return False
+    return not opening_is_current(instance) and not opening_refreshing(instance.id)
+
+
+@receiver([post_save, post_delete], sender=Interview)
+def interview_changed(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    Saving an interview already moves updated_at, its prompt version stamp
+    """
+    invalidate_interview(instance.id)
+    
+    # Prepare the opening greeting as soon as the interview goes live or changes version
+    if kwargs.get('signal') is post_save and not raw and opening_needs_refresh(instance, update_fields):
+        schedule_opening(instance.id)
+
+
+@receiver([post_save, post_delete], sender=EvaluationCriteria)
+@receiver([post_save, post_delete], sender=ExpectedSkill)
+@receiver([post_save, post_delete], sender=RoleResponsibility)
+def interview_detail_changed(sender, instance, raw=False, **kwargs):
+    """
+    Bump the parent interview's version so every worker recompiles its prompt
+    """
+    if raw:
+        return
+    Interview.objects.filter(pk=instance.interview_id).update(updated_at=timezone.now())
+    invalidate_interview(instance.interview_id)
+    
+    # Regenerate the opening greeting of a live interview for the new version
+    if not opening_refreshing(instance.interview_id) and Interview.objects.filter(pk=instance.interview_id, status='ACTIVE').exists():
+        schedule_opening(instance.interview_id)
+
+
+@receiver(pre_save, sender=InterviewResult)
+def result_saving(sender, instance, raw=False, **kwargs):
+    """
+    Remember the stored scores so the leaderboard can take them out again
+    """
+    if not raw:
+        instance._leaderboard_previous = previous_entry(instance)
+
+
+@receiver(post_save, sender=InterviewResult)
+def result_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    attempt = instance.attempt
+    record_result(
+        attempt.interview_id,
+        getattr(instance, '_leaderboard_previous', None),
+        result_entry(instance),
+        attempt.candidate.username
+    )
+
+
+@receiver(post_delete, sender=InterviewResult)
+def result_deleted(sender, instance, **kwargs):
+    attempt = InterviewAttempt.objects.filter(pk=instance.attempt_id).values('interview_id').first()
+    if attempt is not None:
+        record_result(attempt['interview_id'], result_entry(instance), None)
@@ -1,3 +1,680 @@
-from django.test import TestCase
+import asyncio
+import base64
+import random
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from accounts.models import User
+from .admission import (
+    PRIORITY_EVALUATION, PRIORITY_START, PRIORITY_TURN, AdmissionController, AdmissionRejected
+)
+from .evaluation_schema import (
+    EVALUATION_FIELDS, RECOMMENDATIONS, IncrementalObjectParser, clean_field, parse_object_fields, validate_evaluation
+)
+from .gemini_service import GeminiInterviewService
+from .llm_backends import BaseLLMBackend, LLMResponse
+from .leaderboard import rebuild_leaderboard
+from .models import Interview, InterviewAttempt, InterviewLeaderboard, InterviewResult
+from .pagination import decode_cursor, encode_cursor, keyset_page
+from .segmented_evaluation import combine_scores, split_transcript
 
-# Create your tests here.
+COMPLETE_EVALUATION = (
+    '{"overall_rating": 8.5, "technical_score": 8, "communication_score": 7, '
+    '"problem_solving_score": 9, "feedback": "Clear answers", "strengths": "APIs", '
+    '"weaknesses": "Testing", "recommendation": "Recommended", '
+    '"criterion_scores": [{"criterion": "Tech", "score": 8, "assessed": true}]}'
+)
+
+
+class ScriptedBackend(BaseLLMBackend):
+    """
+    Backend that answers generate() with canned replies and records the fields asked for
+    """
+
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.requested = []
+        self.prompts = []
+
+    def generate(self, prompt, route=None, **options):
+        self.prompts.append(prompt)
+        self.requested.append(options['generation_config']['response_schema']['required'])
+        return LLMResponse(self.replies.pop(0))
+
+
+class IncrementalObjectParserTests(SimpleTestCase):
+    def test_complete_object(self):
+        fields, invalid = parse_object_fields(COMPLETE_EVALUATION)
+        self.assertEqual(set(fields), set(EVALUATION_FIELDS))
+        self.assertEqual(fields['criterion_scores'], [{'criterion': 'Tech', 'score': 8, 'assessed': True}])
+        self.assertEqual(invalid, {})
+
+    def test_prose_and_code_fences_are_skipped(self):
+        text = 'Here is the evaluation:\n```json\n{"overall_rating": 7, "feedback": "ok"}\n```\nLet me know!'
+        fields, invalid = parse_object_fields(text)
+        self.assertEqual(fields, {'overall_rating': 7, 'feedback': 'ok'})
+        self.assertEqual(invalid, {})
+
+    def test_text_after_the_object_is_ignored(self):
+        parser = IncrementalObjectParser()
+        parser.feed('{"a": 1} {"b": 2}')
+        self.assertTrue(parser.done)
+        self.assertEqual(parser.fields, {'a': 1})
+
+    def test_cut_off_reply_keeps_completed_fields(self):
+        fields, _ = parse_object_fields('{"overall_rating": 8, "feedback": "Good", "strengths": "API de')
+        self.assertEqual(fields, {'overall_rating': 8, 'feedback': 'Good'})
+
+    def test_cut_off_scalar_is_not_kept(self):
+        parser = IncrementalObjectParser()
+        parser.feed('{"feedback": "Good", "overall_rating": 8')
+        self.assertFalse(parser.done)
+        self.assertNotIn('overall_rating', parser.fields)
+
+    def test_fed_in_chunks(self):
+        parser = IncrementalObjectParser()
+        for start in range(0, len(COMPLETE_EVALUATION), 5):
+            parser.feed(COMPLETE_EVALUATION[start:start + 5])
+        self.assertEqual(parser.fields, parse_object_fields(COMPLETE_EVALUATION)[0])
+
+    def test_field_available_as_soon_as_complete(self):
+        parser = IncrementalObjectParser()
+        self.assertEqual(parser.feed('{"feedback": "Go'), {})
+        self.assertEqual(parser.feed('od", '), {'feedback': 'Good'})
+
+    def test_braces_and_escapes_inside_strings(self):
+        fields, _ = parse_object_fields(r'{"feedback": "Said \"use {braces}\", [ok]", "overall_rating": 6}')
+        self.assertEqual(fields, {'feedback': 'Said "use {braces}", [ok]', 'overall_rating': 6})
+
+    def test_nested_values_kept_whole(self):
+        fields, _ = parse_object_fields('{"a": {"b": [1, {"c": "}"}]}, "d": [3]}')
+        self.assertEqual(fields, {'a': {'b': [1, {'c': '}'}]}, 'd': [3]})
+
+    def test_invalid_values_kept_as_raw_text(self):
+        fields, invalid = parse_object_fields('{"overall_rating": eight, "feedback": "ok"}')
+        self.assertEqual(fields, {'feedback': 'ok'})
+        self.assertEqual(invalid, {'overall_rating': 'eight'})
+
+    def test_no_object(self):
+        self.assertEqual(parse_object_fields('I cannot evaluate this interview.'), ({}, {}))
+
+
+class CleanFieldTests(SimpleTestCase):
+    def test_scores_are_coerced_and_rounded(self):
+        self.assertEqual(clean_field('technical_score', '7'), 7.0)
+        self.assertEqual(clean_field('overall_rating', 8.26), 8.3)
+
+    def test_scores_out_of_range(self):
+        for value in (0, 0.9, 10.1, 11, -3):
+            with self.assertRaises(ValueError):
+                clean_field('communication_score', value)
+
+    def test_score_range_is_inclusive(self):
+        self.assertEqual(clean_field('overall_rating', 1), 1.0)
+        self.assertEqual(clean_field('overall_rating', 10), 10.0)
+
+    def test_non_numeric_score(self):
+        with self.assertRaises(ValueError):
+            clean_field('technical_score', 'great')
+        with self.assertRaises(TypeError):
+            clean_field('technical_score', None)
+
+    def test_recommendation_matched_case_insensitively(self):
+        self.assertEqual(clean_field('recommendation', ' highly recommended '), 'Highly Recommended')
+        with self.assertRaises(ValueError):
+            clean_field('recommendation', 'Hire')
+
+    def test_text_fields(self):
+        self.assertEqual(clean_field('feedback', '  Solid  '), 'Solid')
+        self.assertEqual(clean_field('strengths', ['APIs', 'SQL']), 'APIs\nSQL')
+        for value in ('', '   ', 5):
+            with self.assertRaises(ValueError):
+                clean_field('weaknesses', value)
+
+    def test_criterion_scores(self):
+        cleaned = clean_field('criterion_scores', [
+            {'criterion': ' Tech ', 'score': '7.55'},
+            {'criterion': 'Comm', 'score': 5, 'assessed': False},
+        ])
+        self.assertEqual(cleaned, [
+            {'criterion': 'Tech', 'score': 7.5, 'assessed': True},
+            {'criterion': 'Comm', 'score': 5.0, 'assessed': False},
+        ])
+
+    def test_invalid_criterion_scores(self):
+        with self.assertRaises(ValueError):
+            clean_field('criterion_scores', {'criterion': 'Tech', 'score': 7})
+        with self.assertRaises(ValueError):
+            clean_field('criterion_scores', [{'criterion': 'Tech', 'score': 12}])
+        with self.assertRaises(KeyError):
+            clean_field('criterion_scores', [{'criterion': 'Tech'}])
+
+    def test_validate_evaluation_lists_missing_and_invalid_fields(self):
+        fields, _ = parse_object_fields(COMPLETE_EVALUATION)
+        fields['technical_score'] = 42
+        del fields['feedback']
+        evaluation, failed = validate_evaluation(fields)
+        self.assertEqual(failed, ['technical_score', 'feedback'])
+        self.assertEqual(evaluation['overall_rating'], 8.5)
+        self.assertNotIn('technical_score', evaluation)
+
+    def test_validate_evaluation_only_checks_requested_fields(self):
+        evaluation, failed = validate_evaluation({'technical_score': 4}, ['technical_score'])
+        self.assertEqual((evaluation, failed), ({'technical_score': 4.0}, []))
+
+
+@override_settings(EVALUATION_FIELD_RETRIES=1)
+class StructuredGenerationTests(SimpleTestCase):
+    interview_context = {'title': 'Python Developer', 'criteria': []}
+
+    def test_complete_reply_needs_one_call(self):
+        backend = ScriptedBackend([COMPLETE_EVALUATION])
+        result = GeminiInterviewService(backend).generate_evaluation(self.interview_context, 'transcript')
+        self.assertTrue(result['success'])
+        self.assertEqual(len(backend.requested), 1)
+
+    def test_only_failed_fields_are_asked_for_again(self):
+        cut_off = COMPLETE_EVALUATION.replace('"technical_score": 8', '"technical_score": 18')
+        cut_off = cut_off[:cut_off.index('"recommendation"')]
+        backend = ScriptedBackend([
+            cut_off,
+            '{"technical_score": 6, "recommendation": "Maybe", "criterion_scores": []}',
+        ])
+        result = GeminiInterviewService(backend).generate_evaluation(self.interview_context, 'transcript')
+
+        self.assertTrue(result['success'])
+        self.assertEqual(backend.requested[1], ['technical_score', 'recommendation', 'criterion_scores'])
+        self.assertIn('technical_score, recommendation, criterion_scores', backend.prompts[1])
+        evaluation = result['evaluation']
+        self.assertEqual(evaluation['technical_score'], 6.0)
+        self.assertEqual(evaluation['recommendation'], 'Maybe')
+        self.assertEqual(evaluation['feedback'], 'Clear answers')
+
+    def test_fields_still_failing_after_retries(self):
+        backend = ScriptedBackend(['{"overall_rating": 8}', 'not json'])
+        result = GeminiInterviewService(backend).generate_evaluation(self.interview_context, 'transcript')
+        self.assertFalse(result['success'])
+        self.assertIn('technical_score', result['error'])
+        self.assertEqual(len(backend.requested), 2)
+
+    @override_settings(EVALUATION_FIELD_RETRIES=0)
+    def test_retries_disabled(self):
+        backend = ScriptedBackend(['{"overall_rating": 8}'])
+        result = GeminiInterviewService(backend).generate_evaluation(self.interview_context, 'transcript')
+        self.assertFalse(result['success'])
+        self.assertEqual(len(backend.requested), 1)
+
+    def test_backend_error(self):
+        backend = ScriptedBackend([])
+        result = GeminiInterviewService(backend).generate_structured('prompt', ['overall_rating'])
+        self.assertFalse(result['success'])
+
+    def test_async_retry(self):
+        backend = ScriptedBackend(['{"overall_rating": 8}', '{"overall_rating": 9}'])
+        service = GeminiInterviewService(backend)
+        result = asyncio.run(service.generate_structured_async('prompt', ['overall_rating', 'feedback']))
+        self.assertFalse(result['success'])
+
+        backend = ScriptedBackend(['{"overall_rating": 8}', '{"feedback": "Fine"}'])
+        service = GeminiInterviewService(backend)
+        result = asyncio.run(service.generate_structured_async('prompt', ['overall_rating', 'feedback']))
+        self.assertEqual(result, {'success': True, 'evaluation': {'overall_rating': 8.0, 'feedback': 'Fine'}})
+        self.assertEqual(backend.requested, [['overall_rating', 'feedback'], ['feedback']])
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        hr = User.objects.create_user('hr', password='x', user_type='HR')
+        candidate = User.objects.create_user('candidate', password='x', user_type='CANDIDATE')
+        interview = Interview.objects.create(title='Python Developer', description='d', created_by=hr)
+        now = timezone.now()
+        # Three attempts share a timestamp, two were never started
+        started = [now, now, now - timedelta(hours=1), now, None, now - timedelta(days=1), None]
+        for started_at in started:
+            InterviewAttempt.objects.create(
+                interview=interview, candidate=candidate, status='COMPLETED', started_at=started_at
+            )
+        cls.attempts = InterviewAttempt.objects.all()
+
+    def expected(self, descending):
+        rows = list(self.attempts)
+        started = [row for row in rows if row.started_at is not None]
+        never = [row for row in rows if row.started_at is None]
+        started.sort(key=lambda row: (row.started_at, row.id), reverse=descending)
+        never.sort(key=lambda row: row.id, reverse=descending)
+        return [row.id for row in started + never]
+
+    def walk(self, descending, size=2):
+        """
+        Ids of every row, following next_url page by page
+        """
+        factory = RequestFactory()
+        url = '/'
+        seen = []
+        pages = 0
+        while url is not None:
+            page = keyset_page(factory.get(url), self.attempts, 'started_at', descending=descending, size=size)
+            self.assertLessEqual(len(page), size)
+            self.assertEqual(page.is_first, pages == 0)
+            seen += [row.id for row in page]
+            url = page.next_url
+            pages += 1
+        return seen
+
+    def test_newest_first_with_ties_and_never_started_last(self):
+        self.assertEqual(self.walk(descending=True), self.expected(descending=True))
+
+    def test_oldest_first_with_ties_and_never_started_last(self):
+        self.assertEqual(self.walk(descending=False), self.expected(descending=False))
+
+    def test_page_boundaries_inside_ties_and_nulls(self):
+        for size in (1, 3, 6, 7, 10):
+            self.assertEqual(self.walk(descending=True, size=size), self.expected(descending=True))
+            self.assertEqual(self.walk(descending=False, size=size), self.expected(descending=False))
+
+    def test_last_page_has_no_next(self):
+        page = keyset_page(RequestFactory().get('/'), self.attempts, 'started_at', size=len(self.attempts))
+        self.assertFalse(page.has_next)
+        self.assertIsNone(page.next_url)
+
+    def test_next_url_keeps_other_parameters(self):
+        page = keyset_page(RequestFactory().get('/?status=COMPLETED'), self.attempts, 'started_at', size=2)
+        self.assertIn('status=COMPLETED', page.next_url)
+        self.assertEqual(page.first_url, '?status=COMPLETED')
+
+    def test_cursor_round_trip(self):
+        now = timezone.now()
+        self.assertEqual(decode_cursor(encode_cursor(now, 5)), (now, 5))
+        self.assertEqual(decode_cursor(encode_cursor(None, 5)), (None, 5))
+
+    def test_invalid_cursor_starts_over(self):
+        def encoded(text):
+            return base64.urlsafe_b64encode(text.encode()).decode().rstrip('=')
+
+        first_page = [row.id for row in keyset_page(RequestFactory().get('/'), self.attempts, 'started_at', size=2)]
+        for cursor in ['garbage', '!!!', encoded('not json'), encoded('[1, 2, 3]'), encoded('{"id": 1}'),
+                       encoded('["yesterday", 4]'), encoded('[null, "4"]'), encoded('5')]:
+            self.assertIsNone(decode_cursor(cursor))
+            page = keyset_page(RequestFactory().get('/', {'cursor': cursor}), self.attempts, 'started_at', size=2)
+            self.assertTrue(page.is_first)
+            self.assertEqual([row.id for row in page], first_page)
+
+    def test_cursor_for_a_deleted_row(self):
+        order = self.expected(descending=True)
+        removed = InterviewAttempt.objects.get(id=order[2])
+        cursor = encode_cursor(removed.started_at, removed.id)
+        removed.delete()
+        page = keyset_page(RequestFactory().get('/', {'cursor': cursor}), self.attempts, 'started_at', size=10)
+        self.assertEqual([row.id for row in page], order[3:])
+
+
+@override_settings(LEADERBOARD_TOP_K=3)
+class LeaderboardTests(TestCase):
+    """
+    The incrementally kept leaderboard must match one rebuilt from all results
+    """
+
+    def setUp(self):
+        self.rng = random.Random(42)
+        self.hr = User.objects.create_user('hr', password='x', user_type='HR')
+        self.interview = Interview.objects.create(title='Python Developer', description='d', created_by=self.hr)
+        self.results = []
+        self.candidates = 0
+
+    def score(self, optional=False):
+        if optional and self.rng.random() < 0.2:
+            return None
+        return Decimal(self.rng.randint(10, 100)) / 10
+
+    def scores(self):
+        return {
+            'overall_rating': self.score(),
+            'weighted_score': self.score(optional=True),
+            'technical_score': self.score(optional=True),
+            'communication_score': self.score(optional=True),
+            'problem_solving_score': self.score(optional=True),
+            'recommendation': self.rng.choice(RECOMMENDATIONS),
+        }
+
+    def create(self):
+        self.candidates += 1
+        candidate = User.objects.create(username=f'candidate{self.candidates}', user_type='CANDIDATE')
+        attempt = InterviewAttempt.objects.create(interview=self.interview, candidate=candidate, status='COMPLETED')
+        result = InterviewResult.objects.create(attempt=attempt, feedback='f', **self.scores())
+        self.results.append(result)
+
+    def update(self):
+        result = self.rng.choice(self.results)
+        for field, value in self.scores().items():
+            setattr(result, field, value)
+        result.save()
+
+    def delete(self):
+        result = self.results.pop(self.rng.randrange(len(self.results)))
+        result.delete()
+
+    def snapshot(self):
+        board = InterviewLeaderboard.objects.get(interview=self.interview)
+        return board.result_count, board.recommendation_counts, board.score_stats, board.top_results
+
+    def assertMatchesRebuild(self):
+        count, recommendations, stats, top = self.snapshot()
+        rebuilt = rebuild_leaderboard(self.interview.id)
+
+        self.assertEqual(count, rebuilt.result_count)
+        self.assertEqual(recommendations, rebuilt.recommendation_counts)
+        self.assertEqual(top, rebuilt.top_results)
+        self.assertEqual(set(stats), set(rebuilt.score_stats))
+        for field, expected in rebuilt.score_stats.items():
+            self.assertEqual(stats[field]['n'], expected['n'], field)
+            self.assertAlmostEqual(stats[field]['mean'], expected['mean'], places=6, msg=field)
+            self.assertAlmostEqual(stats[field]['m2'], expected['m2'], places=6, msg=field)
+
+    def test_each_change_matches_rebuild(self):
+        for _ in range(6):
+            self.create()
+            self.assertMatchesRebuild()
+        for _ in range(40):
+            operation = self.rng.choice([self.create, self.update, self.update, self.delete])
+            if operation != self.create and len(self.results) < 2:
+                operation = self.create
+            operation()
+            self.assertMatchesRebuild()
+
+    def test_many_changes_do_not_drift(self):
+        for _ in range(10):
+            self.create()
+        for _ in range(120):
+            operation = self.rng.choice([self.create, self.update, self.update, self.delete])
+            if operation != self.create and len(self.results) < 2:
+                operation = self.create
+            operation()
+        self.assertMatchesRebuild()
+
+    def test_top_result_rescored_lower_drops_out(self):
+        for _ in range(5):
+            self.create()
+        best = min(self.results, key=lambda result: (-result.overall_rating, result.attempt_id))
+        best.overall_rating = Decimal('1.0')
+        best.save()
+        _, _, _, top = self.snapshot()
+        self.assertNotIn(best.attempt_id, [entry['attempt_id'] for entry in top])
+        self.assertEqual(len(top), 3)
+        self.assertMatchesRebuild()
+
+    def test_deleting_every_result(self):
+        for _ in range(4):
+            self.create()
+        while self.results:
+            self.delete()
+        count, recommendations, stats, top = self.snapshot()
+        self.assertEqual((count, recommendations, top), (0, {}, []))
+        self.assertTrue(all(field_stats['n'] == 0 for field_stats in stats.values()))
+
+
+class AdmissionControllerTests(SimpleTestCase):
+    """
+    Queue order, displacement, rejection and slot accounting, for sync and async callers
+    """
+
+    def controller(self, max_concurrent=1, max_queue=8, max_wait=5):
+        return AdmissionController(max_concurrent=max_concurrent, max_queue=max_queue, max_wait=max_wait)
+
+    def wait_queued(self, controller, count):
+        deadline = time.monotonic() + 5
+        while sum(controller.stats()['queued'].values()) < count:
+            self.assertLess(time.monotonic(), deadline, 'waiters never queued')
+            time.sleep(0.005)
+
+    def queue_thread(self, controller, priority, admitted, errors, name):
+        def run():
+            try:
+                with controller.slot(priority):
+                    admitted.append(name)
+            except AdmissionRejected as e:
+                errors.append((name, e))
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        return thread
+
+    def test_free_slots_admit_at_once(self):
+        controller = self.controller(max_concurrent=2)
+        first = controller.acquire(PRIORITY_EVALUATION)
+        second = controller.acquire(PRIORITY_EVALUATION)
+        self.assertEqual(controller.stats()['active'], 2)
+        controller.release(first)
+        controller.release(second)
+        self.assertEqual(controller.stats()['active'], 0)
+
+    def test_queue_order_by_priority_then_arrival(self):
+        controller = self.controller()
+        held = controller.acquire()
+        admitted, errors, threads = [], [], []
+        for name, priority in [('evaluation', PRIORITY_EVALUATION), ('start', PRIORITY_START),
+                               ('turn 1', PRIORITY_TURN), ('turn 2', PRIORITY_TURN)]:
+            threads.append(self.queue_thread(controller, priority, admitted, errors, name))
+            self.wait_queued(controller, len(threads))
+
+        self.assertEqual(controller.stats()['queued'], {'turn': 2, 'start': 1, 'evaluation': 1})
+        controller.release(held)
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(errors, [])
+        self.assertEqual(admitted, ['turn 1', 'turn 2', 'start', 'evaluation'])
+        self.assertEqual(controller.stats()['active'], 0)
+
+    def test_full_queue_displaces_least_urgent_waiter(self):
+        controller = self.controller(max_queue=1)
+        held = controller.acquire()
+        admitted, errors = [], []
+        evaluation = self.queue_thread(controller, PRIORITY_EVALUATION, admitted, errors, 'evaluation')
+        self.wait_queued(controller, 1)
+        turn = self.queue_thread(controller, PRIORITY_TURN, admitted, errors, 'turn')
+        evaluation.join(5)
+
+        self.assertEqual([name for name, _ in errors], ['evaluation'])
+        self.assertIn('Displaced', str(errors[0][1]))
+        self.assertGreaterEqual(errors[0][1].retry_after, 1)
+
+        controller.release(held)
+        turn.join(5)
+        self.assertEqual(admitted, ['turn'])
+        self.assertEqual(controller.stats()['rejected'], 1)
+
+    def test_full_queue_rejects_equal_priority_with_retry_after(self):
+        controller = self.controller(max_queue=1)
+        held = controller.acquire()
+        admitted, errors = [], []
+        waiting = self.queue_thread(controller, PRIORITY_TURN, admitted, errors, 'waiting')
+        self.wait_queued(controller, 1)
+
+        with self.assertRaises(AdmissionRejected) as rejected:
+            controller.acquire(PRIORITY_TURN)
+        # One active and one queued at the default 2 s hold, one slot
+        self.assertEqual(rejected.exception.retry_after, 4)
+
+        controller.release(held)
+        waiting.join(5)
+        self.assertEqual(admitted, ['waiting'])
+
+    def test_timeout_leaves_the_queue(self):
+        controller = self.controller()
+        held = controller.acquire()
+        with self.assertRaises(AdmissionRejected) as rejected:
+            controller.acquire(PRIORITY_START, timeout=0.05)
+        self.assertIn('Timed out', str(rejected.exception))
+        self.assertEqual(controller.stats()['queued']['start'], 0)
+        controller.release(held)
+        self.assertEqual(controller.stats()['active'], 0)
+
+    def test_async_queue_order_and_release(self):
+        controller = self.controller()
+
+        async def run():
+            admitted = []
+            held = await controller.aacquire()
+
+            async def caller(name, priority):
+                async with controller.aslot(priority):
+                    admitted.append(name)
+
+            tasks = []
+            for name, priority in [('evaluation', PRIORITY_EVALUATION), ('start', PRIORITY_START),
+                                   ('turn', PRIORITY_TURN)]:
+                tasks.append(asyncio.create_task(caller(name, priority)))
+                await asyncio.sleep(0)
+            self.assertEqual(controller.stats()['queued'], {'turn': 1, 'start': 1, 'evaluation': 1})
+
+            await controller.arelease(held)
+            await asyncio.gather(*tasks)
+            return admitted
+
+        self.assertEqual(asyncio.run(run()), ['turn', 'start', 'evaluation'])
+        self.assertEqual(controller.stats()['active'], 0)
+
+    def test_async_displacement_and_timeout(self):
+        controller = self.controller(max_queue=1)
+
+        async def run():
+            held = await controller.aacquire()
+            evaluation = asyncio.create_task(controller.aacquire(PRIORITY_EVALUATION))
+            await asyncio.sleep(0)
+            turn = asyncio.create_task(controller.aacquire(PRIORITY_TURN))
+            with self.assertRaises(AdmissionRejected) as rejected:
+                await evaluation
+            self.assertIn('Displaced', str(rejected.exception))
+
+            await controller.arelease(held)
+            await controller.arelease(await turn)
+
+            held = await controller.aacquire()
+            with self.assertRaises(AdmissionRejected) as rejected:
+                await controller.aacquire(PRIORITY_START, timeout=0.05)
+            self.assertGreaterEqual(rejected.exception.retry_after, 1)
+            await controller.arelease(held)
+
+        asyncio.run(run())
+        stats = controller.stats()
+        self.assertEqual((stats['active'], sum(stats['queued'].values()), stats['rejected']), (0, 0, 2))
+
+    def test_async_cancelled_waiter_leaves_the_queue(self):
+        controller = self.controller()
+
+        async def run():
+            held = await controller.aacquire()
+            waiter = asyncio.create_task(controller.aacquire(PRIORITY_START))
+            await asyncio.sleep(0)
+            waiter.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await waiter
+            self.assertEqual(controller.stats()['queued']['start'], 0)
+            await controller.arelease(held)
+
+        asyncio.run(run())
+        self.assertEqual(controller.stats()['active'], 0)
+
+    def test_async_waiter_woken_from_another_thread(self):
+        controller = self.controller()
+        held = controller.acquire()
+
+        async def run():
+            threading.Timer(0.05, controller.release, args=(held,)).start()
+            ticket = await controller.aacquire(PRIORITY_TURN)
+            self.assertEqual(controller.stats()['active'], 1)
+            await controller.arelease(ticket)
+
+        asyncio.run(run())
+        self.assertEqual(controller.stats()['active'], 0)
+
+
+def turn(role, tokens):
+    return {'role': role, 'message': 'x' * (4 * tokens)}
+
+
+class SplitTranscriptTests(SimpleTestCase):
+    def test_short_transcript_is_one_segment(self):
+        conversation = [turn('ai', 10), turn('user', 10), turn('ai', 10), turn('user', 10)]
+        self.assertEqual(split_transcript(conversation, segment_tokens=100), [conversation])
+
+    def test_segments_start_only_at_ai_turns(self):
+        conversation = [turn('ai', 30), turn('user', 40), turn('ai', 30), turn('user', 40), turn('ai', 30), turn('user', 40)]
+        segments = split_transcript(conversation, segment_tokens=90)
+
+        self.assertEqual([len(segment) for segment in segments], [2, 2, 2])
+        for segment in segments:
+            self.assertEqual(segment[0]['role'], 'ai')
+        self.assertEqual([t for segment in segments for t in segment], conversation)
+
+    def test_long_answer_is_not_split_from_its_question(self):
+        conversation = [turn('ai', 10), turn('user', 500), turn('user', 500), turn('ai', 10), turn('user', 10)]
+        segments = split_transcript(conversation, segment_tokens=100)
+        self.assertEqual(segments, [conversation[:3], conversation[3:]])
+
+    def test_leading_candidate_turns_stay_in_the_first_segment(self):
+        conversation = [turn('user', 90), turn('ai', 20), turn('user', 5)]
+        segments = split_transcript(conversation, segment_tokens=100)
+        self.assertEqual(segments, [conversation[:1], conversation[1:]])
+
+    def test_several_exchanges_share_a_segment(self):
+        conversation = [turn('ai', 10), turn('user', 10)] * 6
+        segments = split_transcript(conversation, segment_tokens=45)
+        self.assertEqual([len(segment) for segment in segments], [4, 4, 4])
+
+    def test_empty(self):
+        self.assertEqual(split_transcript([], segment_tokens=100), [])
+
+
+class CombineScoresTests(SimpleTestCase):
+    interview_context = {'criteria': [{'criterion_name': 'Tech'}, {'criterion_name': 'Communication'}]}
+
+    def result(self, score, criterion_scores=()):
+        return {
+            'technical_score': score,
+            'communication_score': score,
+            'problem_solving_score': score,
+            'criterion_scores': list(criterion_scores),
+        }
+
+    def test_weighted_by_what_the_candidate_said(self):
+        segments = [
+            [turn('ai', 500), turn('user', 10)],
+            [turn('ai', 5), turn('user', 30)],
+        ]
+        scores = combine_scores(self.interview_context, segments, [self.result(4), self.result(8)])
+        # Weights 10 and 30; the AI turns do not count
+        self.assertEqual(scores['technical_score'], 7.0)
+        self.assertEqual(scores['communication_score'], 7.0)
+        self.assertEqual(scores['problem_solving_score'], 7.0)
+        self.assertNotIn('overall_rating', scores)
+
+    def test_segment_without_candidate_turns_still_counts(self):
+        segments = [[turn('ai', 50)], [turn('ai', 5), turn('user', 3)]]
+        scores = combine_scores(self.interview_context, segments, [self.result(2), self.result(6)])
+        self.assertEqual(scores['technical_score'], 5.0)
+
+    def test_criteria_only_from_segments_that_assessed_them(self):
+        segments = [
+            [turn('ai', 5), turn('user', 10)],
+            [turn('ai', 5), turn('user', 30)],
+            [turn('ai', 5), turn('user', 60)],
+        ]
+        results = [
+            self.result(5, [{'criterion': 'tech', 'score': 9, 'assessed': True},
+                            {'criterion': 'Communication', 'score': 1, 'assessed': False}]),
+            self.result(5, [{'criterion': 'Tech', 'score': 5, 'assessed': True},
+                            {'criterion': 'Communication', 'score': 6, 'assessed': True}]),
+            self.result(5, [{'criterion': 'Leadership', 'score': 10, 'assessed': True}]),
+        ]
+        scores = combine_scores(self.interview_context, segments, results)
+        self.assertEqual(scores['criterion_scores'], {'Tech': 6.0, 'Communication': 6.0})
+
+    def test_criterion_never_assessed_is_left_out(self):
+        segments = [[turn('ai', 5), turn('user', 10)]]
+        results = [self.result(5, [{'criterion': 'Tech', 'score': 3, 'assessed': False}])]
+        self.assertEqual(combine_scores(self.interview_context, segments, results)['criterion_scores'], {})
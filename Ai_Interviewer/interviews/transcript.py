@@ -0,0 +1,126 @@
+"""
+Durable interview transcripts.
+
+Turns are kept in the live session conversation while the interview runs
+and copied into InterviewMessage rows for re-scoring and audit. Writes go
+through a process-wide buffer that flushes turns from every interview in
+one bulk INSERT, which keeps SQLite write contention low when many
+interviews are running at once.
+"""
+import atexit
+import threading
+import time
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .models import InterviewMessage
+
+
+def build_turn(role, message, usage=None):
+    """
+    Create a conversation entry as stored in the session store
+    """
+    usage = usage or {}
+    return {
+        'role': role,
+        'message': message,
+        'timestamp': timezone.now().isoformat(),
+        'prompt_tokens': usage.get('prompt_tokens'),
+        'response_tokens': usage.get('response_tokens'),
+    }
+
+
+def format_conversation(conversation):
+    """
+    Flatten a session conversation into text for evaluation
+    """
+    return "\n\n".join([
+        f"{'AI Interviewer' if msg['role'] == 'ai' else 'Candidate'}: {msg['message']}"
+        for msg in conversation
+    ])
+
+
+def turn_to_message(attempt_id, sequence, turn):
+    """
+    Convert a conversation entry into an unsaved InterviewMessage
+    """
+    created_at = parse_datetime(turn['timestamp']) if turn.get('timestamp') else None
+    return InterviewMessage(
+        attempt_id=attempt_id,
+        sequence=sequence,
+        role=turn['role'],
+        message=turn['message'],
+        prompt_tokens=turn.get('prompt_tokens'),
+        response_tokens=turn.get('response_tokens'),
+        created_at=created_at or timezone.now(),
+    )
+
+
+class TranscriptBuffer:
+    """
+    Collects transcript turns and writes them with bulk_create
+    """
+
+    def __init__(self, flush_size=None, flush_interval=None):
+        self.flush_size = flush_size or getattr(settings, 'TRANSCRIPT_FLUSH_SIZE', 50)
+        self.flush_interval = flush_interval or getattr(settings, 'TRANSCRIPT_FLUSH_INTERVAL_SECONDS', 5)
+        self._pending = []
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    def add(self, attempt_id, first_sequence, *turns):
+        """
+        Buffer turns starting at the given conversation position
+        """
+        with self._lock:
+            for offset, turn in enumerate(turns):
+                self._pending.append(turn_to_message(attempt_id, first_sequence + offset, turn))
+
+            should_flush = (
+                len(self._pending) >= self.flush_size
+                or time.monotonic() - self._last_flush >= self.flush_interval
+            )
+
+        if should_flush:
+            self.flush()
+
+    def flush(self, attempt_id=None):
+        """
+        Write buffered turns, either all of them or only one attempt's
+        """
+        with self._lock:
+            if attempt_id is None:
+                batch, self._pending = self._pending, []
+                self._last_flush = time.monotonic()
+            else:
+                batch = [m for m in self._pending if str(m.attempt_id) == str(attempt_id)]
+                self._pending = [m for m in self._pending if str(m.attempt_id) != str(attempt_id)]
+
+        if batch:
+            # Turns already written by another worker are skipped
+            InterviewMessage.objects.bulk_create(batch, ignore_conflicts=True)
+
+        return len(batch)
+
+    def finalize(self, attempt_id, conversation):
+        """
+        Flush an attempt and backfill any turns buffered by other workers
+        """
+        self.flush(attempt_id)
+        InterviewMessage.objects.bulk_create(
+            [turn_to_message(attempt_id, sequence, turn) for sequence, turn in enumerate(conversation)],
+            ignore_conflicts=True
+        )
+
+    async def aadd(self, attempt_id, first_sequence, *turns):
+        return await sync_to_async(self.add)(attempt_id, first_sequence, *turns)
+
+    async def afinalize(self, attempt_id, conversation):
+        return await sync_to_async(self.finalize)(attempt_id, conversation)
+
+
+transcript_buffer = TranscriptBuffer()
+
+# Don't lose buffered turns when the worker shuts down cleanly
+atexit.register(transcript_buffer.flush)
@@ -7,6 +7,8 @@ urlpatterns = [
     path('hr/edit/<int:interview_id>/', views.edit_interview, name='edit_interview'),
     path('hr/delete/<int:interview_id>/', views.delete_interview, name='delete_interview'),
     path('hr/results/<int:interview_id>/', views.view_results, name='view_results'),
+    path('hr/analytics/<int:interview_id>/', views.interview_analytics, name='interview_analytics'),
+    path('hr/export/<int:interview_id>/', views.export_results, name='export_results'),
     path('hr/add-criteria/<int:interview_id>/', views.add_criteria, name='add_criteria'),
     path('hr/add-skill/<int:interview_id>/', views.add_skill, name='add_skill'),
     path('hr/add-responsibility/<int:interview_id>/', views.add_responsibility, name='add_responsibility'),
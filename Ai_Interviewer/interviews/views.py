@@ -1,9 +1,21 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.http import StreamingHttpResponse
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.db import IntegrityError, transaction
 from django.utils import timezone
 from .models import Interview, InterviewAttempt, InterviewResult, EvaluationCriteria, ExpectedSkill, RoleResponsibility
-from .forms import InterviewForm, EvaluationCriteriaForm, ExpectedSkillForm, RoleResponsibilityForm
+from .forms import (
+    InterviewForm, EvaluationCriteriaForm, ExpectedSkillForm, RoleResponsibilityForm,
+    InterviewFilterForm, AttemptFilterForm, ResultsFilterForm
+)
+from .dashboard import (
+    with_attempt_stats, dashboard_totals, filter_values, newest_first, filter_interviews, filter_attempts
+)
+from .pagination import keyset_page, query_with
+from .leaderboard import get_leaderboard, score_summary
+from .analytics import cohort_analytics, attempt_stats
+from .export import FORMATS, export_filename, parquet_available, stream_export
 import uuid
 import os
 
@@ -12,18 +24,22 @@ def hr_dashboard(request):
     if request.user.user_type != 'HR':
         return redirect('candidate_dashboard')
     
-    interviews = Interview.objects.filter(created_by=request.user).order_by('-created_at')
+    my_interviews = Interview.objects.filter(created_by=request.user)
+    filter_form = InterviewFilterForm(request.GET)
+    filters = filter_values(filter_form)
     
-    # Get statistics
-    total_interviews = interviews.count()
-    active_interviews = interviews.filter(status='ACTIVE').count()
-    total_attempts = InterviewAttempt.objects.filter(interview__created_by=request.user).count()
+    # One query lists a page of interviews with their attempt and rating stats
+    interviews = keyset_page(
+        request,
+        with_attempt_stats(filter_interviews(my_interviews, filters)),
+        'created_at',
+        descending=newest_first(filters)
+    )
     
     context = {
         'interviews': interviews,
-        'total_interviews': total_interviews,
-        'active_interviews': active_interviews,
-        'total_attempts': total_attempts,
+        'filter_form': filter_form,
+        **dashboard_totals(my_interviews),
     }
     return render(request, 'interviews/hr_dashboard.html', context)
 
@@ -124,28 +140,117 @@ def delete_interview(request, interview_id):
     messages.success(request, 'Interview deleted successfully!')
     return redirect('hr_dashboard')
 
+def results_filter_form(request, interview):
+    recommendations = InterviewResult.objects.filter(
+        attempt__interview=interview
+    ).order_by('recommendation').values_list('recommendation', flat=True).distinct()
+    return ResultsFilterForm(request.GET, recommendations=recommendations)
+
 @login_required
 def view_results(request, interview_id):
     interview = get_object_or_404(Interview, id=interview_id, created_by=request.user)
-    attempts = InterviewAttempt.objects.filter(interview=interview).select_related('candidate', 'result').order_by('-started_at')
+    filter_form = results_filter_form(request, interview)
+    filters = filter_values(filter_form)
+    
+    attempts = keyset_page(
+        request,
+        filter_attempts(
+            InterviewAttempt.objects.filter(interview=interview).select_related('candidate', 'result'),
+            filters
+        ),
+        'started_at',
+        descending=newest_first(filters)
+    )
+    
+    # Ranking and score distribution come from the precomputed leaderboard
+    leaderboard = get_leaderboard(interview)
     
     context = {
         'interview': interview,
         'attempts': attempts,
+        'filter_form': filter_form,
+        'leaderboard': leaderboard,
+        'score_summary': score_summary(leaderboard),
+        # Exports take the same filters, but every page
+        'export_query': query_with(request.GET, cursor=None)[1:],
+        'parquet_available': parquet_available(),
     }
     return render(request, 'interviews/view_results.html', context)
 
+@login_required
+def export_results(request, interview_id):
+    interview = get_object_or_404(Interview, id=interview_id, created_by=request.user)
+    export_format = request.GET.get('format', 'csv')
+    
+    if export_format not in FORMATS:
+        messages.error(request, f'Unknown export format: {export_format}')
+        return redirect('view_results', interview_id=interview.id)
+    if export_format == 'parquet' and not parquet_available():
+        messages.error(request, 'Parquet export needs pyarrow installed on the server')
+        return redirect('view_results', interview_id=interview.id)
+    
+    filters = filter_values(results_filter_form(request, interview))
+    attempts = filter_attempts(InterviewAttempt.objects.filter(interview=interview), filters)
+    
+    # Rows are read and encoded chunk by chunk as the response is sent
+    response = StreamingHttpResponse(
+        stream_export(interview, export_format, attempts),
+        content_type=FORMATS[export_format][0]
+    )
+    response['Content-Disposition'] = f'attachment; filename="{export_filename(interview, export_format)}"'
+    return response
+
+@login_required
+def interview_analytics(request, interview_id):
+    interview = get_object_or_404(Interview, id=interview_id, created_by=request.user)
+    analytics = cohort_analytics(interview)
+    
+    context = {
+        'interview': interview,
+        'analytics': analytics,
+    }
+    if analytics is not None:
+        context['score_rows'] = [
+            ('Overall Rating', None, analytics['overall']),
+            ('Weighted Score', None, analytics['weighted']),
+        ] + [(c['name'], c['weight'], c['summary']) for c in analytics['criteria']]
+        context['correlation_rows'] = [
+            (c['name'], row) for c, row in zip(analytics['criteria'], analytics['correlations'])
+        ]
+        # Where the top candidates stand in the cohort
+        context['top_results'] = [
+            {**entry, 'stats': attempt_stats(analytics, entry['attempt_id'])}
+            for entry in get_leaderboard(interview).top_results
+        ]
+    return render(request, 'interviews/interview_analytics.html', context)
+
 @login_required
 def candidate_dashboard(request):
     if request.user.user_type != 'CANDIDATE':
         return redirect('hr_dashboard')
     
-    available_interviews = Interview.objects.filter(status='ACTIVE').order_by('-created_at')
-    my_attempts = InterviewAttempt.objects.filter(candidate=request.user).select_related('interview').order_by('-started_at')
+    filter_form = AttemptFilterForm(request.GET)
+    filters = filter_values(filter_form)
+    
+    # Each list has its own cursor so they page independently
+    available_interviews = keyset_page(
+        request,
+        Interview.objects.filter(status='ACTIVE'),
+        'created_at',
+        param='interviews_cursor'
+    )
+    my_attempts = keyset_page(
+        request,
+        filter_attempts(InterviewAttempt.objects.filter(candidate=request.user).select_related('interview'), filters),
+        'started_at',
+        param='attempts_cursor',
+        descending=newest_first(filters)
+    )
     
     context = {
         'available_interviews': available_interviews,
         'my_attempts': my_attempts,
+        'filter_form': filter_form,
     }
     return render(request, 'interviews/candidate_dashboard.html', context)
 
@@ -157,14 +262,30 @@ def start_interview(request, interview_id):
     
     interview = get_object_or_404(Interview, id=interview_id, status='ACTIVE')
     
-    # Create interview attempt
-    attempt = InterviewAttempt.objects.create(
+    # Resume an unfinished attempt rather than opening a new one on every reload
+    attempt = InterviewAttempt.objects.filter(
         interview=interview,
         candidate=request.user,
-        status='IN_PROGRESS',
-        started_at=timezone.now(),
-        session_id=str(uuid.uuid4())
-    )
+        status='IN_PROGRESS'
+    ).order_by('-started_at').first()
+    
+    if attempt is None:
+        try:
+            with transaction.atomic():
+                attempt = InterviewAttempt.objects.create(
+                    interview=interview,
+                    candidate=request.user,
+                    status='IN_PROGRESS',
+                    started_at=timezone.now(),
+                    session_id=str(uuid.uuid4())
+                )
+        except IntegrityError:
+            # A concurrent reload opened it first
+            attempt = InterviewAttempt.objects.get(
+                interview=interview,
+                candidate=request.user,
+                status='IN_PROGRESS'
+            )
     
     return redirect('interview_session', attempt_id=attempt.id)
 
@@ -195,8 +316,16 @@ def view_my_result(request, attempt_id):
     try:
         result = attempt.result
     except InterviewResult.DoesNotExist:
-        messages.error(request, 'Results not available yet.')
-        return redirect('candidate_dashboard')
+        # Show progress while the evaluation is still queued or running
+        job = attempt.evaluation_jobs.order_by('-created_at').first()
+        if job is None:
+            messages.error(request, 'Results not available yet.')
+            return redirect('candidate_dashboard')
+        
+        return render(request, 'interviews/evaluation_pending.html', {
+            'attempt': attempt,
+            'job': job,
+        })
     
     context = {
         'attempt': attempt,